@@ -1,13 +1,54 @@
-from antlr4 import ParseTreeVisitor
-from .symbols import Scope, Symbol, Type
+import logging
+from antlr4 import ParseTreeVisitor, ParserRuleContext
+from .symbols import Scope, Symbol, Type, TableSchema
 from .errors import SemanticError
 
+log = logging.getLogger("reltable.analyzer")
+
 class RelTableSemanticAnalyzer(ParseTreeVisitor):
+    # Тип результата встроенных функций, вызываемых как f(...)
+    BUILTIN_RESULTS = {
+        "save_table": Type.VOID,
+        "load_table": Type.TABLE,
+        "import_csv": Type.VOID,
+        "create_index": Type.VOID,
+        "count": Type.INT,
+        "sum": Type.DECIMAL,
+        "min": Type.DECIMAL,
+        "max": Type.DECIMAL,
+        "avg": Type.DECIMAL,
+        "set_threads": Type.VOID,
+        "memory_report": Type.VOID,
+        "flush": Type.VOID,
+    }
+    # Агрегаты по колонке, тип результата которых совпадает с типом int-колонки;
+    # sum всегда decimal — сумма int-колонки может не поместиться в int
+    COLUMN_TYPED_AGGREGATES = ("min", "max")
+    # Встроенные функции без побочных эффектов: их можно вызывать из параллельного where
+    PURE_BUILTINS = ("count", "sum", "min", "max", "avg")
+    # Форматы write(table, format)
+    WRITE_FORMATS = ("text", "csv", "binary")
+
     def __init__(self):
         super().__init__()
         self.global_scope = Scope(name="global")
         self.scope = self.global_scope
         self.errors = []
+        self.branch_depth = 0
+        # Схемы таблиц для лямбды, которую сейчас передают в select
+        self._pending_row_schemas = None
+        # (узел, атрибут) — аннотации, выведенные из схем таблиц
+        self._schema_annotations = []
+        # False, если колонки меняются так, что схемы отследить нельзя
+        self._schemas_reliable = True
+        # Лямбды и функции, тело которых сейчас обходится (для проверки чистоты)
+        self._purity_frames = []
+        # Таблицы, освобождённые drop_table на текущем пути: символ -> узел drop
+        self._dropped = {}
+        # Циклы, тело которых сейчас обходится: символ -> первое обращение ('use'/'assign')
+        self._loop_frames = []
+        # Для --profile
+        self.scope_count = 0
         self._register_builtins()
 
     def _register_builtins(self):
@@ -16,7 +57,19 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
             ("add_column", Type.FUNCTION),
             ("add_row", Type.FUNCTION),
             ("write", Type.FUNCTION),
-            ("print", Type.FUNCTION)
+            ("print", Type.FUNCTION),
+            ("save_table", Type.FUNCTION),
+            ("load_table", Type.FUNCTION),
+            ("import_csv", Type.FUNCTION),
+            ("create_index", Type.FUNCTION),
+            ("count", Type.FUNCTION),
+            ("sum", Type.FUNCTION),
+            ("min", Type.FUNCTION),
+            ("max", Type.FUNCTION),
+            ("avg", Type.FUNCTION),
+            ("set_threads", Type.FUNCTION),
+            ("memory_report", Type.FUNCTION),
+            ("flush", Type.FUNCTION)
         ]
         for name, t in builtins:
             self.global_scope.define(name, Symbol(name, t))
@@ -27,7 +80,8 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         self.errors.append(SemanticError(msg, line, col))
 
     def enter_scope(self, name, is_func=False):
-        print(f"DEBUG: Entering scope '{name}' with is_func={is_func}") 
+        log.debug("Entering scope '%s' with is_func=%s", name, is_func)
+        self.scope_count += 1
         self.scope = Scope(parent=self.scope, name=name, is_func_boundary=is_func)
 
     def exit_scope(self):
@@ -50,12 +104,83 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         return mapping.get(t_text, Type.ANY)
 
 
+    def _mark_impure(self):
+        """Побочный эффект в теле: ни одна из объемлющих лямбд и функций не чистая"""
+        for frame in self._purity_frames:
+            frame._is_pure = False
+
+    def _note_call_purity(self, name):
+        symbol, _ = self.scope.resolve(name)
+        if self._builtin_result(name) is not None:
+            if name not in self.PURE_BUILTINS:
+                self._mark_impure()
+        elif symbol is None or not getattr(symbol.node, '_is_pure', False):
+            # Замыкание из переменной или функция с побочными эффектами
+            self._mark_impure()
+
+    def _schema_owner(self):
+        return (self.scope, self.branch_depth)
+
+    def _strip_wrappers(self, ctx):
+        """Снимает обёртки Primary/PrimaryBase/скобки, возвращает внутренний узел"""
+        from gen.RelTableParser import RelTableParser
+        while True:
+            if isinstance(ctx, RelTableParser.PrimaryContext):
+                ctx = ctx.primaryExpr()
+            elif isinstance(ctx, RelTableParser.PrimaryBaseContext):
+                ctx = ctx.baseExpr()
+            elif isinstance(ctx, RelTableParser.BaseExprContext) and ctx.expr():
+                ctx = ctx.expr()
+            else:
+                return ctx
+
+    def _unwrap_expr(self, ctx):
+        """Снимает обёртки Primary/PrimaryBase/скобки, возвращает baseExpr или None"""
+        from gen.RelTableParser import RelTableParser
+        ctx = self._strip_wrappers(ctx)
+        return ctx if isinstance(ctx, RelTableParser.BaseExprContext) else None
+
+    def _symbol_of(self, expr_ctx):
+        base = self._unwrap_expr(expr_ctx)
+        if base is None or not base.Identifier():
+            return None
+        symbol, _ = self.scope.resolve(base.Identifier().getText())
+        return symbol
+
+    def _schema_of(self, expr_ctx):
+        """Схема таблицы, которую вычисляет выражение (если она известна)"""
+        base = self._unwrap_expr(expr_ctx)
+        if base is None:
+            # Конвейер t | where ... хранит схему результата у себя
+            return getattr(self._strip_wrappers(expr_ctx), '_schema', None)
+        if base.Identifier():
+            symbol, _ = self.scope.resolve(base.Identifier().getText())
+            return symbol.schema if symbol else None
+        if base.selectExpr():
+            return getattr(base.selectExpr(), '_schema', None)
+        return None
+
+    def _string_literal(self, expr_ctx):
+        base = self._unwrap_expr(expr_ctx)
+        if base is not None and base.literal() and base.literal().StringLiteral():
+            return base.literal().StringLiteral().getText()[1:-1]
+        return None
+
     def visitProgram(self, ctx):
-        return self.visitChildren(ctx)
+        self.visitChildren(ctx)
+        if not self._schemas_reliable:
+            # Колонки добавлялись в обход отслеживаемых схем: слоты могли сместиться,
+            # поэтому все обращения к колонкам остаются поиском по имени
+            for node, attr in self._schema_annotations:
+                setattr(node, attr, None)
+        return None
 
     def visitFuncDecl(self, ctx):
         name = ctx.Identifier().getText()
         self.scope.define(name, Symbol(name, Type.FUNCTION, ctx))
+        # Рекурсивные вызовы считаются чистыми, пока в теле не найден побочный эффект
+        ctx._is_pure = True
+        self._purity_frames.append(ctx)
 
         self.enter_scope(f"func_{name}", is_func=True)
 
@@ -67,11 +192,12 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
                 p_type = self._get_type_from_ctx(type_node)
                 
                 self.scope.define(p_name, Symbol(p_name, p_type, p))
-                print(f"DEBUG: Defined parameter '{p_name}' in scope {self.scope.name}")
+                log.debug("Defined parameter '%s' in scope %s", p_name, self.scope.name)
 
         self.visit(ctx.block())
         
         self.exit_scope()
+        self._purity_frames.pop()
         return Type.FUNCTION
 
     def visitBlock(self, ctx):
@@ -80,9 +206,29 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         self.exit_scope()
 
 
+    def _note_access(self, symbol, kind):
+        for frame in self._loop_frames:
+            frame.setdefault(symbol, kind)
+
+    def _visit_branches(self, branches, exhaustive):
+        """Обходит взаимоисключающие ветви: drop_table в одной не виден в другой"""
+        before = dict(self._dropped)
+        after = {} if exhaustive else dict(before)
+        for branch in branches:
+            self._dropped = dict(before)
+            self.visit(branch)
+            after.update(self._dropped)
+        # После ветвления таблица считается освобождённой, если её освободила хоть одна ветвь
+        self._dropped = after
+
     def visitIfStmt(self, ctx):
-        self.visit(ctx.expr(0)) 
-        return self.visitChildren(ctx)
+        conditions = ctx.expr()
+        for cond in conditions:
+            self.visit(cond)
+        bodies = [c for c in ctx.children[1:] if isinstance(c, ParserRuleContext) and c not in conditions]
+        self.branch_depth += 1
+        self._visit_branches(bodies, exhaustive=ctx.ELSE() is not None)
+        self.branch_depth -= 1
 
     def visitForStmt(self, ctx):
         iter_name = ctx.Identifier().getText()
@@ -91,15 +237,26 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
 
         self.enter_scope("for_loop")
         self.scope.define(iter_name, Symbol(iter_name, Type.INT, ctx))
+        self.branch_depth += 1
+        before = dict(self._dropped)
+        self._loop_frames.append({})
         self.visit(ctx.children[-1])
+        accesses = self._loop_frames.pop()
+        for symbol, drop_ctx in self._dropped.items():
+            # Освобождённая в теле таблица, которую следующая итерация читает до присваивания
+            if symbol not in before and accesses.get(symbol) == 'use':
+                self.error(f"Table '{symbol.name}' is dropped inside a loop and used again on the next iteration", drop_ctx)
+        # Тело может не выполниться ни разу
+        self._dropped.update(before)
+        self.branch_depth -= 1
         self.exit_scope()
 
     def visitSwitchStmt(self, ctx):
         if ctx.expr(): self.visit(ctx.expr())
-        for case in ctx.switchCase():
-            self.visit(case)
-        if ctx.defaultCase():
-            self.visit(ctx.defaultCase())
+        self.branch_depth += 1
+        branches = list(ctx.switchCase()) + ([ctx.defaultCase()] if ctx.defaultCase() else [])
+        self._visit_branches(branches, exhaustive=ctx.defaultCase() is not None)
+        self.branch_depth -= 1
 
     def visitReturnStmt(self, ctx):
         curr = self.scope
@@ -127,22 +284,83 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
             if not symbol:
                 self.error(f"Undefined variable '{name}'", ctx)
                 return Type.ANY
+            if symbol in self._dropped:
+                self.error(f"Table '{name}' is used after drop_table", ctx)
+            self._note_access(symbol, 'use')
             return symbol.type
-        
+        if child.expr():
+            # Скобки: тип вложенного выражения
+            return self.visit(child.expr())
         
         return self.visit(child)
     
+    def _builtin_result(self, name):
+        """Тип результата, если name — встроенная функция, а не переменная пользователя"""
+        symbol, _ = self.scope.resolve(name)
+        if symbol is not None and symbol is self.global_scope.symbols.get(name) and symbol.node is None:
+            return self.BUILTIN_RESULTS.get(name, Type.ANY)
+        return None
+
     def visitPrimaryCall(self, ctx):
         """Вызов функции: f(x)"""
         self.visit(ctx.primaryExpr())
         if ctx.argList():
             self.visit(ctx.argList())
+        base = self._unwrap_expr(ctx.primaryExpr())
+        if base is None or not base.Identifier():
+            self._mark_impure()
+        else:
+            self._note_call_purity(base.Identifier().getText())
+        if base is not None and base.Identifier():
+            result = self._builtin_result(base.Identifier().getText())
+            if result is not None:
+                return self._note_builtin(base.Identifier().getText(), ctx, result)
         return Type.ANY
 
+    def visitFuncCallExpr(self, ctx):
+        """Вызов функции как оператор: f(x);"""
+        name = ctx.Identifier().getText()
+        symbol, _ = self.scope.resolve(name)
+        if not symbol:
+            self.error(f"Undefined function '{name}'", ctx)
+        if ctx.argList():
+            self.visit(ctx.argList())
+        self._note_call_purity(name)
+        result = self._builtin_result(name)
+        if result is None:
+            return Type.ANY
+        return self._note_builtin(name, ctx, result)
+
+    def _note_builtin(self, name, ctx, result):
+        """Учитывает действие встроенной функции в схемах; возвращает тип результата"""
+        args = ctx.argList().expr() if ctx.argList() else []
+        if name == "create_index" and len(args) == 2:
+            schema = self._schema_of(args[0])
+            col_name = self._string_literal(args[1])
+            if schema is not None and col_name is not None:
+                schema.indexes.add(col_name)
+        if name in self.COLUMN_TYPED_AGGREGATES and len(args) == 2:
+            schema = self._schema_of(args[0])
+            col_name = self._string_literal(args[1])
+            slot = schema.slot(col_name) if schema is not None and col_name is not None else None
+            if slot and slot[1] == Type.INT:
+                result = Type.INT
+        # Тип результата нужен кодогенератору: агрегат по int-колонке возвращает int
+        ctx._result_type = result
+        return result
+
     def visitPrimaryMember(self, ctx):
         """Доступ к полю: row.age"""
         self.visit(ctx.primaryExpr()) 
-        
+        ctx._column_slot = None
+
+        symbol = self._symbol_of(ctx.primaryExpr())
+        if symbol and symbol.type == Type.ROW and symbol.schema:
+            slot = symbol.schema.slot(ctx.Identifier().getText())
+            if slot:
+                ctx._column_slot, ctx._column_type = slot
+                self._schema_annotations.append((ctx, '_column_slot'))
+                return ctx._column_type
         return Type.ANY
 
     def visitPrimaryIndex(self, ctx):
@@ -152,36 +370,79 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         return Type.ANY
 
     def visitLambdaExpr(self, ctx):
+        row_schemas = self._pending_row_schemas or []
+        self._pending_row_schemas = None
+        # Сколько первых параметров — строки таблиц из select
+        ctx._row_arity = len(row_schemas)
+        ctx._is_pure = True
+        self._purity_frames.append(ctx)
         self.enter_scope("lambda", is_func=True)
+        if len(row_schemas) > 1:
+            # Предикат соединения получает ровно по строке на таблицу
+            if ctx.lambdaParamList():
+                param_count = len(ctx.lambdaParamList().lambdaParam())
+            else:
+                param_count = 1 if ctx.lambdaName() else 0
+            if param_count != len(row_schemas):
+                self.error("Select over several tables needs a lambda with one parameter per table", ctx)
      
         if ctx.lambdaParamList():
             l_params = ctx.lambdaParamList().lambdaParam()
-            for lp in l_params:
+            for i, lp in enumerate(l_params):
                 p_name = lp.Identifier().getText()
                 type_node = lp.type_() if hasattr(lp, 'type_') else (lp.type() if hasattr(lp, 'type') else None)
                 p_type = self._get_type_from_ctx(type_node)
-                self.scope.define(p_name, Symbol(p_name, p_type, lp))
-                print(f"DEBUG: Defined lambda parameter '{p_name}'")
+                symbol = Symbol(p_name, p_type, lp)
+                if i < len(row_schemas) and p_type in (Type.ROW, Type.ANY):
+                    symbol.type, symbol.schema = Type.ROW, row_schemas[i]
+                self.scope.define(p_name, symbol)
+                log.debug("Defined lambda parameter '%s'", p_name)
         elif ctx.lambdaName():
             p_name = ctx.lambdaName().getText()
-            self.scope.define(p_name, Symbol(p_name, Type.ANY, ctx.lambdaName()))
+            if row_schemas:
+                self.scope.define(p_name, Symbol(p_name, Type.ROW, ctx.lambdaName(), schema=row_schemas[0]))
+            else:
+                self.scope.define(p_name, Symbol(p_name, Type.ANY, ctx.lambdaName()))
 
         self.visit(ctx.block() if ctx.block() else ctx.expr())
         ctx._captured_vars = self.scope.captured_symbols.copy()
         self.exit_scope()
+        self._purity_frames.pop()
         return Type.FUNCTION
 
     def visitAssignStmt(self, ctx):
         name = ctx.Identifier().getText()
         expr_type = self.visit(ctx.expr())
+        if expr_type == Type.VOID:
+            self.error(f"Cannot assign '{ctx.expr().getText()}' to '{name}': it has no value", ctx)
+            expr_type = Type.ANY
+
+        schema = None
+        if expr_type == Type.TABLE:
+            source = self._symbol_of(ctx.expr())
+            if source is not None:
+                # Псевдоним той же таблицы делит с ней схему
+                schema = source.schema
+            elif self._schema_of(ctx.expr()) is not None:
+                schema = self._schema_of(ctx.expr()).copy(owner=self._schema_owner())
         
-        symbol, _ = self.scope.resolve(name)
+        symbol, is_captured = self.scope.resolve(name)
+        if is_captured:
+            self._mark_impure()
+        if symbol in self._dropped and self.scope.symbols.get(name) is not symbol:
+            # Кодогенератор заведёт переменную в текущем скоупе, внешняя останется освобождённой
+            symbol = None
         if not symbol:
             
-            self.scope.define(name, Symbol(name, expr_type, ctx))
+            symbol = Symbol(name, expr_type, ctx, schema=schema)
+            self.scope.define(name, symbol)
         else:
             
             symbol.type = expr_type
+            symbol.schema = schema
+            # Новое значение: освобождённая раньше таблица больше не видна через имя
+            self._dropped.pop(symbol, None)
+        self._note_access(symbol, 'assign')
 
     def visitLiteral(self, ctx):
         if ctx.IntegerLiteral(): return Type.INT
@@ -191,13 +452,97 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         return Type.ANY
 
     def visitSelectExpr(self, ctx):
+        # Результат select регистрируется у исходной таблицы — это изменение общих данных
+        self._mark_impure()
         tbl_type = self.visit(ctx.expr(0))
         if tbl_type != Type.TABLE and tbl_type != Type.ANY:
             self.error("Selection source must be a table", ctx)
         
+        for extra in ctx.expr()[1:]:
+            if self.visit(extra) not in (Type.TABLE, Type.ANY):
+                self.error("Selection source must be a table", extra)
+
+        schemas = [self._schema_of(e) for e in ctx.expr()]
+        source_schema = schemas[0]
+        ctx._schema = source_schema
+        ctx._indexed_columns = frozenset()
+        if len(schemas) > 1:
+            # Строки соединения — колонки всех таблиц подряд, в порядке перечисления
+            known = all(s is not None and not s.is_dynamic for s in schemas)
+            ctx._schema = TableSchema(self._join_columns(schemas)) if known else None
+        elif source_schema:
+            # Индексы есть только у исходной таблицы, не у результата вложенного select
+            source = self._unwrap_expr(ctx.expr(0))
+            if source is not None and source.Identifier() is not None:
+                ctx._indexed_columns = frozenset(source_schema.indexes)
         
         if ctx.whereClause():
+            # Лямбда получает по строке из каждой таблицы
+            self._pending_row_schemas = schemas
             self.visit(ctx.whereClause())
+            self._pending_row_schemas = None
+        if ctx.groupClause():
+            ctx._schema = self._group_schema(ctx.groupClause(), ctx._schema)
+        return Type.TABLE
+
+    def _join_columns(self, schemas):
+        """Колонки результата соединения: имя, уже занятое колонкой предыдущей таблицы,
+        получает суффикс _<номер таблицы> (как join_column_name в runtime)"""
+        columns, taken = [], set()
+        for number, schema in enumerate(schemas, 1):
+            for name, col_type in schema.columns:
+                while name in taken:
+                    name = f"{name}_{number}"
+                taken.add(name)
+                columns.append((name, col_type))
+        return columns
+
+    def _group_schema(self, group_ctx, schema):
+        """Схема результата group by: ключи, count, затем sum_/min_/max_/avg_ для числовых колонок;
+        тип колонки сохраняют только min_ и max_"""
+        keys = [k.getText() for k in group_ctx.Identifier()]
+        if schema is None or schema.is_dynamic:
+            return None
+        for key in keys:
+            if schema.slot(key) is None:
+                self.error(f"Unknown group by column '{key}'", group_ctx)
+                return None
+        columns = [(key, schema.slot(key)[1]) for key in keys]
+        columns.append(("count", Type.INT))
+        for col_name, col_type in schema.columns:
+            if col_name in keys or col_type not in (Type.INT, Type.DECIMAL):
+                continue
+            columns += [(f"sum_{col_name}", Type.DECIMAL), (f"min_{col_name}", col_type),
+                        (f"max_{col_name}", col_type), (f"avg_{col_name}", Type.DECIMAL)]
+        return TableSchema(columns)
+
+    def visitPipeOp(self, ctx):
+        """Конвейер: source | where p | group by k | select a, b"""
+        self._mark_impure()
+        source_type = self.visit(ctx.expr())
+        if source_type not in (Type.TABLE, Type.ANY):
+            self.error("Pipeline source must be a table", ctx)
+        schema = self._schema_of(ctx.expr())
+        stage = ctx.pipeStage()
+        ctx._schema = schema
+        if stage.WHERE():
+            self._pending_row_schemas = [schema]
+            self.visit(stage.primaryExpr())
+            self._pending_row_schemas = None
+        elif stage.groupClause():
+            ctx._schema = self._group_schema(stage.groupClause(), schema)
+        elif schema is not None and not schema.is_dynamic:
+            columns = []
+            for name in (n.getText() for n in stage.Identifier()):
+                slot = schema.slot(name)
+                if slot is None:
+                    self.error(f"Unknown column '{name}' in pipeline select", stage)
+                    ctx._schema = None
+                    return Type.TABLE
+                columns.append((name, slot[1]))
+            ctx._schema = TableSchema(columns)
+        else:
+            ctx._schema = None
         return Type.TABLE
 
     def visitWhereClause(self, ctx):
@@ -213,12 +558,27 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         return Type.TABLE
     
     def visitUpdateStmt(self, ctx):
+        self._mark_impure()
         for expr in ctx.expr():
             self.visit(expr)
 
     def visitWriteStmt(self, ctx):
-        for expr in ctx.expr():
-            self.visit(expr)
+        """write(a, b, ...) — значения по одному в строке; write(table[, format]) — таблица целиком"""
+        self._mark_impure()
+        types = [self.visit(expr) for expr in ctx.expr()]
+        ctx._writes_table = types[0] == Type.TABLE
+        if ctx._writes_table:
+            fmt = self._string_literal(ctx.expr(1)) if len(types) == 2 else None
+            if len(types) > 2 or (len(types) == 2 and types[1] not in (Type.STRING, Type.ANY)):
+                self.error("write(table, format) expects a string format", ctx)
+            elif fmt is not None and fmt not in self.WRITE_FORMATS:
+                self.error(f"Unknown write format '{fmt}', expected one of: {', '.join(self.WRITE_FORMATS)}", ctx)
+            return
+        for expr, expr_type in zip(ctx.expr(), types):
+            if expr_type == Type.VOID:
+                self.error(f"write() argument '{expr.getText()}' has no value", expr)
+            elif expr_type in (Type.TABLE, Type.ROW, Type.FUNCTION):
+                self.error("write() expects numbers, strings, bools or a single table", expr)
     
     def visitAddOp(self, ctx):
         t1 = self.visit(ctx.expr(0))
@@ -227,15 +587,55 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
         return Type.INT
 
     def visitCompareOp(self, ctx):
-        self.visit(ctx.expr(0))
-        self.visit(ctx.expr(1))
+        left = self.visit(ctx.expr(0))
+        right = self.visit(ctx.expr(1))
+        non_strings = (Type.INT, Type.DECIMAL, Type.BOOL, Type.TABLE, Type.ROW, Type.FUNCTION)
+        if ctx.CONTAINS() and (left in non_strings or right in non_strings):
+            self.error("'contains' expects string operands", ctx)
+        kinds = {Type.INT: "number", Type.DECIMAL: "number", Type.STRING: "string", Type.BOOL: "bool"}
+        if left in kinds and right in kinds and kinds[left] != kinds[right]:
+            self.error(f"Cannot compare {kinds[left]} with {kinds[right]}", ctx)
+        # Поле строки без схемы (таблица из load_table): тип колонки известен только
+        # при выполнении, поэтому поле читается по типу второго операнда
+        left_field = self._schemaless_field(ctx.expr(0), left)
+        right_field = self._schemaless_field(ctx.expr(1), right)
+        if ctx.CONTAINS():
+            for field in (left_field, right_field):
+                if field is not None:
+                    field._column_type = Type.STRING
+        elif left_field is not None and right_field is not None:
+            ctx._compare_fields = (left_field, right_field)
+        elif left_field is not None:
+            left_field._column_type = self._field_type_like(right)
+        elif right_field is not None:
+            right_field._column_type = self._field_type_like(left)
         return Type.BOOL
+
+    def _schemaless_field(self, expr_ctx, expr_type):
+        """Узел row.col, тип которого анализатор не знает, иначе None"""
+        from gen.RelTableParser import RelTableParser
+        node = self._strip_wrappers(expr_ctx)
+        if expr_type == Type.ANY and isinstance(node, RelTableParser.PrimaryMemberContext):
+            return node
+        return None
+
+    def _field_type_like(self, other):
+        """Как читать поле неизвестного типа, сравниваемое с other: числа — как decimal,
+        чтобы не обрезать дробную часть; int-колонка читается точно"""
+        if other in (Type.INT, Type.DECIMAL):
+            return Type.DECIMAL
+        if other in (Type.STRING, Type.BOOL):
+            return other
+        return None
         
     def visitCreateTable(self, ctx):
         if ctx.Identifier():
             name = ctx.Identifier().getText()
             
-            self.scope.define(name, Symbol(name, Type.TABLE, ctx))
+            schema = TableSchema(owner=self._schema_owner())
+            symbol = Symbol(name, Type.TABLE, ctx, schema=schema)
+            self.scope.define(name, symbol)
+            self._note_access(symbol, 'assign')
         
         if ctx.expr():
             self.visit(ctx.expr())
@@ -245,15 +645,48 @@ class RelTableSemanticAnalyzer(ParseTreeVisitor):
     def visitAddColumn(self, ctx):
         self.visit(ctx.expr(0)) 
         self.visit(ctx.expr(1))
+
+        symbol = self._symbol_of(ctx.expr(0))
+        col_name = self._string_literal(ctx.expr(1))
+        if symbol is None or symbol.schema is None:
+            self._schemas_reliable = False
+        elif col_name is None or symbol.schema.owner != self._schema_owner():
+            symbol.schema.is_dynamic = True
+        else:
+            symbol.schema.add_column(col_name, self._get_type_from_ctx(ctx.type_()))
+        return Type.VOID
+
+    def visitDeleteColumn(self, ctx):
+        self.visitChildren(ctx)
+        self._schemas_reliable = False
         return Type.VOID
 
     def visitAddRow(self, ctx):
         for expr in ctx.expr():
             self.visit(expr)
+
+        # Типы колонок по порядку: по ним кодогенератор раскладывает значения в буферы
+        ctx._row_types = None
+        symbol = self._symbol_of(ctx.expr(0))
+        schema = symbol.schema if symbol else None
+        if schema and not schema.is_dynamic and len(schema.columns) == len(ctx.expr()) - 1:
+            ctx._row_types = [col_type for _, col_type in schema.columns]
+            self._schema_annotations.append((ctx, '_row_types'))
         return Type.VOID
 
     def visitTableStmt(self, ctx):
+        self._mark_impure()
         return self.visitChildren(ctx)
+
+    def visitDropStmt(self, ctx):
+        self._mark_impure()
+        self.visitChildren(ctx)
+        # Кодогенератор обнуляет переменную после освобождения
+        symbol = self._symbol_of(ctx.expr())
+        ctx._dropped_var = symbol.name if symbol else None
+        if symbol is not None:
+            self._dropped[symbol] = ctx
+        return Type.VOID
    
     def get_var(self, name):
         for scope in reversed(self.scopes):
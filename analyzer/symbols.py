@@ -11,11 +11,41 @@ class Type(Enum):
     VOID = auto()
     ANY = auto()
 
+class TableSchema:
+    """Известная на этапе компиляции часть схемы таблицы.
+
+    Колонки только дописываются в конец, поэтому слоты уже известных колонок
+    стабильны. После неизвестного add_column (в условии, цикле, с вычисляемым
+    именем) схема помечается динамической и новые колонки не отслеживаются.
+    """
+    def __init__(self, columns=None, is_dynamic=False, owner=None):
+        self.columns = list(columns or [])
+        self.is_dynamic = is_dynamic
+        # Контекст (скоуп, глубина ветвлений), где add_column считается безусловным
+        self.owner = owner
+        # Колонки с хеш-индексом (create_index); у результата select индексов нет
+        self.indexes = set()
+
+    def add_column(self, name, col_type):
+        if not self.is_dynamic:
+            self.columns.append((name, col_type))
+
+    def slot(self, name):
+        """Возвращает (индекс, тип) колонки или None"""
+        for i, (col_name, col_type) in enumerate(self.columns):
+            if col_name == name:
+                return i, col_type
+        return None
+
+    def copy(self, owner=None):
+        return TableSchema(self.columns, self.is_dynamic, owner)
+
 class Symbol:
-    def __init__(self, name, type_obj, node=None):
+    def __init__(self, name, type_obj, node=None, schema=None):
         self.name = name
         self.type = type_obj
         self.node = node
+        self.schema = schema
 
 class Scope:
     def __init__(self, parent=None, name="global", is_func_boundary=False):  
@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+import time
+from compiler.jit import load_module, flush_output
+
+# Запуск скомпилированной программы в отдельном процессе: статистика запросов
+# runtime (RELTABLE_STATS) пишется при выходе процесса и не смешивается между программами.
+
+def main(argv):
+    if len(argv) != 4:
+        print("Usage: python -m bench.execute <program.ll> <runtime_lib> <opt_level> <result.json>")
+        return 2
+    ir_path, runtime_lib, opt_level, result_path = argv
+    with open(ir_path, "r", encoding="utf-8") as f:
+        ir_text = f.read()
+
+    start = time.perf_counter()
+    engine, program_main = load_module(ir_text, os.path.abspath(runtime_lib), int(opt_level))
+    jit = time.perf_counter() - start
+
+    start = time.perf_counter()
+    code = program_main()
+    run = time.perf_counter() - start
+    flush_output(os.path.abspath(runtime_lib))
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"exit_code": code, "jit_ms": round(jit * 1000, 3), "main_ms": round(run * 1000, 3)}, f)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+import build
+from .workloads import PRESETS, preset, generate
+
+# Бенчмарк компилятора и runtime на синтетических программах.
+# Для каждой программы: время фаз main_compiler.py (--profile) и самого процесса
+# компиляции, время JIT и main, строки в секунду для select, group by, join
+# (по статистике RELTABLE_STATS) и для add_row (отдельная программа только с наполнением).
+# Из нескольких повторов берётся лучший результат каждой метрики.
+
+USAGE = ("Usage: python -m bench.run [--only NAME[,NAME]] [--repeat N] [-O0|-O1|-O2|-O3] "
+         "[--save baseline.json] [--compare baseline.json] [--threshold PCT] [--keep DIR]")
+
+# Разница времени меньше этого порога (в мс) считается шумом и не сравнивается
+NOISE_FLOOR_MS = 5.0
+# Скорость по замеру короче этого (в нс) не считается: слишком шумная
+RATE_MIN_NS = 1000000
+# Какие операции статистики запросов попадают в какую метрику
+RATE_OPS = {
+    "select_rows_per_sec": ("select", "scan", "index_scan"),
+    "group_rows_per_sec": ("group",),
+    "join_rows_per_sec": ("join",),
+}
+
+class BenchError(Exception):
+    pass
+
+class BenchOptions:
+    def __init__(self):
+        self.workloads = list(PRESETS)
+        self.repeat = 3
+        self.opt_level = 2
+        self.save = None
+        self.compare = None
+        self.threshold = 10.0
+        self.keep = None
+
+def parse_args(argv):
+    options = BenchOptions()
+    it = iter(argv)
+    for arg in it:
+        if arg in ("-O0", "-O1", "-O2", "-O3"):
+            options.opt_level = int(arg[2])
+        elif arg in ("--only", "--repeat", "--save", "--compare", "--threshold", "--keep"):
+            value = next(it, None)
+            if value is None:
+                raise BenchError(f"{arg} needs a value")
+            if arg == "--only":
+                options.workloads = value.split(",")
+            elif arg == "--repeat":
+                options.repeat = max(1, int(value))
+            elif arg == "--threshold":
+                options.threshold = float(value)
+            else:
+                setattr(options, arg[2:], value)
+        else:
+            raise BenchError(f"Unknown argument '{arg}'")
+    for name in options.workloads:
+        preset(name)
+    return options
+
+def run_checked(cmd, env=None):
+    result = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise BenchError(f"{' '.join(cmd)} failed with code {result.returncode}:\n{result.stderr}")
+
+def compile_program(source, ir_path, opt_level, workdir):
+    """main_compiler.py в отдельном процессе — как при обычной сборке, с холодными кешами парсера"""
+    profile_path = os.path.join(workdir, "profile.json")
+    start = time.perf_counter()
+    run_checked([sys.executable, build.COMPILER_SCRIPT, f"-O{opt_level}", f"--profile={profile_path}", source, ir_path])
+    wall = time.perf_counter() - start
+    with open(profile_path, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    return {
+        "process_ms": round(wall * 1000, 3),
+        "total_ms": profile["total_ms"],
+        "phases": {p["phase"] + "_ms": p["wall_ms"] for p in profile["phases"]},
+        "peak_bytes": max((p["peak_bytes"] for p in profile["phases"]), default=0),
+        "counts": profile["counts"],
+    }
+
+def execute_program(ir_path, runtime_lib, opt_level, workdir):
+    """Возвращает (результат bench.execute, статистику запросов)"""
+    result_path = os.path.join(workdir, "result.json")
+    stats_path = os.path.join(workdir, "stats.json")
+    env = dict(os.environ, RELTABLE_STATS=stats_path)
+    run_checked([sys.executable, "-m", "bench.execute", ir_path, runtime_lib, str(opt_level), result_path], env)
+    with open(result_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    sites = []
+    if os.path.exists(stats_path):
+        with open(stats_path, "r", encoding="utf-8") as f:
+            sites = json.load(f)["sites"]
+        os.remove(stats_path)
+    return result, sites
+
+def rows_per_sec(sites, ops):
+    rows = sum(s["rows_scanned"] for s in sites if s["op"] in ops)
+    ns = sum(s["ns"] for s in sites if s["op"] in ops)
+    return round(rows / ns * 1e9) if ns >= RATE_MIN_NS else None
+
+def run_workload(workload, workdir, runtime_lib, opt_level, repeat):
+    paths = {}
+    for kind, ingest_only in (("program", False), ("ingest", True)):
+        paths[kind] = os.path.join(workdir, f"{workload.name}_{kind}.dsl")
+        with open(paths[kind], "w", encoding="utf-8") as f:
+            f.write(generate(workload, ingest_only))
+    program_ir = os.path.join(workdir, f"{workload.name}_program.ll")
+    ingest_ir = os.path.join(workdir, f"{workload.name}_ingest.ll")
+    run_checked([sys.executable, build.COMPILER_SCRIPT, f"-O{opt_level}", paths["ingest"], ingest_ir])
+
+    samples = []
+    for _ in range(repeat):
+        compiled = compile_program(paths["program"], program_ir, opt_level, workdir)
+        result, sites = execute_program(program_ir, runtime_lib, opt_level, workdir)
+        runtime = {"jit_ms": result["jit_ms"], "main_ms": result["main_ms"]}
+        for metric, ops in RATE_OPS.items():
+            rate = rows_per_sec(sites, ops)
+            if rate is not None:
+                runtime[metric] = rate
+        runtime["allocated_bytes"] = sum(s["bytes_allocated"] for s in sites)
+
+        ingest, _ = execute_program(ingest_ir, runtime_lib, opt_level, workdir)
+        if ingest["main_ms"] * 1e6 >= RATE_MIN_NS:
+            runtime["ingest_rows_per_sec"] = round(workload.ingested_rows() * 1000 / ingest["main_ms"])
+        samples.append({"compile": compiled, "runtime": runtime})
+    return dict(params=workload.params(), **best_of(samples))
+
+def best_of(samples):
+    """Лучшее значение каждой метрики по повторам: минимум времени, максимум скорости"""
+    merged = {}
+    for key, first in samples[0].items():
+        values = [s[key] for s in samples if s.get(key) is not None]
+        if isinstance(first, dict):
+            merged[key] = best_of(values)
+        elif key.endswith("_per_sec"):
+            merged[key] = max(values)
+        elif key.endswith("_ms"):
+            merged[key] = min(values)
+        else:
+            merged[key] = first
+    return merged
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+def compare(baseline, report, threshold):
+    """Печатает изменения метрик относительно baseline; возвращает число регрессий"""
+    if baseline.get("meta", {}).get("opt_level") != report["meta"]["opt_level"]:
+        print(f"warning: baseline was recorded at -O{baseline.get('meta', {}).get('opt_level')}, "
+              f"current run is -O{report['meta']['opt_level']}")
+    regressions = 0
+    factor = 1 + threshold / 100
+    for name, result in report["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if base is None:
+            print(f"{name}: not in baseline")
+            continue
+        old_values = dict(flatten(base))
+        for key, new in flatten(result):
+            old = old_values.get(key)
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if key.endswith("_per_sec"):
+                worse, better = new < old / factor, new > old * factor
+            elif key.endswith("_ms") or key.endswith("_bytes"):
+                if key.endswith("_ms") and abs(new - old) < NOISE_FLOOR_MS:
+                    continue
+                worse, better = new > old * factor, new < old / factor
+            else:
+                continue
+            if worse or better:
+                change = (new - old) / old * 100
+                verdict = "REGRESSION" if worse else "improved"
+                print(f"{name:10} {key:40} {old:>14,} -> {new:>14,} ({change:+.1f}%) {verdict}")
+            regressions += worse
+    print(f"{regressions} regression(s) beyond {threshold:g}%")
+    return regressions
+
+def print_report(report):
+    for name, result in report["workloads"].items():
+        compiled, runtime = result["compile"], result["runtime"]
+        phases = ", ".join(f"{k[:-3]} {v:.1f}" for k, v in compiled["phases"].items())
+        print(f"{name}: compile {compiled['total_ms']:.1f} ms ({phases}), process {compiled['process_ms']:.1f} ms")
+        rates = "".join(f", {k[:-8]} {v:,} rows/s" for k, v in runtime.items() if k.endswith("_per_sec"))
+        print(f"{' ' * len(name)}  run: jit {runtime['jit_ms']:.1f} ms, main {runtime['main_ms']:.1f} ms{rates}")
+
+def environment(options):
+    import llvmlite
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "llvmlite": llvmlite.__version__,
+        "opt_level": options.opt_level,
+        "repeat": options.repeat,
+    }
+
+def main(argv):
+    try:
+        options = parse_args(argv)
+    except (BenchError, ValueError) as e:
+        print(e)
+        print(USAGE)
+        return 2
+
+    build.ensure_build_dir()
+    runtime_lib = build.build_runtime_library([sys.executable, "-m", "ziglang", "cc"], build.BuildCache())
+    report = {"meta": environment(options), "workloads": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = options.keep or tmp
+        os.makedirs(workdir, exist_ok=True)
+        for name in options.workloads:
+            print(f"[BENCH] {name} x{options.repeat}", flush=True)
+            try:
+                report["workloads"][name] = run_workload(preset(name), workdir, runtime_lib, options.opt_level, options.repeat)
+            except BenchError as e:
+                print(e)
+                return 1
+    print_report(report)
+
+    if options.save:
+        with open(options.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {options.save}")
+    if options.compare:
+        with open(options.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, report, options.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,172 @@
+import sys
+import random
+
+# Генератор синтетических программ на DSL для бенчмарков.
+# Параметры: tables таблиц по columns int-колонок (плюс строковая name), rows строк
+# через add_row в цикле, selects выборок с захваченными переменными, вложенность
+# for/if/switch глубины depth и funcs именованных функций.
+
+# Предустановки: нагрузка на ingest и select, на разбор и кодогенерацию
+PRESETS = {
+    "ingest": dict(tables=2, columns=6, rows=200000, selects=4, depth=2, funcs=2),
+    "select": dict(tables=4, columns=8, rows=100000, selects=24, depth=2, funcs=4),
+    "wide": dict(tables=8, columns=24, rows=5000, selects=32, depth=4, funcs=16),
+    "control": dict(tables=1, columns=4, rows=1000, selects=2, depth=24, funcs=8),
+    "funcs": dict(tables=1, columns=4, rows=1000, selects=2, depth=3, funcs=100),
+}
+
+class Workload:
+    """Параметры одной синтетической программы"""
+
+    def __init__(self, name, tables, columns, rows, selects, depth, funcs, seed=1):
+        if tables < 1 or columns < 2:
+            raise ValueError("workload needs at least one table and two columns")
+        self.name = name
+        self.tables = tables
+        self.columns = columns
+        self.rows = rows
+        self.selects = selects
+        self.depth = depth
+        self.funcs = funcs
+        self.seed = seed
+
+    def params(self):
+        return {k: getattr(self, k) for k in ("tables", "columns", "rows", "selects", "depth", "funcs", "seed")}
+
+    def ingested_rows(self):
+        return self.tables * self.rows
+
+def preset(name):
+    if name not in PRESETS:
+        raise ValueError(f"Unknown workload '{name}', expected one of: {', '.join(PRESETS)}")
+    return Workload(name, **PRESETS[name])
+
+class ProgramWriter:
+    """Собирает текст программы построчно с отступами"""
+
+    def __init__(self):
+        self.lines = []
+        self.level = 0
+
+    def line(self, text=""):
+        self.lines.append("    " * self.level + text if text else "")
+
+    def open(self, text):
+        self.line(text + " {")
+        self.level += 1
+
+    def close(self):
+        self.level -= 1
+        self.line("}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+def generate(workload, ingest_only=False):
+    """Текст программы; ingest_only — только создание и наполнение таблиц"""
+    rnd = random.Random(workload.seed)
+    out = ProgramWriter()
+    out.line(f"// bench/workloads.py: {workload.name} {workload.params()}")
+
+    # Колонка c<j> = (i * p) mod m: разные распределения при тех же строках
+    mixes = [(rnd.choice((7, 13, 31, 37, 61, 97)), rnd.choice((10, 50, 100, 1000, 5000))) for _ in range(workload.columns)]
+    for t in range(workload.tables):
+        out.line(f't{t} = create_table("t{t}");')
+        out.line(f'add_column(t{t}, "id", int);')
+        for j in range(1, workload.columns):
+            out.line(f'add_column(t{t}, "c{j}", int);')
+        out.line(f'add_column(t{t}, "name", string);')
+        values = ["i"] + [f"i * {p} - (i * {p} / {m}) * {m}" for p, m in mixes[1:]] + [f'"row{t}"']
+        out.open(f"for i = 1 to {workload.rows}")
+        out.line(f"add_row(t{t}, {', '.join(values)});")
+        out.close()
+    if ingest_only:
+        for t in range(workload.tables):
+            out.line(f"write(count(t{t}));")
+        return out.text()
+
+    _functions(out, workload)
+    _selects(out, workload, rnd, mixes)
+    _aggregates(out, workload)
+    out.line("n = 2;")
+    _control(out, workload, 0, "n")
+    return out.text()
+
+def _functions(out, workload):
+    # Именованные функции не видят глобальных имён, поэтому друг друга не вызывают
+    for k in range(workload.funcs):
+        out.open(f"func f{k}(int a, int b)")
+        out.line(f"x = a * {k % 7 + 2} + b;")
+        out.open(f"if x > {10 * (k % 5 + 1)}")
+        out.line(f"return x - b * {k % 3 + 1};")
+        out.close()
+        out.line("return x + 1;")
+        out.close()
+
+def _selects(out, workload, rnd, mixes):
+    # Условие берёт захваченные переменные; каждая третья выборка — через переменную-замыкание
+    for s in range(workload.selects):
+        t = s % workload.tables
+        a, b = rnd.sample(range(1, workload.columns), 2)
+        out.line(f"lim{s} = {rnd.randint(1, mixes[a][1])};")
+        out.line(f"lo{s} = {rnd.randint(0, mixes[b][1] // 2)};")
+        predicate = f"\\r => r.c{a} < lim{s} and r.c{b} >= lo{s}"
+        if s % 3 == 2:
+            out.line(f"p{s} = {predicate};")
+            out.line(f"q{s} = select(t{t}) where p{s};")
+        else:
+            out.line(f"q{s} = select(t{t}) where ({predicate});")
+        out.line(f"write(count(q{s}));")
+        out.line(f"drop_table(q{s});")
+
+def _aggregates(out, workload):
+    for t in range(workload.tables):
+        out.line(f"g{t} = select(t{t}) group by c1;")
+        out.line(f"write(count(g{t}));")
+        out.line(f"drop_table(g{t});")
+        out.line(f'write(sum(t{t}, "c2"));')
+        out.line(f'write(avg(t{t}, "c2"));')
+    if workload.tables > 1:
+        out.line("j = select(t0, t1) where ((a, b) => a.id == b.id and a.c1 < 10);")
+        out.line("write(count(j));")
+        out.line("drop_table(j);")
+
+def _control(out, workload, level, var):
+    """for / if-elif-else / switch по кругу, пока не наберётся depth уровней"""
+    call = f"f{level % workload.funcs}({var}, {level})" if workload.funcs else var
+    if level == workload.depth:
+        out.line(f"write({call});")
+        return
+    kind = level % 3
+    if kind == 0:
+        loop_var = f"i{level}"
+        out.open(f"for {loop_var} = 1 to 2")
+        _control(out, workload, level + 1, loop_var)
+        out.close()
+    elif kind == 1:
+        out.open(f"if {var} > 1")
+        _control(out, workload, level + 1, var)
+        out.close()
+        out.open(f"elif {var} == 1")
+        out.line(f"write({call});")
+        out.close()
+        out.open("else")
+        out.line(f"write({var});")
+        out.close()
+    else:
+        out.open(f"switch {var}")
+        out.line("case 0 to 1:")
+        out.level += 1
+        out.line(f"write({call});")
+        out.level -= 1
+        out.line("default:")
+        out.level += 1
+        _control(out, workload, level + 1, var)
+        out.level -= 1
+        out.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: python -m bench.workloads <{'|'.join(PRESETS)}> [--ingest]")
+        sys.exit(2)
+    sys.stdout.write(generate(preset(sys.argv[1]), ingest_only="--ingest" in sys.argv))
@@ -1,5 +1,8 @@
 import sys
 import os
+import glob
+import shutil
+import hashlib
 import subprocess
 
 BUILD_DIR = "build"
@@ -10,6 +13,15 @@ OUTPUT_IR = os.path.join(BUILD_DIR, "output.ll")
 RUNTIME_OBJ = os.path.join(BUILD_DIR, "runtime.obj")
 PROGRAM_OBJ = os.path.join(BUILD_DIR, "program.obj")
 OUTPUT_EXE = os.path.join(BUILD_DIR, "program.exe")
+# Runtime для --jit собирается под текущую систему и загружается в процесс
+RUNTIME_LIB = os.path.join(BUILD_DIR, {"nt": "runtime.dll"}.get(os.name, "runtime.dylib" if sys.platform == "darwin" else "runtime.so"))
+RUNTIME_TARGET = ["-target", "x86_64-windows-gnu"]
+
+# Кеш артефактов по хешу входов; старые записи вытесняются при превышении лимита (LRU)
+CACHE_DIR = os.path.join(BUILD_DIR, "cache")
+CACHE_LIMIT = int(os.environ.get("RELTABLE_BUILD_CACHE_MB", "512")) * 1024 * 1024
+# Всё, от чего зависит IR помимо самой программы
+COMPILER_SOURCES = [COMPILER_SCRIPT, "grammar/RelTable.g4", "analyzer/*.py", "compiler/*.py", "gen/*.py"]
 
 def print_step(msg):
     print(f"\n[BUILD] === {msg} ===")
@@ -27,28 +39,161 @@ def run_command(cmd):
         print(f"❌ ОШИБКА при выполнении команды.")
         sys.exit(1)
 
+def file_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def zig_version():
+    try:
+        from importlib.metadata import version
+        return version("ziglang")
+    except Exception:
+        return "unknown"
+
+class BuildCache:
+    """Артефакты сборки, адресуемые хешем всех своих входов"""
+
+    def __init__(self, directory=CACHE_DIR, limit=CACHE_LIMIT):
+        self.directory = directory
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, kind, *parts):
+        h = hashlib.sha256(kind.encode())
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode()
+            h.update(len(data).to_bytes(8, "little"))
+            h.update(data)
+        return h.hexdigest()
+
+    def build(self, key, output, produce):
+        """Кладёт артефакт key в output: из кеша или через produce(), результат которого запоминается"""
+        entry = os.path.join(self.directory, key)
+        if os.path.exists(entry):
+            self.hits += 1
+            os.utime(entry)  # для LRU
+            shutil.copyfile(entry, output)
+            print(f"[BUILD] Из кеша: {output}")
+            return
+        self.misses += 1
+        produce()
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        shutil.copyfile(output, tmp)
+        os.replace(tmp, entry)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".tmp") and os.path.isfile(path):
+                st = os.stat(path)
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.limit:
+                break
+            os.remove(path)
+            total -= size
+
+    def report(self):
+        print(f"[BUILD] Кеш: {self.hits} попаданий, {self.misses} промахов")
+
+def compiler_digest():
+    h = hashlib.sha256()
+    for pattern in COMPILER_SOURCES:
+        for path in sorted(glob.glob(pattern)):
+            h.update(path.encode())
+            h.update(file_bytes(path))
+    return h.hexdigest()
+
+def build_runtime_library(zig_cc, cache):
+    """runtime.c -> разделяемая библиотека под текущую систему"""
+    flags = ["-shared", "-O2"]
+    def compile_runtime():
+        print_step(f"Компиляция Runtime: {RUNTIME_SRC} -> {RUNTIME_LIB}")
+        run_command(zig_cc + flags + [RUNTIME_SRC, "-o", RUNTIME_LIB])
+    cache.build(cache.key("runtime-lib", file_bytes(RUNTIME_SRC), flags, zig_version(), sys.platform), RUNTIME_LIB, compile_runtime)
+    return RUNTIME_LIB
+
+def run_jit(source_file, zig_cc, options):
+    """Компиляция и запуск в этом же процессе, без объектных файлов и линковки"""
+    from main_compiler import compile_module, configure_logging
+    from compiler.jit import load_module, flush_output
+    from compiler.profiling import CompileProfile
+
+    cache = BuildCache()
+    runtime_lib = build_runtime_library(zig_cc, cache)
+    cache.report()
+    print_step(f"JIT (-O{options.opt_level}): {source_file}")
+    configure_logging(options.debug)
+    profile = CompileProfile(enabled=options.profile is not None)
+    llvm_module = compile_module(source_file, profile)
+    runtime_lib = os.path.abspath(runtime_lib)
+    engine, program_main = load_module(llvm_module, runtime_lib, options.opt_level, options.time_passes, profile)
+    if profile.enabled:
+        profile.emit(options.profile, input=source_file, opt_level=options.opt_level, jit=True)
+    print("-" * 40, flush=True)
+    code = program_main()
+    flush_output(runtime_lib)
+    print("-" * 40)
+    return code
+
 def main():
-    if len(sys.argv) < 2:
-        print("Использование: python build.py <файл_кода.dsl>")
+    from main_compiler import parse_args
+
+    args = sys.argv[1:]
+    jit = "--jit" in args
+    options, args = parse_args([a for a in args if a != "--jit"])
+    if not args:
+        print("Использование: python build.py [--jit] [-O0|-O1|-O2|-O3] [--time-passes] [--profile[=out.json]] [--debug] <файл_кода.dsl>")
         sys.exit(1)
 
-    source_file = sys.argv[1]
+    source_file = args[0]
+    opt_level, time_passes = options.opt_level, options.time_passes
+    opt_flag = f"-O{opt_level}"
+    compiler_flags = [opt_flag] + (["--time-passes"] if time_passes else [])
+    if options.profile is not None:
+        compiler_flags.append("--profile" if options.profile == "-" else f"--profile={options.profile}")
+    if options.debug:
+        compiler_flags.append("--debug")
     ensure_build_dir()
     
     # Zig через python модуль
     zig_cc = [sys.executable, "-m", "ziglang", "cc"]
 
+    if jit:
+        sys.exit(run_jit(source_file, zig_cc, options))
+
+    cache = BuildCache()
+    zig = zig_version()
+
     # 1. Генерация LLVM IR (передаем путь сохранения аргументом)
-    print_step(f"1. Компиляция DSL: {source_file} -> {OUTPUT_IR}")
-    run_command([sys.executable, COMPILER_SCRIPT, source_file, OUTPUT_IR])
+    def compile_dsl():
+        print_step(f"1. Компиляция DSL: {source_file} -> {OUTPUT_IR}")
+        run_command([sys.executable, COMPILER_SCRIPT] + compiler_flags + [source_file, OUTPUT_IR])
+    if time_passes or options.profile is not None or options.debug:
+        # Отчёт о проходах, профиль и отладочный лог нужны каждый раз
+        compile_dsl()
+    else:
+        cache.build(cache.key("ir", file_bytes(source_file), compiler_digest(), compiler_flags), OUTPUT_IR, compile_dsl)
 
     # 2. Компиляция Runtime (C -> OBJ)
-    print_step(f"2. Компиляция Runtime: {RUNTIME_SRC} -> {RUNTIME_OBJ}")
-    run_command(zig_cc + ["-c", RUNTIME_SRC, "-o", RUNTIME_OBJ, "-target", "x86_64-windows-gnu"])
+    runtime_flags = RUNTIME_TARGET + [opt_flag]
+    def compile_runtime():
+        print_step(f"2. Компиляция Runtime: {RUNTIME_SRC} -> {RUNTIME_OBJ}")
+        run_command(zig_cc + ["-c", RUNTIME_SRC, "-o", RUNTIME_OBJ] + runtime_flags)
+    cache.build(cache.key("runtime", file_bytes(RUNTIME_SRC), runtime_flags, zig), RUNTIME_OBJ, compile_runtime)
 
     # 3. Компиляция IR (LL -> OBJ)
-    print_step(f"3. Компиляция IR: {OUTPUT_IR} -> {PROGRAM_OBJ}")
-    run_command(zig_cc + ["-c", OUTPUT_IR, "-o", PROGRAM_OBJ, "-Wno-override-module"])
+    program_flags = ["-Wno-override-module", opt_flag]
+    def compile_ir():
+        print_step(f"3. Компиляция IR: {OUTPUT_IR} -> {PROGRAM_OBJ}")
+        run_command(zig_cc + ["-c", OUTPUT_IR, "-o", PROGRAM_OBJ] + program_flags)
+    cache.build(cache.key("program", file_bytes(OUTPUT_IR), program_flags, zig), PROGRAM_OBJ, compile_ir)
+    cache.report()
 
     # 4. Линковка (OBJ + OBJ -> EXE)
     print_step(f"4. Линковка: {PROGRAM_OBJ} + {RUNTIME_OBJ} -> {OUTPUT_EXE}")
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import socket
+import getpass
+import tempfile
+
+# Тонкий клиент сервера компиляции: тот же CLI, что у main_compiler.py, но без
+# импорта antlr4/llvmlite — разбор и кодогенерация идут в уже прогретом процессе.
+
+USAGE = ("Usage: python compile_client.py [--socket PATH] [--parse|--analyze|--shutdown] "
+         "[-O0|-O1|-O2|-O3] [--time-passes] [--profile[=out.json]] <input.dsl> [<output.ll>]")
+
+def default_socket_path():
+    return os.environ.get("RELTABLE_COMPILE_SOCKET") or \
+        os.path.join(tempfile.gettempdir(), f"reltable-compile-{getpass.getuser()}.sock")
+
+def send_message(sock, message):
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+def recv_message(stream):
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+def request(message, socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_message(sock, message)
+        return recv_message(sock.makefile("rb"))
+
+def main(argv):
+    socket_path, cmd, args = default_socket_path(), "compile", []
+    it = iter(argv)
+    for arg in it:
+        if arg == "--socket":
+            socket_path = next(it, socket_path)
+        elif arg in ("--parse", "--analyze", "--shutdown"):
+            cmd = arg[2:]
+        else:
+            args.append(arg)
+    if cmd != "shutdown" and not args:
+        print(USAGE)
+        return 2
+
+    message = {"cmd": cmd, "args": args, "cwd": os.getcwd()}
+    try:
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("Unix domain sockets are not available")
+        response = request(message, socket_path)
+        if response is None:
+            raise OSError("connection closed")
+    except OSError as e:
+        if cmd == "shutdown":
+            print(f"Compile server is not running: {e}", file=sys.stderr)
+            return 1
+        # Сервер не запущен — компилируем сами, результат тот же
+        print(f"Compile server unavailable ({e}), compiling in-process", file=sys.stderr)
+        from compile_server import execute
+        return execute(cmd, args)
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    return response.get("status", 1)
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,138 @@
+import os
+import io
+import sys
+import socket
+import threading
+import traceback
+import socketserver
+from main_compiler import parse_args, configure_logging, parse_file, analyze_tree, generate_module, write_module
+from compiler.profiling import CompileProfile
+from compile_client import default_socket_path, send_message, recv_message
+
+# Долгоживущий процесс компиляции: лексер/парсер ANTLR, их ATN и кеши DFA,
+# llvmlite и модули компилятора загружаются один раз и греются от запроса к запросу.
+# Запросы обслуживаются параллельно; общие для процесса части защищены замками.
+
+# Кеши DFA в Python-рантайме ANTLR не рассчитаны на одновременное обновление
+_parse_lock = threading.Lock()
+# Глобальный контекст LLVM и таймеры проходов общие для процесса
+_llvm_lock = threading.Lock()
+# tracemalloc один на процесс: профилируемые запросы идут по одному
+_profile_lock = threading.Lock()
+
+def execute(cmd, argv):
+    """parse | analyze | compile с аргументами main_compiler.py; возвращает код выхода"""
+    options, paths = parse_args(argv)
+    if not paths or (cmd == "compile" and len(paths) < 2) or cmd not in ("parse", "analyze", "compile"):
+        print("Usage: [-O0|-O1|-O2|-O3] [--time-passes] [--profile[=out.json]] <input.dsl> <output.ll>")
+        return 2
+    profile = CompileProfile(enabled=options.profile is not None)
+    try:
+        if profile.enabled:
+            with _profile_lock:
+                try:
+                    return _run(cmd, paths, options, profile)
+                finally:
+                    profile.emit(options.profile, input=paths[0], opt_level=options.opt_level)
+        return _run(cmd, paths, options, profile)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+
+def _run(cmd, paths, options, profile):
+    with _parse_lock:
+        tree = parse_file(paths[0], profile)
+    if cmd == "parse":
+        print(f"{paths[0]}: syntax OK")
+        return 0
+    analyzer = analyze_tree(tree, profile)
+    if cmd == "analyze":
+        print(f"{paths[0]}: semantics OK")
+        return 0
+    llvm_module = generate_module(tree, analyzer, profile)
+    with _llvm_lock:
+        write_module(llvm_module, paths[1], options.opt_level, options.time_passes, profile)
+    return 0
+
+class ThreadOutput:
+    """Замена sys.stdout/stderr: вывод потока, обслуживающего запрос, копится в его буфере"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, "buffer", None) or self.stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def client_path(arg, cwd):
+    """Пути клиента относительны его рабочего каталога — и файлы, и значение --profile="""
+    if arg.startswith("--profile="):
+        value = arg.split("=", 1)[1]
+        return arg if value == "-" else "--profile=" + os.path.join(cwd, value)
+    return arg if arg.startswith("-") else os.path.join(cwd, arg)
+
+class CompileHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        message = recv_message(self.rfile)
+        if message is None:
+            return
+        if message.get("cmd") == "shutdown":
+            send_message(self.connection, {"status": 0, "stdout": "Compile server stopped\n"})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+
+        cwd = message.get("cwd", ".")
+        args = [client_path(a, cwd) for a in message.get("args", [])]
+
+        out, err = io.StringIO(), io.StringIO()
+        sys.stdout.local.buffer, sys.stderr.local.buffer = out, err
+        try:
+            status = execute(message.get("cmd", "compile"), args)
+        except Exception:
+            traceback.print_exc()
+            status = 1
+        finally:
+            sys.stdout.local.buffer = sys.stderr.local.buffer = None
+        send_message(self.connection, {"status": status, "stdout": out.getvalue(), "stderr": err.getvalue()})
+
+def serve(socket_path):
+    if not hasattr(socket, "AF_UNIX"):
+        print("Compile server needs Unix domain sockets")
+        return 1
+    if os.path.exists(socket_path):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            print(f"Compile server is already running on {socket_path}")
+            return 1
+        except OSError:
+            os.unlink(socket_path)  # остался от упавшего сервера
+
+    sys.stdout, sys.stderr = ThreadOutput(sys.stdout), ThreadOutput(sys.stderr)
+    # Отладочный журнал сервера попадает в вывод того запроса, во время которого записан
+    configure_logging("--debug" in sys.argv)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, CompileHandler)
+    server.daemon_threads = True
+    os.chmod(socket_path, 0o600)
+    print(f"Compile server listening on {socket_path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    return 0
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(serve(args[args.index("--socket") + 1] if "--socket" in args else default_socket_path()))
@@ -24,6 +24,26 @@ class RelTableCompiler(ParseTreeVisitor):
         self.func_exit_block = None  
         self.func_return_ptr = None  
         self.lambda_count = 0
+        self.scan_count = 0
+        self.row_block_count = 0
+
+        # Встроенные функции, вызываемые как f(...): имя -> генератор вызова runtime по узлу вызова и аргументам
+        self.builtins = {
+            "save_table": self._builtin_save_table,
+            "load_table": self._builtin_load_table,
+            "import_csv": self._builtin_import_csv,
+            "create_index": self._builtin_create_index,
+            "count": self._builtin_count,
+            "sum": lambda ctx, args: self._builtin_aggregate("sum", ctx, args),
+            "min": lambda ctx, args: self._builtin_aggregate("min", ctx, args),
+            "max": lambda ctx, args: self._builtin_aggregate("max", ctx, args),
+            "avg": lambda ctx, args: self._builtin_aggregate("avg", ctx, args),
+            "set_threads": self._builtin_set_threads,
+            "memory_report": self._builtin_memory_report,
+            "flush": self._builtin_flush,
+        }
+        # (имя строки, {слот: буфер колонки}, указатель на индекс строки) внутри ядра скана
+        self.scan_row = None
 
     def _get_str_const(self, string):
         """Кеширование глобальных строк с правильным подсчетом байтов (UTF-8)"""
@@ -53,12 +73,37 @@ class RelTableCompiler(ParseTreeVisitor):
         block = self.func.append_basic_block(name="entry")
         self.builder = ir.IRBuilder(block)
          
-        self.visitChildren(ctx)
+        self._visit_statements(ctx.statement())
          
         if not self.builder.block.is_terminated:
             self.builder.ret(ir.Constant(self.t.int, 0))
         return self.module
 
+    def visitBlock(self, ctx):
+        self._visit_statements(ctx.statement())
+
+    def _visit_statements(self, statements):
+        """Обходит операторы; подряд идущие литеральные add_row в одну таблицу
+        сливаются в один статический блок данных и один вызов rt_append_rows"""
+        run = []
+        for stmt in statements:
+            add_row = stmt.tableStmt().addRow() if stmt.tableStmt() else None
+            if add_row is not None and not self._is_literal_add_row(add_row):
+                add_row = None
+
+            if add_row is not None and run and add_row.expr(0).getText() == run[0].expr(0).getText():
+                run.append(add_row)
+                continue
+            if run:
+                self._append_literal_rows(run)
+                run = []
+            if add_row is not None:
+                run = [add_row]
+            else:
+                self.visit(stmt)
+        if run:
+            self._append_literal_rows(run)
+
     def visitAssignStmt(self, ctx):
         name = ctx.Identifier().getText()
         val, typ = self.visit(ctx.expr())
@@ -81,6 +126,8 @@ class RelTableCompiler(ParseTreeVisitor):
         if ctx.BooleanLiteral():
             b = 1 if ctx.BooleanLiteral().getText() == 'true' else 0
             return ir.Constant(self.t.bool, b), self.t.bool
+        if ctx.DecimalLiteral():
+            return ir.Constant(self.t.double, float(ctx.DecimalLiteral().getText())), self.t.double
         return None
     
     def visitFuncDecl(self, ctx):
@@ -125,25 +172,38 @@ class RelTableCompiler(ParseTreeVisitor):
         env_types = [v[2] for v in captured_list]  
         env_struct_ty = ir.LiteralStructType(env_types)
          
-        null_ptr = ir.Constant(env_struct_ty.as_pointer(), None)
-        size_gep = self.builder.gep(null_ptr, [ir.Constant(ir.IntType(32), 1)])
-        env_size = self.builder.ptrtoint(size_gep, ir.IntType(64))
-        env_ptr_raw = self.builder.call(self.rt.malloc, [env_size])
-        env_ptr_typed = self.builder.bitcast(env_ptr_raw, env_struct_ty.as_pointer())
-
-        for i, (v_name, v_ptr, v_ty) in enumerate(captured_list):
-            curr_val = self.builder.load(v_ptr)
-            field_ptr = self.builder.gep(env_ptr_typed, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), i)])
-            self.builder.store(curr_val, field_ptr)
-
-        old_builder = self.builder
+        if not captured_list:
+            # Без захватов окружение не нужно
+            env_ptr_raw = ir.Constant(self.t.char_ptr, None)
+        else:
+            # Замыкание не переживает область, где создано: присваивание пишет в самый
+            # внутренний скоуп (visitAssignStmt), а свой скоуп есть у каждой итерации цикла
+            # и у каждой функции. Поэтому хватает одного окружения на стеке кадра —
+            # каждое создание перезаписывает его
+            with self.builder.goto_entry_block():
+                env_ptr_typed = self.builder.alloca(env_struct_ty, name=f"{name}_env")
+            env_ptr_raw = self.builder.bitcast(env_ptr_typed, self.t.char_ptr)
+
+            for i, (v_name, v_ptr, v_ty) in enumerate(captured_list):
+                curr_val = self.builder.load(v_ptr)
+                field_ptr = self.builder.gep(env_ptr_typed, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), i)])
+                self.builder.store(curr_val, field_ptr)
+
+        old_builder, old_func = self.builder, self.func
+        old_loops = self.loop_stack
          
         arg_types = [self.t.char_ptr] if (len(param_names) == 1 and name.startswith("lambda")) else [self.t.int] * len(param_names)
+        # Лямбда where в select по нескольким таблицам получает строку каждой таблицы
+        row_arity = getattr(parent_lambda_ctx, '_row_arity', 0)
+        if row_arity > 1 and row_arity == len(param_names):
+            arg_types = [self.t.row] * row_arity
         fnty = self.t.get_function_type(self.t.int, arg_types)
         l_func = ir.Function(self.module, fnty, name=name)
         
         entry = l_func.append_basic_block(name="entry")
         self.builder = ir.IRBuilder(entry)
+        self.func = l_func
+        self.loop_stack = []
         self.enter_scope()
 
         if captured_list:
@@ -172,7 +232,8 @@ class RelTableCompiler(ParseTreeVisitor):
             self.builder.ret(val)
 
         self.exit_scope()
-        self.builder = old_builder
+        self.builder, self.func = old_builder, old_func
+        self.loop_stack = old_loops
 
         closure = ir.Constant(self.t.closure, ir.Undefined)
         closure = self.builder.insert_value(closure, self.builder.bitcast(l_func, self.t.char_ptr), 0)
@@ -299,16 +360,14 @@ class RelTableCompiler(ParseTreeVisitor):
             self.builder.cbranch(combined_match, case_body_block, next_case_block)
             
             self.builder.position_at_end(case_body_block)
-            for stmt in case.statement():
-                self.visit(stmt)
+            self._visit_statements(case.statement())
             if not self.builder.block.is_terminated:
                 self.builder.branch(end_block)
             
             self.builder.position_at_end(next_case_block)
 
         if ctx.defaultCase():
-            for stmt in ctx.defaultCase().statement():
-                self.visit(stmt)
+            self._visit_statements(ctx.defaultCase().statement())
         
         if not self.builder.block.is_terminated:
             self.builder.branch(end_block)
@@ -332,19 +391,561 @@ class RelTableCompiler(ParseTreeVisitor):
             raise Exception("Break outside of loop")
         
     def visitSelectExpr(self, ctx):
+        if len(ctx.expr()) > 1:
+            result_table, _ = self._generate_join(ctx)
+        else:
+            result_table, _ = self._generate_select(ctx)
+        if ctx.groupClause():
+            grouped = self._generate_group(result_table, ctx.groupClause(), ctx)
+            # Промежуточная выборка больше никому не видна
+            self.builder.call(self.rt.rt_drop_table, [result_table])
+            result_table = grouped
+        return result_table, self.t.table
+
+    def visitPipeOp(self, ctx):
+        """Конвейер source | where p | group by k | select a, b.
+
+        Подряд идущие where, которые вкомпилируются в ядро, проверяются одним
+        сканом без промежуточных выборок. Промежуточный результат стадии никому
+        не виден и освобождается, как только следующая стадия его прочитала.
+        """
+        from gen.RelTableParser import RelTableParser
+        stages = []
+        while isinstance(ctx, RelTableParser.PipeOpContext):
+            stages.append(ctx.pipeStage())
+            ctx = ctx.expr()
+        stages.reverse()
+
+        table_val, _ = self.visit(ctx)
+        owned = False
+        i = 0
+        while i < len(stages):
+            stage = stages[i]
+            if stage.WHERE():
+                lambda_ctxs = []
+                while i < len(stages) and stages[i].WHERE():
+                    lambda_ctx = self._scan_predicate(stages[i].primaryExpr())
+                    if lambda_ctx is None:
+                        break
+                    lambda_ctxs.append(lambda_ctx)
+                    i += 1
+                if lambda_ctxs:
+                    result_table = self._generate_scan(stage, table_val, lambda_ctxs)
+                else:
+                    result_table = self._generate_filter(stage, table_val, stage.primaryExpr())
+                    i += 1
+            elif stage.groupClause():
+                result_table = self._generate_group(table_val, stage.groupClause(), stage)
+                i += 1
+            else:
+                columns = [name.getText() for name in stage.Identifier()]
+                result_table = self.builder.call(self.rt.rt_table_project, [
+                    table_val, ir.Constant(self.t.int, len(columns)), self._string_array(columns, "project_columns"), self._site(stage)])
+                i += 1
+            if owned:
+                self.builder.call(self.rt.rt_drop_table, [table_val])
+            table_val, owned = result_table, True
+        return table_val, self.t.table
+
+    def _site(self, ctx):
+        """Место вызова для статистики запросов runtime — строка select в исходнике"""
+        return ir.Constant(self.t.int, ctx.start.line)
+
+    def _string_array(self, strings, name):
+        """Массив указателей на строковые константы на стеке; возвращает указатель на первый"""
+        zero = ir.Constant(ir.IntType(32), 0)
+        with self.builder.goto_entry_block():
+            array_ptr = self.builder.alloca(ir.ArrayType(self.t.char_ptr, len(strings)), name=name)
+        for i, string in enumerate(strings):
+            self.builder.store(self._get_str_const(string), self.builder.gep(array_ptr, [zero, ir.Constant(ir.IntType(32), i)]))
+        return self.builder.gep(array_ptr, [zero, zero])
+
+    def _generate_group(self, table_val, group_ctx, site_ctx):
+        keys = [k.getText() for k in group_ctx.Identifier()]
+        return self.builder.call(self.rt.rt_table_group, [table_val, ir.Constant(self.t.int, len(keys)), self._string_array(keys, "group_keys"),
+                                                          self._site(site_ctx)])
+
+    def _generate_select(self, ctx):
         table_val, _ = self.visit(ctx.expr(0))
         
         if ctx.whereClause():
-            res = self.visit(ctx.whereClause())
-            if res is None:
-                raise Exception("Codegen Error: WHERE clause returned None. Check visitPrimary or visitLambda.")
-            closure, _ = res
-        else:
-            closure = ir.Constant(self.t.closure, ir.Undefined)
-           
-        result_table = self.builder.call(self.rt.rt_table_select, [table_val, closure])
+            lambda_ctx = self._scan_predicate(ctx.whereClause().expr())
+            if lambda_ctx is not None:
+                probe = self._index_probe(lambda_ctx, getattr(ctx, '_indexed_columns', ()))
+                if probe is not None:
+                    return self._generate_index_scan(ctx, table_val, lambda_ctx, *probe)
+                return self._generate_scan(ctx, table_val, [lambda_ctx]), self.t.table
+            return self._generate_filter(ctx, table_val, ctx.whereClause().expr()), self.t.table
+
+        # Без where: нулевой предикат, runtime берёт все строки
+        closure = ir.Constant(self.t.closure, None)
+        result_table = self.builder.call(self.rt.rt_table_select_parallel, [table_val, closure, self._site(ctx)])
         return result_table, self.t.table
+
+    def _generate_scan(self, ctx, table_val, lambda_ctxs):
+        """Скан ядром с предикатами lambda_ctxs; блоки отсеиваются по условиям всех предикатов"""
+        ranges = [r for lambda_ctx in lambda_ctxs for r in self._zone_ranges(lambda_ctx)]
+        kernel, env_ptr, matches = self._generate_scan_kernel(lambda_ctxs, table_val)
+        if ranges:
+            count, ranges_ptr = self._generate_zone_ranges(ranges)
+            result_table = self.builder.call(self.rt.rt_table_scan_ranges, [table_val, kernel, env_ptr, count, ranges_ptr, self._site(ctx)])
+        else:
+            result_table = self.builder.call(self.rt.rt_table_scan, [table_val, kernel, env_ptr, self._site(ctx)])
+        self._free_matches(matches)
+        return result_table
+
+    def _generate_filter(self, ctx, table_val, pred_ctx):
+        """Общий путь: предикат — замыкание, которое runtime вызывает на каждую строку"""
+        res = self.visit(pred_ctx)
+        if res is None:
+            raise Exception("Codegen Error: WHERE clause returned None. Check visitPrimary or visitLambda.")
+        closure, _ = res
+        # Чистый предикат (проверено анализатором) можно вызывать из нескольких потоков
+        lambda_ctx = self._unwrap_lambda(pred_ctx)
+        pure = lambda_ctx is not None and getattr(lambda_ctx, '_is_pure', False)
+        select_fn = self.rt.rt_table_select_parallel if pure else self.rt.rt_table_select
+        return self.builder.call(select_fn, [table_val, closure, self._site(ctx)])
     
+    def _generate_join(self, ctx):
+        """select(t1, t2, ...): хеш-соединение по равенствам колонок разных таблиц, затем фильтр"""
+        zero = ir.Constant(ir.IntType(32), 0)
+        tables = [self.visit(e)[0] for e in ctx.expr()]
+        with self.builder.goto_entry_block():
+            tables_ptr = self.builder.alloca(ir.ArrayType(self.t.table, len(tables)), name="join_tables")
+        for i, table_val in enumerate(tables):
+            self.builder.store(table_val, self.builder.gep(tables_ptr, [zero, ir.Constant(ir.IntType(32), i)]))
+
+        keys = []
+        null = ir.Constant(self.t.char_ptr, None)
+        pred, env = null, null
+        if ctx.whereClause():
+            lambda_ctx = self._unwrap_lambda(ctx.whereClause().expr())
+            if lambda_ctx is not None and lambda_ctx.expr() is not None:
+                keys = self._join_keys(lambda_ctx)
+            closure, _ = self.visit(ctx.whereClause())
+            pred, env = self._generate_join_predicate(closure, len(tables))
+
+        with self.builder.goto_entry_block():
+            keys_ptr = self.builder.alloca(ir.ArrayType(self.t.join_key, max(len(keys), 1)), name="join_keys")
+        for i, key in enumerate(keys):
+            entry = self.builder.gep(keys_ptr, [zero, ir.Constant(ir.IntType(32), i)])
+            for field, val in enumerate(key):
+                self.builder.store(ir.Constant(self.t.int, val), self.builder.gep(entry, [zero, ir.Constant(ir.IntType(32), field)]))
+
+        result_table = self.builder.call(self.rt.rt_table_join, [
+            ir.Constant(self.t.int, len(tables)), self.builder.gep(tables_ptr, [zero, zero]),
+            ir.Constant(self.t.int, len(keys)), self.builder.gep(keys_ptr, [zero, zero]), pred, env, self._site(ctx)])
+        return result_table, self.t.table
+
+    def _join_keys(self, lambda_ctx):
+        """Равенства int-колонок двух разных таблиц: (левая таблица, колонка, правая таблица, колонка)"""
+        from gen.RelTableParser import RelTableParser
+        from analyzer.symbols import Type
+        params = lambda_ctx.lambdaParamList().lambdaParam() if lambda_ctx.lambdaParamList() else []
+        positions = {p.Identifier().getText(): i for i, p in enumerate(params)}
+        keys = []
+        for cond in self._conjuncts(lambda_ctx.expr()):
+            if not isinstance(cond, RelTableParser.CompareOpContext) or not cond.EQ():
+                continue
+            sides = []
+            for side in cond.expr():
+                member = self._column_member(side)
+                if member is None or member._column_type != Type.INT:
+                    break
+                table = positions.get(member.primaryExpr().getText())
+                if table is None:
+                    break
+                sides.append((table, member._column_slot))
+            if len(sides) == 2 and sides[0][0] != sides[1][0]:
+                left, right = sorted(sides)
+                keys.append(left + right)
+        return keys
+
+    def _generate_join_predicate(self, closure, table_count):
+        """Переходник join_pred_N(closure*, rows) -> вызов замыкания where с одной строкой на таблицу"""
+        with self.builder.goto_entry_block():
+            closure_ptr = self.builder.alloca(self.t.closure, name="join_where")
+        self.builder.store(closure, closure_ptr)
+
+        fnty = ir.FunctionType(self.t.int, [self.t.char_ptr, self.t.char_ptr.as_pointer()])
+        adapter = ir.Function(self.module, fnty, name=f"join_pred_{self.scan_count}")
+        self.scan_count += 1
+        builder = ir.IRBuilder(adapter.append_basic_block(name="entry"))
+        zero = ir.Constant(ir.IntType(32), 0)
+        target = builder.bitcast(adapter.args[0], self.t.closure.as_pointer())
+        fn_raw = builder.load(builder.gep(target, [zero, zero]))
+        env = builder.load(builder.gep(target, [zero, ir.Constant(ir.IntType(32), 1)]))
+        rows = [builder.load(builder.gep(adapter.args[1], [ir.Constant(ir.IntType(32), i)])) for i in range(table_count)]
+        fn = builder.bitcast(fn_raw, self.t.get_function_type(self.t.int, [self.t.row] * table_count).as_pointer())
+        builder.ret(builder.call(fn, [env] + rows))
+        return self.builder.bitcast(adapter, self.t.char_ptr), self.builder.bitcast(closure_ptr, self.t.char_ptr)
+
+    def _unwrap_lambda(self, ctx):
+        """Находит лямбду за обёртками Primary/PrimaryBase/скобками"""
+        from gen.RelTableParser import RelTableParser
+        while True:
+            if isinstance(ctx, RelTableParser.PrimaryContext):
+                ctx = ctx.primaryExpr()
+            elif isinstance(ctx, RelTableParser.PrimaryBaseContext):
+                ctx = ctx.baseExpr()
+            elif isinstance(ctx, RelTableParser.BaseExprContext) and ctx.lambdaExpr():
+                return ctx.lambdaExpr()
+            elif isinstance(ctx, RelTableParser.BaseExprContext) and ctx.expr():
+                ctx = ctx.expr()
+            else:
+                return None
+
+    def _lambda_row_name(self, lambda_ctx):
+        if lambda_ctx.lambdaName():
+            return lambda_ctx.lambdaName().getText()
+        params = lambda_ctx.lambdaParamList().lambdaParam() if lambda_ctx.lambdaParamList() else []
+        return params[0].Identifier().getText() if len(params) == 1 else None
+
+    def _scan_predicate(self, pred_ctx):
+        """Лямбда-предикат where, если её можно вкомпилировать в цикл скана, иначе None.
+
+        Подходят выражения над колонками с известным слотом, захваченными
+        int/bool/decimal переменными и литералами — без вызовов и вложенных лямбд.
+        Строковые колонки — только в сравнениях ==, != и contains с литералом
+        или захваченной строкой (см. _string_probe).
+        """
+        lambda_ctx = self._unwrap_lambda(pred_ctx)
+        if lambda_ctx is None or lambda_ctx.expr() is None:
+            return None
+        row_name = self._lambda_row_name(lambda_ctx)
+        if row_name is None:
+            return None
+
+        captured = getattr(lambda_ctx, '_captured_vars', {})
+        for v_name in captured:
+            _, ty = self.get_var(v_name)
+            if ty not in (self.t.int, self.t.bool, self.t.double, self.t.char_ptr):
+                return None
+        if not self._is_scan_expr(lambda_ctx.expr(), row_name, captured):
+            return None
+        return lambda_ctx
+
+    def _is_scan_expr(self, ctx, row_name, captured):
+        from gen.RelTableParser import RelTableParser
+        if isinstance(ctx, RelTableParser.CompareOpContext):
+            if self._string_probe(ctx, row_name) is not None:
+                return True
+            if ctx.CONTAINS():
+                return False
+            return all(self._is_scan_expr(e, row_name, captured) for e in ctx.expr())
+        if isinstance(ctx, (RelTableParser.LogicalOpContext, RelTableParser.AddOpContext, RelTableParser.MulOpContext)):
+            return all(self._is_scan_expr(e, row_name, captured) for e in ctx.expr())
+        if isinstance(ctx, RelTableParser.NotOpContext):
+            return self._is_scan_expr(ctx.expr(), row_name, captured)
+        if isinstance(ctx, RelTableParser.PrimaryContext):
+            return self._is_scan_expr(ctx.primaryExpr(), row_name, captured)
+        if isinstance(ctx, RelTableParser.PrimaryMemberContext):
+            from analyzer.symbols import Type
+            base = ctx.primaryExpr()
+            return (getattr(ctx, '_column_slot', None) is not None
+                    and ctx._column_type in (Type.INT, Type.BOOL, Type.DECIMAL)
+                    and isinstance(base, RelTableParser.PrimaryBaseContext)
+                    and base.baseExpr().Identifier() is not None
+                    and base.baseExpr().Identifier().getText() == row_name)
+        if isinstance(ctx, RelTableParser.PrimaryBaseContext):
+            base = ctx.baseExpr()
+            if base.literal():
+                lit = base.literal()
+                return lit.IntegerLiteral() is not None or lit.DecimalLiteral() is not None or lit.BooleanLiteral() is not None
+            if base.Identifier():
+                name = base.Identifier().getText()
+                return name != row_name and name in captured and self.get_var(name)[1] != self.t.char_ptr
+            if base.expr():
+                return self._is_scan_expr(base.expr(), row_name, captured)
+        return False
+
+    def _string_probe(self, ctx, row_name):
+        """Сравнение r.s ==/!= k или r.s contains k по строковой колонке: (колонка, k) или None.
+
+        k не зависит от строки — строковый литерал или захваченная строка,
+        поэтому его код в словаре (или флаги contains) считаются один раз до скана.
+        """
+        from gen.RelTableParser import RelTableParser
+        from analyzer.symbols import Type
+        if not isinstance(ctx, RelTableParser.CompareOpContext) or not (ctx.EQ() or ctx.NEQ() or ctx.CONTAINS()):
+            return None
+        pairs = [tuple(ctx.expr())] if ctx.CONTAINS() else [tuple(ctx.expr()), tuple(reversed(ctx.expr()))]
+        for member, key in pairs:
+            member = self._column_member(member)
+            if (member is None or member._column_type != Type.STRING
+                    or member.primaryExpr().getText() != row_name):
+                continue
+            if self._is_invariant_string(key, row_name):
+                return member, key
+        return None
+
+    def _is_invariant_string(self, ctx, row_name):
+        from gen.RelTableParser import RelTableParser
+        if isinstance(ctx, RelTableParser.PrimaryContext):
+            ctx = ctx.primaryExpr()
+        if not isinstance(ctx, RelTableParser.PrimaryBaseContext):
+            return False
+        base = ctx.baseExpr()
+        if base.literal():
+            return base.literal().StringLiteral() is not None
+        if base.Identifier():
+            name = base.Identifier().getText()
+            scope = next((scope for scope in reversed(self.scopes) if name in scope), None)
+            return name != row_name and scope is not None and scope[name][1] == self.t.char_ptr
+        if base.expr():
+            return self._is_invariant_string(base.expr(), row_name)
+        return False
+
+    def _string_probes(self, ctx, row_name):
+        """Все сравнения предиката, которые _string_probe сводит к кодам словаря"""
+        probe = self._string_probe(ctx, row_name)
+        if probe is not None:
+            return [(ctx, *probe)]
+        probes = []
+        for child in (ctx.getChildren() if hasattr(ctx, 'getChildren') else []):
+            probes += self._string_probes(child, row_name)
+        return probes
+
+    def _conjuncts(self, ctx):
+        """Раскладывает предикат по AND верхнего уровня"""
+        from gen.RelTableParser import RelTableParser
+        if isinstance(ctx, RelTableParser.LogicalOpContext) and ctx.AND():
+            return self._conjuncts(ctx.expr(0)) + self._conjuncts(ctx.expr(1))
+        if isinstance(ctx, RelTableParser.PrimaryContext):
+            base = ctx.primaryExpr()
+            if isinstance(base, RelTableParser.PrimaryBaseContext) and base.baseExpr().expr():
+                return self._conjuncts(base.baseExpr().expr())
+        return [ctx]
+
+    def _index_probe(self, lambda_ctx, indexed_columns):
+        """Условие r.col == key по индексированной колонке: (колонка, key, есть ли остаток) или None.
+
+        key не зависит от строки — литерал или захваченные переменные.
+        """
+        from gen.RelTableParser import RelTableParser
+        from analyzer.symbols import Type
+        if not indexed_columns:
+            return None
+        conjuncts = self._conjuncts(lambda_ctx.expr())
+        for cond in conjuncts:
+            if not isinstance(cond, RelTableParser.CompareOpContext) or not cond.EQ():
+                continue
+            for member, key in (cond.expr(), reversed(cond.expr())):
+                member = self._column_member(member)
+                if (member is not None and member._column_type == Type.INT
+                        and member.Identifier().getText() in indexed_columns
+                        and not self._column_slots(key)):
+                    return member, key, len(conjuncts) > 1
+        return None
+
+    def _column_member(self, ctx):
+        """Обращение к колонке с известным слотом (r.col) или None"""
+        from gen.RelTableParser import RelTableParser
+        if isinstance(ctx, RelTableParser.PrimaryContext):
+            ctx = ctx.primaryExpr()
+        if isinstance(ctx, RelTableParser.PrimaryMemberContext) and getattr(ctx, '_column_slot', None) is not None:
+            return ctx
+        return None
+
+    def _zone_ranges(self, lambda_ctx):
+        """Условия r.col OP key по int/decimal колонкам: (слот, OP при колонке слева, key)"""
+        from gen.RelTableParser import RelTableParser
+        from analyzer.symbols import Type
+        flipped = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "=="}
+        ranges = []
+        for cond in self._conjuncts(lambda_ctx.expr()):
+            if not isinstance(cond, RelTableParser.CompareOpContext):
+                continue
+            op = cond.getChild(1).getText()
+            if op not in flipped:
+                continue
+            left, right = cond.expr()
+            for member, key, member_op in ((left, right, op), (right, left, flipped[op])):
+                member = self._column_member(member)
+                if member is not None and member._column_type in (Type.INT, Type.DECIMAL) and not self._column_slots(key):
+                    ranges.append((member._column_slot, member_op, key))
+                    break
+        return ranges
+
+    def _generate_zone_ranges(self, ranges):
+        """Заполняет массив ZoneRange на стеке: (число диапазонов, указатель на первый)"""
+        array_ty = ir.ArrayType(self.t.zone_range, len(ranges))
+        with self.builder.goto_entry_block():
+            array_ptr = self.builder.alloca(array_ty, name="zone_ranges")
+        zero = ir.Constant(ir.IntType(32), 0)
+        for i, (slot, op, key_ctx) in enumerate(ranges):
+            key_val, key_ty = self.visit(key_ctx)
+            if key_ty == self.t.int:
+                key_val = self.builder.sitofp(key_val, self.t.double)
+            elif key_ty == self.t.bool:
+                key_val = self.builder.uitofp(key_val, self.t.double)
+            # Строгие сравнения тоже дают замкнутую границу: блок лишь не должен отсеяться зря
+            lo = key_val if op in (">", ">=", "==") else ir.Constant(self.t.double, float("-inf"))
+            hi = key_val if op in ("<", "<=", "==") else ir.Constant(self.t.double, float("inf"))
+            entry = self.builder.gep(array_ptr, [zero, ir.Constant(ir.IntType(32), i)])
+            for field, val in enumerate((ir.Constant(self.t.int, slot), lo, hi)):
+                self.builder.store(val, self.builder.gep(entry, [zero, ir.Constant(ir.IntType(32), field)]))
+        first = self.builder.gep(array_ptr, [zero, zero])
+        return ir.Constant(self.t.int, len(ranges)), first
+
+    def _generate_index_scan(self, ctx, table_val, lambda_ctx, member, key_ctx, has_residual):
+        """Ищет кандидатов по индексу; остаток предиката проверяет ядро скана только на них"""
+        key_val, key_ty = self.visit(key_ctx)
+        if key_ty != self.t.int:
+            kernel, env_ptr, matches = self._generate_scan_kernel([lambda_ctx], table_val)
+            result_table = self.builder.call(self.rt.rt_table_scan, [table_val, kernel, env_ptr, self._site(ctx)])
+            self._free_matches(matches)
+            return result_table, self.t.table
+        if has_residual:
+            kernel, env_ptr, matches = self._generate_scan_kernel([lambda_ctx], table_val)
+        else:
+            kernel = env_ptr = ir.Constant(self.t.char_ptr, None)
+            matches = []
+        slot = ir.Constant(self.t.int, member._column_slot)
+        result_table = self.builder.call(self.rt.rt_index_scan, [table_val, slot, key_val, kernel, env_ptr, self._site(ctx)])
+        self._free_matches(matches)
+        return result_table, self.t.table
+
+    def _column_slots(self, ctx):
+        """Пары (слот, тип) колонок, к которым обращается поддерево"""
+        from gen.RelTableParser import RelTableParser
+        slots = set()
+        if isinstance(ctx, RelTableParser.PrimaryMemberContext) and getattr(ctx, '_column_slot', None) is not None:
+            slots.add((ctx._column_slot, ctx._column_type))
+        for child in (ctx.getChildren() if hasattr(ctx, 'getChildren') else []):
+            slots |= self._column_slots(child)
+        return slots
+
+    def _generate_scan_kernel(self, lambda_ctxs, table_val):
+        """Генерирует scan_N(env, table, begin, end, out) с предикатами, встроенными в цикл.
+
+        Строка попадает в результат, если верны все предикаты lambda_ctxs
+        (подряд идущие where конвейера); каждый следующий проверяется только
+        для строк, прошедших предыдущие.
+        Окружение с захваченными значениями живёт только на время скана,
+        поэтому выделяется на стеке вызывающей функции. Туда же до скана кладутся
+        коды строк для r.s == k и флаги словаря для r.s contains k.
+        Возвращает (ядро, окружение, флаги словаря для _free_matches после скана).
+        """
+        captured = {}
+        for lambda_ctx in lambda_ctxs:
+            for v_name in getattr(lambda_ctx, '_captured_vars', {}):
+                if v_name not in captured:
+                    captured[v_name] = self.get_var(v_name)
+        captured_list = [(v_name, ptr, ty) for v_name, (ptr, ty) in captured.items()]
+
+        probes = [probe for lambda_ctx in lambda_ctxs
+                  for probe in self._string_probes(lambda_ctx.expr(), self._lambda_row_name(lambda_ctx))]
+        probe_values, matches = [], []
+        for cond, member, key in probes:
+            key_val, _ = self.visit(key)
+            slot = ir.Constant(self.t.int, member._column_slot)
+            if cond.CONTAINS():
+                value = self.builder.call(self.rt.rt_string_matches, [table_val, slot, key_val], name="matches")
+                matches.append(value)
+            else:
+                value = self.builder.call(self.rt.rt_column_code, [table_val, slot, key_val], name="code")
+            probe_values.append(value)
+
+        env_values = [self.builder.load(ptr) for _, ptr, _ in captured_list] + probe_values
+        env_struct_ty = ir.LiteralStructType([v.type for v in env_values])
+        with self.builder.goto_entry_block():
+            env_ptr = self.builder.alloca(env_struct_ty, name="scan_env")
+        for i, val in enumerate(env_values):
+            field_ptr = self.builder.gep(env_ptr, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), i)])
+            self.builder.store(val, field_ptr)
+
+        fnty = ir.FunctionType(self.t.int, [self.t.char_ptr, self.t.table, self.t.int, self.t.int, self.t.int.as_pointer()])
+        kernel = ir.Function(self.module, fnty, name=f"scan_{self.scan_count}")
+        self.scan_count += 1
+        k_env, k_table, k_begin, k_end, k_out = kernel.args
+
+        old_builder, old_func = self.builder, self.func
+        self.func = kernel
+        self.builder = ir.IRBuilder(kernel.append_basic_block(name="entry"))
+        self.enter_scope()
+
+        # Захваченные значения и буферы колонок читаются один раз до цикла
+        kernel_env = self.builder.bitcast(k_env, env_struct_ty.as_pointer())
+        for i, (v_name, _, v_ty) in enumerate(captured_list):
+            val_ptr = self.builder.gep(kernel_env, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), i)])
+            local_ptr = self.builder.alloca(v_ty, name=f"captured_{v_name}")
+            self.builder.store(self.builder.load(val_ptr), local_ptr)
+            self.set_var(v_name, local_ptr, v_ty)
+        kernel_probes = {}
+        for i, (cond, member, _) in enumerate(probes, start=len(captured_list)):
+            val_ptr = self.builder.gep(kernel_env, [ir.Constant(ir.IntType(32), 0), ir.Constant(ir.IntType(32), i)])
+            kernel_probes[cond] = (member._column_slot, self.builder.load(val_ptr))
+
+        cols = self.builder.call(self.rt.rt_table_columns, [k_table], name="cols")
+        col_ptrs = {}
+        for slot, col_type in sorted(set().union(*(self._column_slots(l.expr()) for l in lambda_ctxs))):
+            col_ptrs[slot] = self._column_buffer(cols, slot, col_type)
+        # Источник-представление: позиция i указывает на строку sel[i] в буферах
+        sel = self.builder.call(self.rt.rt_table_selection, [k_table], name="sel")
+        is_view = self.builder.icmp_unsigned("!=", sel, ir.Constant(sel.type, None))
+
+        index_ptr = self.builder.alloca(self.t.int, name="i")
+        row_ptr = self.builder.alloca(self.t.int, name="row")
+        count_ptr = self.builder.alloca(self.t.int, name="count")
+        self.builder.store(k_begin, index_ptr)
+        self.builder.store(ir.Constant(self.t.int, 0), count_ptr)
+
+        cond_block = kernel.append_basic_block(name="scan.cond")
+        view_block = kernel.append_basic_block(name="scan.view")
+        table_block = kernel.append_basic_block(name="scan.table")
+        body_block = kernel.append_basic_block(name="scan.body")
+        match_block = kernel.append_basic_block(name="scan.match")
+        next_block = kernel.append_basic_block(name="scan.next")
+        exit_block = kernel.append_basic_block(name="scan.end")
+        self.builder.branch(cond_block)
+
+        self.builder.position_at_end(cond_block)
+        index = self.builder.load(index_ptr)
+        self.builder.cbranch(self.builder.icmp_signed("<", index, k_end), table_block, exit_block)
+
+        self.builder.position_at_end(table_block)
+        self.builder.store(index, row_ptr)
+        self.builder.cbranch(is_view, view_block, body_block)
+
+        self.builder.position_at_end(view_block)
+        self.builder.store(self.builder.load(self.builder.gep(sel, [index])), row_ptr)
+        self.builder.branch(body_block)
+
+        self.builder.position_at_end(body_block)
+        for k, lambda_ctx in enumerate(lambda_ctxs):
+            self.scan_row = (self._lambda_row_name(lambda_ctx), col_ptrs, row_ptr, kernel_probes)
+            cond_val, cond_ty = self.visit(lambda_ctx.expr())
+            self.scan_row = None
+            if cond_ty != self.t.bool:
+                cond_val = self.builder.icmp_signed("!=", cond_val, ir.Constant(cond_ty, 0))
+            if k + 1 == len(lambda_ctxs):
+                self.builder.cbranch(cond_val, match_block, next_block)
+            else:
+                pass_block = kernel.append_basic_block(name="scan.pass")
+                self.builder.cbranch(cond_val, pass_block, next_block)
+                self.builder.position_at_end(pass_block)
+
+        self.builder.position_at_end(match_block)
+        count = self.builder.load(count_ptr)
+        self.builder.store(self.builder.load(row_ptr), self.builder.gep(k_out, [count]))
+        self.builder.store(self.builder.add(count, ir.Constant(self.t.int, 1)), count_ptr)
+        self.builder.branch(next_block)
+
+        self.builder.position_at_end(next_block)
+        self.builder.store(self.builder.add(self.builder.load(index_ptr), ir.Constant(self.t.int, 1)), index_ptr)
+        self.builder.branch(cond_block)
+
+        self.builder.position_at_end(exit_block)
+        self.builder.ret(self.builder.load(count_ptr))
+
+        self.exit_scope()
+        self.builder, self.func = old_builder, old_func
+        return self.builder.bitcast(kernel, self.t.char_ptr), self.builder.bitcast(env_ptr, self.t.char_ptr), matches
+
+    def _free_matches(self, matches):
+        for value in matches:
+            self.builder.call(self.rt.rt_free_matches, [value])
      
     def visitPrimaryBase(self, ctx):
         child = ctx.baseExpr()
@@ -361,16 +962,34 @@ class RelTableCompiler(ParseTreeVisitor):
 
      
     def visitPrimaryCall(self, ctx):
+        arg_ctxs = ctx.argList().expr() if ctx.argList() else []
+        callee = ctx.primaryExpr()
+        if hasattr(callee, 'baseExpr') and callee.baseExpr().Identifier():
+            result = self._builtin_call(callee.baseExpr().Identifier().getText(), ctx, arg_ctxs)
+            if result is not None:
+                return result
+
         closure_obj, _ = self.visit(ctx.primaryExpr())
-        
+        return self._call_closure(closure_obj, arg_ctxs)
+
+    def visitFuncCallExpr(self, ctx):
+        name = ctx.Identifier().getText()
+        arg_ctxs = ctx.argList().expr() if ctx.argList() else []
+        result = self._builtin_call(name, ctx, arg_ctxs)
+        if result is not None:
+            return result
+
+        ptr, _ = self.get_var(name)
+        return self._call_closure(self.builder.load(ptr, name=f"load_{name}"), arg_ctxs)
+
+    def _call_closure(self, closure_obj, arg_ctxs):
         f_ptr_raw = self.builder.extract_value(closure_obj, 0)
         e_ptr = self.builder.extract_value(closure_obj, 1)
         
         args = []
-        if ctx.argList():
-            for expr in ctx.argList().expr():
-                val, _ = self.visit(expr)
-                args.append(val)
+        for expr in arg_ctxs:
+            val, _ = self.visit(expr)
+            args.append(val)
         
         fnty = self.t.get_function_type(self.t.int, [self.t.int] * len(args))
         f_ptr = self.builder.bitcast(f_ptr_raw, fnty.as_pointer())
@@ -378,14 +997,124 @@ class RelTableCompiler(ParseTreeVisitor):
         res = self.builder.call(f_ptr, [e_ptr] + args)
         return res, self.t.int
 
+    def _builtin_call(self, name, ctx, arg_ctxs):
+        """Вызов встроенной функции ctx; None, если имя не встроенное или перекрыто переменной"""
+        if name not in self.builtins or any(name in scope for scope in self.scopes):
+            return None
+        return self.builtins[name](ctx, arg_ctxs)
+
+    def _builtin_save_table(self, ctx, args):
+        table_val, _ = self.visit(args[0])
+        path_val, _ = self.visit(args[1])
+        self.builder.call(self.rt.rt_save_table, [table_val, path_val])
+        return None, self.t.void
+
+    def _builtin_load_table(self, ctx, args):
+        path_val, _ = self.visit(args[0])
+        return self.builder.call(self.rt.rt_load_table, [path_val]), self.t.table
+
+    def _builtin_import_csv(self, ctx, args):
+        table_val, _ = self.visit(args[0])
+        path_val, _ = self.visit(args[1])
+        self.builder.call(self.rt.rt_import_csv, [table_val, path_val])
+        return None, self.t.void
+
+    def _builtin_create_index(self, ctx, args):
+        table_val, _ = self.visit(args[0])
+        col_val, _ = self.visit(args[1])
+        self.builder.call(self.rt.rt_create_index, [table_val, col_val])
+        return None, self.t.void
+
+    def _builtin_set_threads(self, ctx, args):
+        count_val, _ = self.visit(args[0])
+        self.builder.call(self.rt.rt_set_threads, [count_val])
+        return None, self.t.void
+
+    def _builtin_memory_report(self, ctx, args):
+        self.builder.call(self.rt.rt_memory_report, [])
+        return None, self.t.void
+
+    def _builtin_flush(self, ctx, args):
+        self.builder.call(self.rt.rt_flush, [])
+        return None, self.t.void
+
+    def _builtin_count(self, ctx, args):
+        table_val, _ = self.visit(args[0])
+        return self.builder.call(self.rt.rt_count, [table_val]), self.t.int
+
+    def _builtin_aggregate(self, name, ctx, args):
+        from analyzer.symbols import Type
+        table_val, _ = self.visit(args[0])
+        col_val, _ = self.visit(args[1])
+        res = self.builder.call(getattr(self.rt, f"rt_{name}"), [table_val, col_val])
+        # min/max по int-колонке: анализатор типизировал вызов как int
+        if getattr(ctx, '_result_type', None) == Type.INT:
+            return self.builder.fptosi(res, self.t.int), self.t.int
+        return res, self.t.double
+
     def visitPrimaryMember(self, ctx):
+        from analyzer.symbols import Type
+        slot = getattr(ctx, '_column_slot', None)
+        if self.scan_row is not None and slot is not None and ctx.primaryExpr().getText() == self.scan_row[0]:
+            # Внутри ядра скана: буфер колонки уже загружен, читаем по индексу строки
+            _, col_ptrs, row_ptr, _ = self.scan_row
+            return self._load_element(col_ptrs[slot], self.builder.load(row_ptr), ctx._column_type)
+
         row_val, _ = self.visit(ctx.primaryExpr())
         
+        if slot is not None:
+            return self._load_column(row_val, slot, ctx._column_type)
+
         field_name = ctx.Identifier().getText()
         field_name_ptr = self._get_str_const(field_name)
-        
-        res = self.builder.call(self.rt.rt_get_int, [row_val, field_name_ptr])
-        return res, self.t.int
+
+        # Слот неизвестен: поиск колонки по имени во время выполнения
+        getter, res_ty = {
+            Type.DECIMAL: (self.rt.rt_get_decimal, self.t.double),
+            Type.BOOL: (self.rt.rt_get_bool, self.t.bool),
+            Type.STRING: (self.rt.rt_get_string, self.t.char_ptr),
+        }.get(getattr(ctx, '_column_type', None), (self.rt.rt_get_int, self.t.int))
+        res = self.builder.call(getter, [row_val, field_name_ptr])
+        return res, res_ty
+
+    def _load_column(self, row_val, slot, col_type):
+        """Прямое чтение колонки по слоту, известному на этапе компиляции"""
+        from analyzer.symbols import Type
+        if col_type == Type.STRING:
+            return self.builder.call(self.rt.rt_row_string, [row_val, ir.Constant(self.t.int, slot)]), self.t.char_ptr
+        zero = ir.Constant(ir.IntType(32), 0)
+        row_ref = self.builder.bitcast(row_val, self.t.row_ref.as_pointer())
+        cols = self.builder.load(self.builder.gep(row_ref, [zero, zero]), name="cols")
+        index = self.builder.load(self.builder.gep(row_ref, [zero, ir.Constant(ir.IntType(32), 1)]), name="row_index")
+        return self._load_element(self._column_buffer(cols, slot, col_type), index, col_type)
+
+    def _column_buffer(self, cols, slot, col_type):
+        """Типизированный указатель на буфер колонки slot из массива rt_table_columns"""
+        raw = self.builder.load(self.builder.gep(cols, [ir.Constant(ir.IntType(32), slot)]))
+        return self.builder.bitcast(raw, self.t.get_buffer_type(col_type).as_pointer(), name=f"col_{slot}")
+
+    def _load_element(self, col_data, index, col_type):
+        """Значение строки index из буфера колонки -> значение выражения.
+        bool — бит (index & 7) байта index >> 3"""
+        from analyzer.symbols import Type
+        if col_type == Type.BOOL:
+            byte = self.builder.load(self.builder.gep(col_data, [self.builder.ashr(index, ir.Constant(self.t.int, 3))]))
+            shift = self.builder.trunc(self.builder.and_(index, ir.Constant(self.t.int, 7)), byte.type)
+            bit = self.builder.and_(self.builder.lshr(byte, shift), ir.Constant(byte.type, 1))
+            return self.builder.icmp_unsigned("!=", bit, ir.Constant(byte.type, 0)), self.t.bool
+        val = self.builder.load(self.builder.gep(col_data, [index]))
+        return val, val.type
+
+    def _to_storage(self, val, typ, col_type):
+        """Значение выражения -> элемент буфера колонки (None, если типы несовместимы)"""
+        storage_ty = self.t.get_storage_type(col_type)
+        if typ == storage_ty:
+            return val
+        if storage_ty == self.t.double and typ == self.t.int:
+            return self.builder.sitofp(val, self.t.double)
+        if storage_ty == ir.IntType(8) and typ == self.t.bool:
+            return self.builder.zext(val, storage_ty)
+        return None
 
      
     def visitPrimaryIndex(self, ctx):
@@ -403,6 +1132,31 @@ class RelTableCompiler(ParseTreeVisitor):
             self.set_var(var_name, var_ptr, self.t.table)
         return table_ptr, self.t.table
 
+    def visitDropStmt(self, ctx):
+        table_val, _ = self.visit(ctx.expr())
+        self.builder.call(self.rt.rt_drop_table, [table_val])
+        if getattr(ctx, '_dropped_var', None):
+            # Повторный drop_table той же переменной получает NULL и ничего не делает
+            ptr, typ = self.get_var(ctx._dropped_var)
+            self.builder.store(ir.Constant(typ, None), ptr)
+        return None
+
+    def visitWriteStmt(self, ctx):
+        if getattr(ctx, '_writes_table', False):
+            table_val, _ = self.visit(ctx.expr(0))
+            # Без формата runtime печатает выровненный текст
+            fmt = self.visit(ctx.expr(1))[0] if len(ctx.expr()) > 1 else ir.Constant(self.t.char_ptr, None)
+            self.builder.call(self.rt.rt_write_table, [table_val, fmt])
+            return None
+        writers = {self.t.int: self.rt.rt_write_int, self.t.double: self.rt.rt_write_float,
+                   self.t.bool: self.rt.rt_write_bool, self.t.char_ptr: self.rt.rt_write_str}
+        for expr in ctx.expr():
+            val, typ = self.visit(expr)
+            if typ not in writers:
+                raise Exception(f"Cannot write value of type {typ}")
+            self.builder.call(writers[typ], [val])
+        return None
+
     def visitAddColumn(self, ctx):
             tbl_ptr, _ = self.visit(ctx.expr(0))
             col_name, _ = self.visit(ctx.expr(1))
@@ -414,10 +1168,126 @@ class RelTableCompiler(ParseTreeVisitor):
             return None
 
     def visitAddRow(self, ctx):
+        if self._is_literal_add_row(ctx):
+            self._append_literal_rows([ctx])
+            return None
+
         tbl_ptr, _ = self.visit(ctx.expr(0))
-        
-        self.builder.call(self.rt.rt_add_row, [tbl_ptr])
+        values = [self.visit(e) for e in ctx.expr()[1:]]
+
+        row_types = getattr(ctx, '_row_types', None)
+        if row_types is not None:
+            # Схема известна: кладём значения сразу в представлении колонок
+            stored = [self._to_storage(val, typ, col_type) for (val, typ), col_type in zip(values, row_types)]
+            if all(v is not None for v in stored):
+                col_ptrs = [self._stack_slot(v) for v in stored]
+                self.builder.call(self.rt.rt_append_rows, [tbl_ptr, ir.Constant(self.t.int, 1),
+                                  ir.Constant(self.t.int, len(col_ptrs)), self._pointer_array(col_ptrs)])
+                return None
+
+        # Схема неизвестна: runtime приводит значения к типам колонок сам
+        kind_codes = {self.t.int: 'i', self.t.double: 'd', self.t.bool: 'b', self.t.char_ptr: 's'}
+        kinds, value_ptrs = "", []
+        for val, typ in values:
+            kind = kind_codes.get(typ, 'i')
+            if typ == self.t.bool:
+                val = self.builder.zext(val, ir.IntType(8))
+            elif kind == 'i' and typ != self.t.int:
+                val = ir.Constant(self.t.int, 0)
+            kinds += kind
+            value_ptrs.append(self._stack_slot(val))
+        self.builder.call(self.rt.rt_add_row_values, [tbl_ptr, ir.Constant(self.t.int, len(values)),
+                          self._get_str_const(kinds), self._pointer_array(value_ptrs)])
         return None
+
+    def _stack_slot(self, val):
+        """Кладёт значение во временную ячейку на стеке, возвращает её адрес как i8*"""
+        with self.builder.goto_entry_block():
+            ptr = self.builder.alloca(val.type)
+        self.builder.store(val, ptr)
+        return self.builder.bitcast(ptr, self.t.char_ptr)
+
+    def _pointer_array(self, ptrs):
+        """Массив i8* на стеке, возвращает указатель на первый элемент"""
+        with self.builder.goto_entry_block():
+            arr = self.builder.alloca(ir.ArrayType(self.t.char_ptr, max(len(ptrs), 1)))
+        zero = ir.Constant(ir.IntType(32), 0)
+        for i, ptr in enumerate(ptrs):
+            self.builder.store(ptr, self.builder.gep(arr, [zero, ir.Constant(ir.IntType(32), i)]))
+        return self.builder.gep(arr, [zero, zero])
+
+    def _literal_value(self, expr_ctx):
+        """Python-значение литерала за обёртками Primary/PrimaryBase, иначе None"""
+        from gen.RelTableParser import RelTableParser
+        if isinstance(expr_ctx, RelTableParser.PrimaryContext):
+            expr_ctx = expr_ctx.primaryExpr()
+        if not isinstance(expr_ctx, RelTableParser.PrimaryBaseContext) or not expr_ctx.baseExpr().literal():
+            return None
+        lit = expr_ctx.baseExpr().literal()
+        if lit.IntegerLiteral():
+            return int(lit.IntegerLiteral().getText())
+        if lit.DecimalLiteral():
+            return float(lit.DecimalLiteral().getText())
+        if lit.StringLiteral():
+            return lit.StringLiteral().getText()[1:-1]
+        if lit.BooleanLiteral():
+            return lit.BooleanLiteral().getText() == 'true'
+        return None
+
+    def _is_literal_add_row(self, ctx):
+        """add_row с известной схемой, все значения которого — литералы подходящих типов"""
+        from analyzer.symbols import Type
+        row_types = getattr(ctx, '_row_types', None)
+        if row_types is None:
+            return False
+        accepted = {
+            Type.INT: (int,),
+            Type.DECIMAL: (int, float),
+            Type.BOOL: (bool,),
+            Type.STRING: (str,),
+        }
+        for expr, col_type in zip(ctx.expr()[1:], row_types):
+            value = self._literal_value(expr)
+            if value is None or col_type not in accepted:
+                return False
+            if not isinstance(value, accepted[col_type]) or (isinstance(value, bool) and col_type != Type.BOOL):
+                return False
+        return True
+
+    def _append_literal_rows(self, rows):
+        """Пачка литеральных add_row -> статические массивы по колонкам + один rt_append_rows"""
+        from analyzer.symbols import Type
+        row_types = rows[0]._row_types
+        block_id = self.row_block_count
+        self.row_block_count += 1
+
+        col_ptrs = []
+        for c, col_type in enumerate(row_types):
+            elem_ty = self.t.get_storage_type(col_type)
+            values = []
+            for row in rows:
+                value = self._literal_value(row.expr(c + 1))
+                if col_type == Type.STRING:
+                    values.append(self._get_str_const(value))
+                else:
+                    values.append(ir.Constant(elem_ty, int(value) if col_type == Type.BOOL else value))
+            data = ir.Constant(ir.ArrayType(elem_ty, len(rows)), values)
+            col_var = ir.GlobalVariable(self.module, data.type, name=f".rows{block_id}.col{c}")
+            col_var.linkage = 'internal'
+            col_var.global_constant = True
+            col_var.initializer = data
+            col_ptrs.append(col_var.bitcast(self.t.char_ptr))
+
+        table_ty = ir.ArrayType(self.t.char_ptr, len(col_ptrs))
+        cols_var = ir.GlobalVariable(self.module, table_ty, name=f".rows{block_id}")
+        cols_var.linkage = 'internal'
+        cols_var.global_constant = True
+        cols_var.initializer = ir.Constant(table_ty, col_ptrs)
+
+        tbl_ptr, _ = self.visit(rows[0].expr(0))
+        zero = ir.Constant(ir.IntType(32), 0)
+        self.builder.call(self.rt.rt_append_rows, [tbl_ptr, ir.Constant(self.t.int, len(rows)),
+                          ir.Constant(self.t.int, len(col_ptrs)), cols_var.gep([zero, zero])])
     
     def enter_scope(self):
         self.scopes.append({})
@@ -444,9 +1314,8 @@ class RelTableCompiler(ParseTreeVisitor):
     
      
     def visitCompareOp(self, ctx):
-        left, _ = self.visit(ctx.expr(0))
-        right, _ = self.visit(ctx.expr(1))
-        
+        if self.scan_row is not None and ctx in self.scan_row[3]:
+            return self._probe_compare(ctx)
         op = ctx.getChild(1).getText()
          
         op_map = {
@@ -454,12 +1323,75 @@ class RelTableCompiler(ParseTreeVisitor):
             ">": ">", "<": "<", 
             ">=": ">=", "<=": "<="
         }
-        
-        if op in op_map:
+
+        fields = getattr(ctx, '_compare_fields', None)
+        if fields is not None:
+            # Оба поля из таблиц без схемы: runtime сравнивает их по типам колонок
+            args = []
+            for field in fields:
+                row_val, _ = self.visit(field.primaryExpr())
+                args += [row_val, self._get_str_const(field.Identifier().getText())]
+            order = self.builder.call(self.rt.rt_compare_fields, args)
+            return self.builder.icmp_signed(op_map[op], order, ir.Constant(self.t.int, 0)), self.t.bool
+
+        left, _ = self.visit(ctx.expr(0))
+        right, _ = self.visit(ctx.expr(1))
+
+        if left.type == self.t.char_ptr and right.type == self.t.char_ptr:
+            if ctx.CONTAINS():
+                return self.builder.call(self.rt.rt_string_contains, [left, right]), self.t.bool
+            order = self.builder.call(self.rt.rt_string_compare, [left, right])
+            return self.builder.icmp_signed(op_map[op], order, ir.Constant(self.t.int, 0)), self.t.bool
+
+        numeric = (self.t.int, self.t.double)
+        if op in op_map and (left.type == right.type or (left.type in numeric and right.type in numeric)):
+            left, right, is_double = self._promote(left, right)
+            if is_double:
+                return self.builder.fcmp_ordered(op_map[op], left, right), self.t.bool
             res = self.builder.icmp_signed(op_map[op], left, right)
             return res, self.t.bool
-        return ir.Constant(self.t.bool, 0), self.t.bool
+        raise Exception(f"Codegen Error: cannot compare {left.type} {op} {right.type} at line {ctx.start.line}")
     
+    def _probe_compare(self, ctx):
+        """Сравнение строковой колонки в ядре скана по коду словаря (см. _string_probe)"""
+        _, col_ptrs, row_ptr, probes = self.scan_row
+        slot, value = probes[ctx]
+        code = self.builder.load(self.builder.gep(col_ptrs[slot], [self.builder.load(row_ptr)]))
+        if ctx.CONTAINS():
+            flag = self.builder.load(self.builder.gep(value, [self.builder.zext(code, ir.IntType(64))]))
+            return self.builder.icmp_unsigned("!=", flag, ir.Constant(flag.type, 0)), self.t.bool
+        return self.builder.icmp_signed("==" if ctx.EQ() else "!=", code, value), self.t.bool
+
+    def _promote(self, left, right):
+        """Приводит пару операндов к double, если хотя бы один из них double"""
+        if left.type == self.t.double or right.type == self.t.double:
+            left = self.builder.sitofp(left, self.t.double) if left.type == self.t.int else left
+            right = self.builder.sitofp(right, self.t.double) if right.type == self.t.int else right
+            return left, right, True
+        return left, right, False
+
+    def visitAddOp(self, ctx):
+        left, _ = self.visit(ctx.expr(0))
+        right, _ = self.visit(ctx.expr(1))
+        left, right, is_double = self._promote(left, right)
+        if is_double:
+            res = self.builder.fadd(left, right) if ctx.PLUS() else self.builder.fsub(left, right)
+            return res, self.t.double
+        if ctx.PLUS():
+            return self.builder.add(left, right), self.t.int
+        return self.builder.sub(left, right), self.t.int
+
+    def visitMulOp(self, ctx):
+        left, _ = self.visit(ctx.expr(0))
+        right, _ = self.visit(ctx.expr(1))
+        left, right, is_double = self._promote(left, right)
+        if is_double:
+            res = self.builder.fmul(left, right) if ctx.MUL() else self.builder.fdiv(left, right)
+            return res, self.t.double
+        if ctx.MUL():
+            return self.builder.mul(left, right), self.t.int
+        return self.builder.sdiv(left, right), self.t.int
+
     def visitLogicalOp(self, ctx):
         left, _ = self.visit(ctx.expr(0))
         right, _ = self.visit(ctx.expr(1))
@@ -0,0 +1,32 @@
+import sys
+import ctypes
+import llvmlite.binding as llvm
+from .optimize import optimize_module, create_target_machine
+from .profiling import CompileProfile
+
+def load_module(llvm_module, runtime_lib, opt_level=0, time_passes=False, profile=None):
+    """JIT-компиляция модуля (или текста IR) в текущем процессе.
+    Возвращает (движок, main); движок должен жить, пока вызывается main"""
+    profile = profile or CompileProfile(enabled=False)
+    with profile.phase("optimization"):
+        module_ref, report = optimize_module(llvm_module, opt_level, time_passes)
+    if report:
+        print(report, file=sys.stderr)
+    # Символы rt_* ищутся среди загруженных в процесс библиотек
+    llvm.load_library_permanently(runtime_lib)
+
+    with profile.phase("jit"):
+        engine = llvm.create_mcjit_compiler(module_ref, create_target_machine(module_ref, opt_level))
+        engine.finalize_object()
+    engine.run_static_constructors()
+    return engine, ctypes.CFUNCTYPE(ctypes.c_int)(engine.get_function_address("main"))
+
+def flush_output(runtime_lib):
+    ctypes.CDLL(runtime_lib).rt_flush()
+
+def run_module(llvm_module, runtime_lib, opt_level=0, time_passes=False):
+    """JIT-компиляция модуля и вызов main; возвращает его код выхода"""
+    engine, main = load_module(llvm_module, runtime_lib, opt_level, time_passes)
+    code = main()
+    flush_output(runtime_lib)
+    return code
@@ -0,0 +1,59 @@
+import llvmlite.binding as llvm
+
+OPT_LEVELS = (0, 1, 2, 3)
+# Порог встраивания для -O2/-O3 как у clang; на -O1 встраиваются только always_inline
+INLINE_THRESHOLDS = {2: 225, 3: 275}
+
+_initialized = False
+
+def initialize_llvm():
+    global _initialized
+    if not _initialized:
+        llvm.initialize()
+        llvm.initialize_native_target()
+        llvm.initialize_native_asmprinter()
+        _initialized = True
+
+def create_target_machine(module_ref, opt_level):
+    return llvm.Target.from_triple(module_ref.triple).create_target_machine(opt=opt_level)
+
+def optimize_module(llvm_module, opt_level, time_passes=False):
+    """Разбирает IR модуля и прогоняет конвейер -O<opt_level>.
+    Возвращает (ModuleRef, отчёт о времени проходов или None)"""
+    if opt_level not in OPT_LEVELS:
+        raise ValueError(f"Unknown optimization level -O{opt_level}")
+    initialize_llvm()
+    module_ref = llvm.parse_assembly(str(llvm_module))
+    module_ref.verify()
+    if opt_level == 0:
+        return module_ref, None
+
+    # mem2reg/SROA, GVN, LICM и прочее; векторизаторы — начиная с -O2
+    pmb = llvm.create_pass_manager_builder()
+    pmb.opt_level = opt_level
+    if opt_level in INLINE_THRESHOLDS:
+        pmb.inlining_threshold = INLINE_THRESHOLDS[opt_level]
+    pmb.loop_vectorize = opt_level >= 2
+    pmb.slp_vectorize = opt_level >= 2
+
+    # Модели стоимости векторизации и встраивания берутся из целевой машины
+    target_machine = create_target_machine(module_ref, opt_level)
+    fpm = llvm.create_function_pass_manager(module_ref)
+    mpm = llvm.create_module_pass_manager()
+    target_machine.add_analysis_passes(fpm)
+    target_machine.add_analysis_passes(mpm)
+    pmb.populate(fpm)
+    pmb.populate(mpm)
+
+    llvm.set_time_passes(time_passes)
+    try:
+        fpm.initialize()
+        for func in module_ref.functions:
+            fpm.run(func)
+        fpm.finalize()
+        mpm.run(module_ref)
+        report = llvm.report_and_reset_timings() if time_passes else None
+    finally:
+        llvm.set_time_passes(False)
+    module_ref.verify()
+    return module_ref, report
@@ -0,0 +1,68 @@
+import sys
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+class CompileProfile:
+    """Время и пиковая память по фазам компиляции плюс счётчики (--profile).
+    Выключенный профиль ничего не замеряет."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+        self.counts = {}
+        self._started = None
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = time.perf_counter()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            self.phases.append({
+                "phase": name,
+                "wall_ms": round(wall * 1000, 3),
+                "peak_bytes": peak,
+                "retained_bytes": current - before,
+            })
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counts[name] = value
+
+    def report(self, **info):
+        total = time.perf_counter() - self._started if self._started else 0.0
+        return dict(info, total_ms=round(total * 1000, 3), phases=self.phases, counts=self.counts)
+
+    def emit(self, destination, **info):
+        """JSON в файл destination или в stderr для "-"; трассировка памяти останавливается"""
+        text = json.dumps(self.report(**info), indent=2, ensure_ascii=False)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if destination == "-":
+            print(text, file=sys.stderr)
+        else:
+            with open(destination, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+
+def count_nodes(tree):
+    """Число узлов дерева разбора, включая листья-токены"""
+    count, stack = 0, [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(children)
+    return count
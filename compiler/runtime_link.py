@@ -9,22 +9,81 @@ class RuntimeLinker:
         self.rt_create_table = ir.Function(self.module, ir.FunctionType(self.t.table, [self.t.char_ptr]), name="rt_create_table")
         self.rt_add_column = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table, self.t.char_ptr, self.t.char_ptr]), name="rt_add_column")
         self.rt_add_row = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table]), name="rt_add_row")
+        self.rt_append_rows = ir.Function(self.module, 
+            ir.FunctionType(self.t.void, [self.t.table, self.t.int, self.t.int, self.t.char_ptr.as_pointer()]), name="rt_append_rows")
+        self.rt_add_row_values = ir.Function(self.module, 
+            ir.FunctionType(self.t.void, [self.t.table, self.t.int, self.t.char_ptr, self.t.char_ptr.as_pointer()]), name="rt_add_row_values")
+        
+        self.rt_save_table = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table, self.t.char_ptr]), name="rt_save_table")
+        self.rt_load_table = ir.Function(self.module, ir.FunctionType(self.t.table, [self.t.char_ptr]), name="rt_load_table")
+        self.rt_import_csv = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table, self.t.char_ptr]), name="rt_import_csv")
+        self.rt_create_index = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table, self.t.char_ptr]), name="rt_create_index")
         
         self.rt_write_int = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.int]), name="rt_write_int")
         self.rt_write_str = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.char_ptr]), name="rt_write_string")
         self.rt_write_bool = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.bool]), name="rt_write_bool")
+        self.rt_write_float = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.double]), name="rt_write_float")
+        self.rt_write_table = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table, self.t.char_ptr]), name="rt_write_table")
+        self.rt_flush = ir.Function(self.module, ir.FunctionType(self.t.void, []), name="rt_flush")
 
-        malloc_ty = ir.FunctionType(self.t.char_ptr, [ir.IntType(64)])
-        self.malloc = ir.Function(self.module, malloc_ty, name="malloc")
+        self.rt_drop_table = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.table]), name="rt_drop_table")
+        self.rt_memory_report = ir.Function(self.module, ir.FunctionType(self.t.void, []), name="rt_memory_report")
          
         self.rt_get_int = ir.Function(self.module, 
             ir.FunctionType(self.t.int, [self.t.row, self.t.char_ptr]), name="rt_get_int")
         
         self.rt_get_string = ir.Function(self.module, 
             ir.FunctionType(self.t.char_ptr, [self.t.row, self.t.char_ptr]), name="rt_get_string")
+
+        self.rt_get_decimal = ir.Function(self.module,
+            ir.FunctionType(self.t.double, [self.t.row, self.t.char_ptr]), name="rt_get_decimal")
+        self.rt_get_bool = ir.Function(self.module,
+            ir.FunctionType(self.t.bool, [self.t.row, self.t.char_ptr]), name="rt_get_bool")
+        self.rt_row_string = ir.Function(self.module,
+            ir.FunctionType(self.t.char_ptr, [self.t.row, self.t.int]), name="rt_row_string")
          
         self.rt_table_select = ir.Function(self.module,
-            ir.FunctionType(self.t.table, [self.t.table, self.t.closure]), name="rt_table_select")
+            ir.FunctionType(self.t.table, [self.t.table, self.t.closure, self.t.int]), name="rt_table_select")
+
+        self.rt_table_select_parallel = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.table, self.t.closure, self.t.int]), name="rt_table_select_parallel")
+        self.rt_set_threads = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.int]), name="rt_set_threads")
+
+        self.rt_table_scan = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.table, self.t.char_ptr, self.t.char_ptr, self.t.int]), name="rt_table_scan")
+        self.rt_table_scan_ranges = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.table, self.t.char_ptr, self.t.char_ptr, self.t.int, self.t.zone_range.as_pointer(), self.t.int]),
+            name="rt_table_scan_ranges")
+        self.rt_table_join = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.int, self.t.char_ptr.as_pointer(), self.t.int, self.t.join_key.as_pointer(),
+                                           self.t.char_ptr, self.t.char_ptr, self.t.int]),
+            name="rt_table_join")
+        self.rt_table_group = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.table, self.t.int, self.t.char_ptr.as_pointer(), self.t.int]), name="rt_table_group")
+        self.rt_table_project = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.table, self.t.int, self.t.char_ptr.as_pointer(), self.t.int]), name="rt_table_project")
+
+        self.rt_count = ir.Function(self.module, ir.FunctionType(self.t.int, [self.t.table]), name="rt_count")
+        for agg in ("sum", "min", "max", "avg"):
+            setattr(self, f"rt_{agg}", ir.Function(self.module,
+                ir.FunctionType(self.t.double, [self.t.table, self.t.char_ptr]), name=f"rt_{agg}"))
+        self.rt_index_scan = ir.Function(self.module,
+            ir.FunctionType(self.t.table, [self.t.table, self.t.int, self.t.int, self.t.char_ptr, self.t.char_ptr, self.t.int]), name="rt_index_scan")
+        self.rt_table_columns = ir.Function(self.module,
+            ir.FunctionType(self.t.char_ptr.as_pointer(), [self.t.table]), name="rt_table_columns")
+        self.rt_table_selection = ir.Function(self.module,
+            ir.FunctionType(self.t.int.as_pointer(), [self.t.table]), name="rt_table_selection")
+        self.rt_column_code = ir.Function(self.module,
+            ir.FunctionType(self.t.int, [self.t.table, self.t.int, self.t.char_ptr]), name="rt_column_code")
+        self.rt_string_matches = ir.Function(self.module,
+            ir.FunctionType(self.t.char_ptr, [self.t.table, self.t.int, self.t.char_ptr]), name="rt_string_matches")
+        self.rt_free_matches = ir.Function(self.module, ir.FunctionType(self.t.void, [self.t.char_ptr]), name="rt_free_matches")
+        self.rt_string_compare = ir.Function(self.module,
+            ir.FunctionType(self.t.int, [self.t.char_ptr, self.t.char_ptr]), name="rt_string_compare")
+        self.rt_compare_fields = ir.Function(self.module,
+            ir.FunctionType(self.t.int, [self.t.row, self.t.char_ptr, self.t.row, self.t.char_ptr]), name="rt_compare_fields")
+        self.rt_string_contains = ir.Function(self.module,
+            ir.FunctionType(self.t.bool, [self.t.char_ptr, self.t.char_ptr]), name="rt_string_contains")
 
     def declare_relational(self):
         self.rt_get_int = ir.Function(self.module, 
@@ -32,4 +91,4 @@ class RuntimeLinker:
         self.rt_get_str = ir.Function(self.module, 
             ir.FunctionType(self.t.char_ptr, [self.t.row, self.t.char_ptr]), name="rt_get_string")
         self.rt_table_select = ir.Function(self.module,
-            ir.FunctionType(self.t.table, [self.t.table, self.t.closure]), name="rt_table_select")
\ No newline at end of file
+            ir.FunctionType(self.t.table, [self.t.table, self.t.closure, self.t.int]), name="rt_table_select")
\ No newline at end of file
@@ -12,6 +12,12 @@ class LLVMTypes:
         
         self.table = self.char_ptr
         self.row = self.char_ptr
+        # Префикс RowRef из runtime.c: буферы колонок + индекс строки
+        self.row_ref = ir.LiteralStructType([self.char_ptr.as_pointer(), self.int])
+        # ZoneRange из runtime.c: колонка и границы [lo, hi] её значений
+        self.zone_range = ir.LiteralStructType([self.int, self.double, self.double])
+        # JoinKey из runtime.c: (таблица, колонка) слева и справа
+        self.join_key = ir.LiteralStructType([self.int] * 4)
 
     def get_llvm_type(self, semantic_type):
         """Конвертирует Type Enum из семантического анализатора в LLVM тип"""
@@ -28,6 +34,27 @@ class LLVMTypes:
         }
         return mapping.get(semantic_type, self.char_ptr)
     
+    def get_storage_type(self, semantic_type):
+        """Тип значения колонки на входе rt_append_rows: bool — байт 0/1, string — char*"""
+        from analyzer.symbols import Type
+        mapping = {
+            Type.DECIMAL: self.double,
+            Type.BOOL: ir.IntType(8),
+            Type.STRING: self.char_ptr,
+        }
+        return mapping.get(semantic_type, self.int)
+
+    def get_buffer_type(self, semantic_type):
+        """Тип элемента буфера колонки в runtime.c (ColumnKind):
+        bool — байт битовой карты, string — смещение в куче строк"""
+        from analyzer.symbols import Type
+        mapping = {
+            Type.DECIMAL: self.double,
+            Type.BOOL: ir.IntType(8),
+            Type.STRING: self.int,
+        }
+        return mapping.get(semantic_type, self.int)
+
     def get_function_type(self, return_type, arg_types):
         full_args = [self.char_ptr] + arg_types
         return ir.FunctionType(return_type, full_args)
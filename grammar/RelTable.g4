@@ -169,6 +169,7 @@ rowsetBase
   : primaryExpr
   ;
 
+// не используется: ни одно правило на него не ссылается, фильтрация — стадия | where
 rowsetExpr
   : rowsetBase whereClause? orderClause?
   ;
@@ -185,31 +186,44 @@ whereClause
   : WHERE expr
   ;
 
+groupClause
+  : GROUP BY Identifier ( COMMA Identifier )*
+  ;
+
 orderClause
   : ORDER BY expr ( ASC | DESC )?
   ;
 
 primaryExpr
-  : baseExpr                                     
-  | primaryExpr LPAREN argList? RPAREN           
-  | primaryExpr DOT Identifier                     
-  | primaryExpr LBRACK expr RBRACK                
+  : baseExpr                                     # PrimaryBase
+  | primaryExpr LPAREN argList? RPAREN           # PrimaryCall
+  | primaryExpr DOT Identifier                   # PrimaryMember
+  | primaryExpr LBRACK expr RBRACK               # PrimaryIndex
   ;
 
- 
+// приоритет: первая альтернатива связывает сильнее всех
 expr
-  : expr (AND | OR) expr                   
-  | expr (EQ | NEQ | GT | LT | GTE | LTE | CONTAINS) expr  
-  | expr (PLUS | MINUS) expr                
-  | expr (MUL | DIV) expr                
-  | expr PIPE expr                         
-  | NOT expr                               
-  | primaryExpr                            
+  : expr (MUL | DIV) expr                                  # MulOp
+  | expr (PLUS | MINUS) expr                               # AddOp
+  | expr (EQ | NEQ | GT | LT | GTE | LTE | CONTAINS) expr  # CompareOp
+  | NOT expr                                               # NotOp
+  | expr AND expr                                          # LogicalOp
+  | expr OR expr                                           # LogicalOp
+  | expr PIPE pipeStage                                    # PipeOp
+  | primaryExpr                                            # Primary
   ;
 
 
 selectExpr
-  : SELECT LPAREN expr (COMMA expr)* RPAREN whereClause? orderClause?
+  : SELECT LPAREN expr (COMMA expr)* RPAREN whereClause? groupClause? orderClause?
+  ;
+
+// стадия конвейера t | where p | group by k | select a, b;
+// условие where — первичное выражение, иначе оно поглотило бы следующие стадии
+pipeStage
+  : WHERE primaryExpr
+  | groupClause
+  | SELECT Identifier ( COMMA Identifier )*
   ;
 
 literal
@@ -254,6 +268,7 @@ RETURN      : 'return' ;
 BREAK       : 'break' ;
 SELECT      : 'select' ;
 WHERE       : 'where' ;
+GROUP       : 'group' ;
 ORDER       : 'order' ;
 BY          : 'by' ;
 CONTAINS    : 'contains' ;
@@ -1,44 +1,122 @@
 import sys
+import logging
 from antlr4 import InputStream, CommonTokenStream
 from gen.RelTableLexer import RelTableLexer
 from gen.RelTableParser import RelTableParser
 from analyzer.semantic import RelTableSemanticAnalyzer
 from compiler.codegen import RelTableCompiler
+from compiler.optimize import optimize_module
+from compiler.profiling import CompileProfile, count_nodes
 
-def compile_file(input_path, output_path):
+NO_PROFILE = CompileProfile(enabled=False)
+
+class CompileOptions:
+    """Флаги командной строки компилятора"""
+
+    def __init__(self):
+        self.opt_level = 0
+        self.time_passes = False
+        # None — без профиля, "-" — JSON в stderr, иначе путь к файлу
+        self.profile = None
+        self.debug = False
+
+def parse_file(input_path, profile=NO_PROFILE):
     with open(input_path, "r", encoding="utf-8") as f:
         source = f.read()
 
-    # 1. Парсинг
-    input_stream = InputStream(source)
-    lexer = RelTableLexer(input_stream)
-    stream = CommonTokenStream(lexer)
-    parser = RelTableParser(stream)
-    tree = parser.program()
+    # 1. Лексический анализ (токены читаются заранее, чтобы мерить его отдельно) и парсинг
+    with profile.phase("lexing"):
+        input_stream = InputStream(source)
+        lexer = RelTableLexer(input_stream)
+        stream = CommonTokenStream(lexer)
+        stream.fill()
+    profile.count("tokens", len(stream.tokens))
+
+    with profile.phase("parsing"):
+        parser = RelTableParser(stream)
+        tree = parser.program()
+    if profile.enabled:
+        profile.count("parse_tree_nodes", count_nodes(tree))
 
     if parser.getNumberOfSyntaxErrors() > 0:
         print("Syntax errors found.")
         sys.exit(1)
+    return tree
 
+def analyze_tree(tree, profile=NO_PROFILE):
     # 2. Семантика
-    analyzer = RelTableSemanticAnalyzer()
-    analyzer.visit(tree)
+    with profile.phase("semantic"):
+        analyzer = RelTableSemanticAnalyzer()
+        analyzer.visit(tree)
+    profile.count("scopes", analyzer.scope_count)
     if analyzer.errors:
         for err in analyzer.errors: print(err)
         sys.exit(1)
+    return analyzer
 
+def generate_module(tree, analyzer, profile=NO_PROFILE):
     # 3. Кодогенерация
-    compiler = RelTableCompiler(semantic_info=analyzer)
-    llvm_module = compiler.visit(tree)
+    with profile.phase("codegen"):
+        compiler = RelTableCompiler(semantic_info=analyzer)
+        llvm_module = compiler.visit(tree)
+    profile.count("functions", len(llvm_module.functions))
+    return llvm_module
+
+def compile_module(input_path, profile=NO_PROFILE):
+    tree = parse_file(input_path, profile)
+    return generate_module(tree, analyze_tree(tree, profile), profile)
+
+def write_module(llvm_module, output_path, opt_level=0, time_passes=False, profile=NO_PROFILE):
+    if opt_level > 0 or time_passes:
+        with profile.phase("optimization"):
+            llvm_module, report = optimize_module(llvm_module, opt_level, time_passes)
+        if report:
+            print(report, file=sys.stderr)
 
     # 4. Сохранение по указанному пути
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(str(llvm_module))
+    with profile.phase("ir_serialization"):
+        text = str(llvm_module)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    profile.count("ir_bytes", len(text))
     
     print(f"IR successfully written to {output_path}")
 
+def compile_file(input_path, output_path, options=None):
+    options = options or CompileOptions()
+    profile = CompileProfile(enabled=options.profile is not None)
+    llvm_module = compile_module(input_path, profile)
+    write_module(llvm_module, output_path, options.opt_level, options.time_passes, profile)
+    if profile.enabled:
+        profile.emit(options.profile, input=input_path, opt_level=options.opt_level)
+
+def parse_args(argv):
+    """Флаги в любом месте, остальное — пути"""
+    options, paths = CompileOptions(), []
+    for arg in argv:
+        if arg in ("-O0", "-O1", "-O2", "-O3"):
+            options.opt_level = int(arg[2])
+        elif arg == "--time-passes":
+            options.time_passes = True
+        elif arg == "--profile":
+            options.profile = "-"
+        elif arg.startswith("--profile="):
+            options.profile = arg.split("=", 1)[1]
+        elif arg == "--debug":
+            options.debug = True
+        else:
+            paths.append(arg)
+    return options, paths
+
+def configure_logging(debug):
+    logging.basicConfig(level=logging.DEBUG if debug else logging.WARNING,
+                        format="%(levelname)s: %(name)s: %(message)s")
+
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python main_compiler.py <input.dsl> <output.ll>")
+    options, paths = parse_args(sys.argv[1:])
+    configure_logging(options.debug)
+    if len(paths) < 2:
+        print("Usage: python main_compiler.py [-O0|-O1|-O2|-O3] [--time-passes] [--profile[=out.json]] [--debug] "
+              "<input.dsl> <output.ll>")
     else:
-        compile_file(sys.argv[1], sys.argv[2])
\ No newline at end of file
+        compile_file(paths[0], paths[1], options)
\ No newline at end of file
@@ -1,100 +1,2654 @@
 #include <stdio.h>
 #include <stdlib.h>
+#include <stdarg.h>
 #include <string.h>
 #include <stdbool.h>
+#include <stdint.h>
+#include <math.h>
+#include <limits.h>
+
+#ifdef _WIN32
+#include <windows.h>
+#include <fcntl.h>
+#include <io.h>
+#else
+#include <fcntl.h>
+#include <pthread.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <time.h>
+#include <unistd.h>
+#endif
+
+// --- Диагностика ---
+
+void rt_flush(void);
+
+// Сообщение в stderr. Сначала сбрасывается буфер write(), иначе на терминале
+// сообщение обгоняет вывод стоящих перед ним write.
+static void diag(const char* fmt, ...) {
+    va_list args;
+    rt_flush();
+    va_start(args, fmt);
+    vfprintf(stderr, fmt, args);
+    va_end(args);
+}
+
+// --- Память ---
+//
+// Все выделения runtime идут через mem_*: перед блоком лежит заголовок с его
+// размером, по нему ведётся учёт текущего и пикового объёма (memory_report).
+
+typedef struct {
+    size_t size;
+    size_t pad;  // заголовок в 16 байт сохраняет выравнивание malloc
+} MemHeader;
+
+static size_t rt_mem_current = 0;
+static size_t rt_mem_peak = 0;
+static size_t rt_mem_mapped = 0;
+// Всего выделено байт; считается, только пока включена статистика запросов
+static size_t rt_mem_allocated = 0;
+static int rt_stats_enabled = -1;  // -1 — RELTABLE_STATS ещё не прочитана
+
+static void mem_account(size_t added, size_t removed) {
+    if (rt_stats_enabled > 0) __atomic_add_fetch(&rt_mem_allocated, added, __ATOMIC_RELAXED);
+    size_t now = __atomic_add_fetch(&rt_mem_current, added - removed, __ATOMIC_RELAXED);
+    size_t peak = __atomic_load_n(&rt_mem_peak, __ATOMIC_RELAXED);
+    while (now > peak && !__atomic_compare_exchange_n(&rt_mem_peak, &peak, now, 1, __ATOMIC_RELAXED, __ATOMIC_RELAXED)) {
+    }
+}
+
+static void* mem_check(void* p, size_t size) {
+    if (!p) {
+        fprintf(stderr, "out of memory (%llu bytes)\n", (unsigned long long)size);
+        exit(1);
+    }
+    return p;
+}
+
+static void* mem_alloc(size_t size) {
+    MemHeader* h = (MemHeader*)mem_check(malloc(sizeof(MemHeader) + size), size);
+    h->size = size;
+    mem_account(size, 0);
+    return h + 1;
+}
+
+static void* mem_calloc(size_t count, size_t size) {
+    void* p = mem_alloc(count * size);
+    memset(p, 0, count * size);
+    return p;
+}
+
+static void* mem_realloc(void* p, size_t size) {
+    if (!p) return mem_alloc(size);
+    MemHeader* h = (MemHeader*)p - 1;
+    size_t old = h->size;
+    h = (MemHeader*)mem_check(realloc(h, sizeof(MemHeader) + size), size);
+    h->size = size;
+    mem_account(size, old);
+    return h + 1;
+}
+
+static void mem_free(void* p) {
+    if (!p) return;
+    MemHeader* h = (MemHeader*)p - 1;
+    mem_account(0, h->size);
+    free(h);
+}
+
+// Регион: память выдаётся из цепочки блоков и освобождается только целиком.
+// Он есть у каждой таблицы (имена таблицы, колонок и их типов); окружения замыканий
+// сюда не попадают — сгенерированный код держит их на стеке кадра (см. _generate_lambda)
+typedef struct ArenaBlock {
+    struct ArenaBlock* next;
+    size_t used;
+    size_t size;
+    size_t pad;
+} ArenaBlock;
+
+typedef struct {
+    ArenaBlock* head;
+} Arena;
+
+#define RT_ARENA_BLOCK 4096
+#define RT_ARENA_MAX_BLOCK (1 << 20)
+
+static void* arena_alloc(Arena* a, size_t size) {
+    size = (size + 15) & ~(size_t)15;
+    ArenaBlock* b = a->head;
+    if (!b || b->used + size > b->size) {
+        // Блоки растут удвоением, чтобы длинная цепочка не набегала на больших таблицах
+        size_t capacity = b ? b->size * 2 : RT_ARENA_BLOCK;
+        if (capacity > RT_ARENA_MAX_BLOCK) capacity = RT_ARENA_MAX_BLOCK;
+        if (capacity < size) capacity = size;
+        b = (ArenaBlock*)mem_alloc(sizeof(ArenaBlock) + capacity);
+        b->next = a->head;
+        b->used = 0;
+        b->size = capacity;
+        a->head = b;
+    }
+    void* p = (char*)(b + 1) + b->used;
+    b->used += size;
+    return p;
+}
+
+static char* arena_strdup(Arena* a, const char* s) {
+    size_t len = strlen(s) + 1;
+    char* d = (char*)arena_alloc(a, len);
+    memcpy(d, s, len);
+    return d;
+}
+
+static void arena_release(Arena* a) {
+    while (a->head) {
+        ArenaBlock* next = a->head->next;
+        mem_free(a->head);
+        a->head = next;
+    }
+}
 
 // Реализация strdup, так как Zig может не видеть её в string.h на Windows
 char* my_strdup(const char* s) {
     size_t len = strlen(s) + 1;
-    char* d = (char*)malloc(len);
-    if (d) memcpy(d, s, len);
+    char* d = (char*)mem_alloc(len);
+    memcpy(d, s, len);
     return d;
 }
 
+// Монотонное время в секундах — для замеров внутри runtime
+static double rt_now_seconds(void) {
+#ifdef _WIN32
+    LARGE_INTEGER freq, now;
+    QueryPerformanceFrequency(&freq);
+    QueryPerformanceCounter(&now);
+    return (double)now.QuadPart / (double)freq.QuadPart;
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (double)ts.tv_sec + (double)ts.tv_nsec * 1e-9;
+#endif
+}
+
 // --- Структуры данных ---
 
+// Физическое представление значений колонки
+typedef enum {
+    COL_INT,      // int32_t
+    COL_DECIMAL,  // double
+    COL_BOOL,     // битовая карта: строка i — бит (i & 7) байта i >> 3
+    COL_STRING    // uint32_t код строки в словаре колонки
+} ColumnKind;
+
+// Словарь строковой колонки: каждое различное значение хранится один раз,
+// строки таблицы держат его код. Код 0 — пустая строка. Значения лежат в bytes
+// подряд с \0 на конце, offsets[code] — начало значения, slots — хеш-таблица
+// кодов для поиска при вставке. Словарь только растёт и бывает общим у копий
+// колонки (материализация, соединение, группировка), поэтому у него счётчик ссылок.
+typedef struct {
+    char* bytes;
+    size_t used;
+    size_t capacity;
+    uint32_t* offsets;
+    int count;
+    int entry_capacity;
+    int* slots;  // -1 — пусто
+    int slot_capacity;
+    int refs;
+} StringDict;
+
 typedef struct {
     char* name;
     char* type;
+    ColumnKind kind;
+    int elem_size;  // для bool 0: размер буфера считает column_bytes
+    // Буфер указывает в отображённый файл (load_table), а не в память malloc
+    int borrowed;
+    StringDict* dict;  // только у строковых колонок
 } Column;
 
+// Хеш-индекс по int-колонке (create_index): открытая адресация с линейным
+// пробированием по различным ключам. Ячейка хранит первую строку цепочки
+// ключа (или -1) и последнюю, next связывает строки с одинаковым ключом
+// по возрастанию — построение O(n), поиск O(совпадений).
 typedef struct {
-    int* data; 
-} Row;
+    int col;
+    int* slots;
+    int* tails;
+    int capacity;  // степень двойки
+    int count;     // различных ключей
+    int* next;
+    int next_capacity;
+} HashIndex;
 
+// Минимум и максимум числовой колонки по блокам из RT_ZONE_ROWS строк.
+// Блоки совпадают с порциями скана, так что скан пропускает блок целиком,
+// если диапазон условия не пересекается с [min, max].
 typedef struct {
+    double* min;
+    double* max;
+    int rows;      // сколько строк уже учтено
+    int capacity;  // под сколько блоков выделены массивы
+} ZoneMap;
+
+// Колоночное хранение: у каждой колонки свой непрерывный буфер,
+// строка — это просто индекс в этих буферах.
+//
+// Результат select — представление (view): буферы и колонки общие с base,
+// а sel хранит индексы выбранных строк base. Своими данными представление
+// обзаводится только при изменении (table_materialize).
+typedef struct Table {
     char* name;
     Column* columns;
+    void** col_data;
     int col_count;
-    Row* rows;
     int row_count;
     int row_capacity;
+
+    struct Table* base;
+    int* sel;
+    // Представления, построенные поверх этой таблицы
+    struct Table** views;
+    int view_count;
+    int view_capacity;
+
+    // Отображение файла, в которое смотрят заимствованные буферы колонок
+    void* mapping;
+    size_t mapping_size;
+
+    // Индексы обновляются при каждом добавлении строк
+    HashIndex* indexes;
+    int index_count;
+
+    // Зональные карты по колонкам (только у обычных таблиц), догоняют row_count
+    ZoneMap* zones;
+    int zone_count;
+
+    // Имена и строковые значения таблицы; освобождается целиком в rt_drop_table
+    Arena arena;
 } Table;
 
+// Ссылка на строку, которую получает предикат: буферы колонок + индекс строки.
+// Поле cols идёт первым — кодогенератор читает его напрямую.
+typedef struct {
+    void** cols;
+    int index;
+    Table* table;
+} RowRef;
+
 typedef struct {
     int (*fn_ptr)(void* env, void* row);
     void* env_ptr;
 } Closure;
 
+// Скомпилированный цикл фильтрации для конкретного select ... where:
+// проверяет строки [begin, end) и пишет в out индексы совпавших строк в буферах
+// колонок (для представления — индексы base), возвращает их число
+typedef int (*ScanKernel)(void* env, void* table, int begin, int end, int* out);
+
+// Условие предиката вида lo <= колонка col <= hi: вне диапазона строка точно не подходит
+typedef struct {
+    int col;
+    double lo;
+    double hi;
+} ZoneRange;
+
+// Ключ соединения: колонка left_col таблицы left_table равна колонке right_col
+// таблицы right_table (left_table < right_table, обе колонки int)
+typedef struct {
+    int left_table;
+    int left_col;
+    int right_table;
+    int right_col;
+} JoinKey;
+
+// Предикат select над несколькими таблицами: rows[i] — RowRef* строки i-й таблицы
+typedef int (*JoinPredicate)(void* env, void** rows);
+
+#define RT_INITIAL_CAPACITY 16
+#define RT_SCAN_CHUNK 4096
+#define RT_ZONE_ROWS RT_SCAN_CHUNK
+// Меньшие таблицы фильтруются в одном потоке: запуск работы дороже самого скана
+#define RT_PARALLEL_MIN_ROWS (4 * RT_SCAN_CHUNK)
+
+// --- Внутренние функции ---
+
+static ColumnKind column_kind(const char* type) {
+    if (strcmp(type, "decimal") == 0) return COL_DECIMAL;
+    if (strcmp(type, "bool") == 0) return COL_BOOL;
+    if (strcmp(type, "string") == 0) return COL_STRING;
+    return COL_INT;
+}
+
+static int column_elem_size(ColumnKind kind) {
+    switch (kind) {
+        case COL_DECIMAL: return sizeof(double);
+        case COL_BOOL: return 0;
+        case COL_STRING: return sizeof(uint32_t);
+        default: return sizeof(int);
+    }
+}
+
+// Размер буфера колонки на rows строк
+static size_t column_bytes(const Column* col, int rows) {
+    if (col->kind == COL_BOOL) return ((size_t)rows + 7) / 8;
+    return (size_t)rows * col->elem_size;
+}
+
+static int bit_get(const unsigned char* bits, int i) {
+    return (bits[i >> 3] >> (i & 7)) & 1;
+}
+
+static void bit_set(unsigned char* bits, int i, int value) {
+    if (value) bits[i >> 3] |= (unsigned char)(1u << (i & 7));
+    else bits[i >> 3] &= (unsigned char)~(1u << (i & 7));
+}
+
+#define RT_DICT_INITIAL 256
+
+static uint32_t string_hash(const char* str, size_t len) {
+    uint32_t h = 2166136261u;
+    for (size_t i = 0; i < len; i++) h = (h ^ (unsigned char)str[i]) * 16777619u;
+    return h;
+}
+
+static StringDict* dict_create(void) {
+    StringDict* d = (StringDict*)mem_alloc(sizeof(StringDict));
+    d->capacity = RT_DICT_INITIAL;
+    d->bytes = (char*)mem_alloc(d->capacity);
+    d->bytes[0] = '\0';
+    d->used = 1;
+    d->entry_capacity = 16;
+    d->offsets = (uint32_t*)mem_alloc(sizeof(uint32_t) * d->entry_capacity);
+    d->offsets[0] = 0;
+    d->count = 1;
+    d->slot_capacity = 32;
+    d->slots = (int*)mem_alloc(sizeof(int) * d->slot_capacity);
+    memset(d->slots, 0xff, sizeof(int) * d->slot_capacity);
+    d->refs = 1;
+    return d;
+}
+
+static StringDict* dict_retain(StringDict* d) {
+    if (d) d->refs++;
+    return d;
+}
+
+static void dict_release(StringDict* d) {
+    if (d && --d->refs == 0) {
+        mem_free(d->bytes);
+        mem_free(d->offsets);
+        mem_free(d->slots);
+        mem_free(d);
+    }
+}
+
+static size_t dict_entry_len(const StringDict* d, int code) {
+    size_t end = code + 1 < d->count ? d->offsets[code + 1] : d->used;
+    return end - d->offsets[code] - 1;
+}
+
+static void dict_insert_slot(StringDict* d, int code) {
+    uint32_t mask = (uint32_t)d->slot_capacity - 1;
+    uint32_t h = string_hash(d->bytes + d->offsets[code], dict_entry_len(d, code)) & mask;
+    while (d->slots[h] >= 0) h = (h + 1) & mask;
+    d->slots[h] = code;
+}
+
+// Код строки или -1, если её нет в словаре
+static int dict_find(const StringDict* d, const char* str) {
+    if (!str || !*str) return 0;
+    size_t len = strlen(str);
+    uint32_t mask = (uint32_t)d->slot_capacity - 1;
+    for (uint32_t h = string_hash(str, len) & mask; d->slots[h] >= 0; h = (h + 1) & mask) {
+        int code = d->slots[h];
+        if (dict_entry_len(d, code) == len && memcmp(d->bytes + d->offsets[code], str, len) == 0) return code;
+    }
+    return -1;
+}
+
+// Код строки; новое значение дописывается в словарь. str может указывать в сам словарь
+static uint32_t dict_add(StringDict* d, const char* str) {
+    int found = dict_find(d, str);
+    if (found >= 0) return (uint32_t)found;
+    size_t len = strlen(str) + 1;
+    if (d->used + len > UINT32_MAX || d->count == INT_MAX) {
+        fprintf(stderr, "string column exceeds 4 GB\n");
+        exit(1);
+    }
+    if (d->used + len > d->capacity) {
+        size_t inside = str >= d->bytes && str < d->bytes + d->used ? (size_t)(str - d->bytes) : (size_t)-1;
+        while (d->used + len > d->capacity) d->capacity *= 2;
+        d->bytes = (char*)mem_realloc(d->bytes, d->capacity);
+        if (inside != (size_t)-1) str = d->bytes + inside;
+    }
+    if (d->count == d->entry_capacity) {
+        d->entry_capacity *= 2;
+        d->offsets = (uint32_t*)mem_realloc(d->offsets, sizeof(uint32_t) * d->entry_capacity);
+    }
+    memcpy(d->bytes + d->used, str, len);
+    int code = d->count++;
+    d->offsets[code] = (uint32_t)d->used;
+    d->used += len;
+    // Заполнение хеш-таблицы держится не выше половины
+    if (d->count * 2 > d->slot_capacity) {
+        d->slot_capacity *= 2;
+        d->slots = (int*)mem_realloc(d->slots, sizeof(int) * d->slot_capacity);
+        memset(d->slots, 0xff, sizeof(int) * d->slot_capacity);
+        for (int i = 1; i < d->count; i++) dict_insert_slot(d, i);
+    } else {
+        dict_insert_slot(d, code);
+    }
+    return (uint32_t)code;
+}
+
+// Заменяет содержимое пустого словаря на count значений из файла
+static void dict_load(StringDict* d, int count, const uint32_t* offsets, const char* bytes, size_t used) {
+    while (d->capacity < used) d->capacity *= 2;
+    d->bytes = (char*)mem_realloc(d->bytes, d->capacity);
+    memcpy(d->bytes, bytes, used);
+    d->used = used;
+    while (d->entry_capacity < count) d->entry_capacity *= 2;
+    d->offsets = (uint32_t*)mem_realloc(d->offsets, sizeof(uint32_t) * d->entry_capacity);
+    memcpy(d->offsets, offsets, sizeof(uint32_t) * count);
+    d->count = count;
+    while (d->slot_capacity < count * 2) d->slot_capacity *= 2;
+    d->slots = (int*)mem_realloc(d->slots, sizeof(int) * d->slot_capacity);
+    memset(d->slots, 0xff, sizeof(int) * d->slot_capacity);
+    for (int i = 1; i < count; i++) dict_insert_slot(d, i);
+}
+
+static const char* column_string(const Column* col, const void* data, int row) {
+    const StringDict* d = col->dict;
+    return d->bytes + d->offsets[((const uint32_t*)data)[row]];
+}
+
+// Обнуляет значение строки row: 0, false или пустая строка
+static void column_clear(const Column* col, void* data, int row) {
+    if (col->kind == COL_BOOL) bit_set((unsigned char*)data, row, 0);
+    else memset((char*)data + (size_t)row * col->elem_size, 0, col->elem_size);
+}
+
+// dst[k] = src[indices[k]] для буферов колонки col; строки — смещения в той же куче
+static void column_gather(const Column* col, void* dst, const void* src, const int* indices, int n) {
+    switch (col->kind) {
+        case COL_BOOL:
+            memset(dst, 0, ((size_t)n + 7) / 8);
+            for (int k = 0; k < n; k++) {
+                if (bit_get((const unsigned char*)src, indices[k])) ((unsigned char*)dst)[k >> 3] |= (unsigned char)(1u << (k & 7));
+            }
+            break;
+        case COL_DECIMAL:
+            for (int k = 0; k < n; k++) ((double*)dst)[k] = ((const double*)src)[indices[k]];
+            break;
+        default:
+            for (int k = 0; k < n; k++) ((int*)dst)[k] = ((const int*)src)[indices[k]];
+    }
+}
+
+// Гарантирует место под min_capacity строк; буферы растут удвоением
+static void table_reserve(Table* t, int min_capacity) {
+    if (min_capacity <= t->row_capacity) return;
+    int new_capacity = t->row_capacity;
+    while (new_capacity < min_capacity) new_capacity *= 2;
+    for (int c = 0; c < t->col_count; c++) {
+        Column* col = &t->columns[c];
+        if (col->borrowed) {
+            // Отображение файла не растёт: переносим колонку в свою память
+            void* owned = mem_alloc(column_bytes(col, new_capacity));
+            memcpy(owned, t->col_data[c], column_bytes(col, t->row_count));
+            t->col_data[c] = owned;
+            col->borrowed = 0;
+        } else {
+            t->col_data[c] = mem_realloc(t->col_data[c], column_bytes(col, new_capacity));
+        }
+    }
+    t->row_capacity = new_capacity;
+}
+
+// Пустое представление над src; у представления над представлением base — исходная таблица
+static Table* view_create(Table* src) {
+    Table* base = src->base ? src->base : src;
+    Table* v = (Table*)mem_alloc(sizeof(Table));
+    v->arena.head = NULL;
+    v->name = arena_strdup(&v->arena, "QueryResult");
+    v->columns = base->columns;
+    v->col_data = base->col_data;
+    v->col_count = base->col_count;
+    v->row_count = 0;
+    v->row_capacity = 0;
+    v->base = base;
+    v->sel = NULL;
+    v->views = NULL;
+    v->view_count = 0;
+    v->view_capacity = 0;
+    v->mapping = NULL;
+    v->mapping_size = 0;
+    v->indexes = NULL;
+    v->index_count = 0;
+    v->zones = NULL;
+    v->zone_count = 0;
+
+    if (base->view_count >= base->view_capacity) {
+        base->view_capacity = base->view_capacity ? base->view_capacity * 2 : 4;
+        base->views = (Table**)mem_realloc(base->views, sizeof(Table*) * base->view_capacity);
+    }
+    base->views[base->view_count++] = v;
+    return v;
+}
+
+static void view_reserve(Table* v, int min_capacity) {
+    if (min_capacity <= v->row_capacity) return;
+    int new_capacity = v->row_capacity ? v->row_capacity : RT_INITIAL_CAPACITY;
+    while (new_capacity < min_capacity) new_capacity *= 2;
+    v->sel = (int*)mem_realloc(v->sel, sizeof(int) * new_capacity);
+    v->row_capacity = new_capacity;
+}
+
+// Снимает представление v с учёта в его base
+static void view_unregister(Table* v) {
+    Table* base = v->base;
+    for (int i = 0; i < base->view_count; i++) {
+        if (base->views[i] == v) {
+            base->views[i] = base->views[--base->view_count];
+            break;
+        }
+    }
+}
+
+// Копирует выбранные строки в собственные буферы: представление становится обычной таблицей
+static void table_materialize(Table* v) {
+    Table* base = v->base;
+    if (!base) return;
+
+    int capacity = RT_INITIAL_CAPACITY;
+    while (capacity < v->row_count) capacity *= 2;
+
+    Column* columns = (Column*)mem_alloc(sizeof(Column) * (v->col_count ? v->col_count : 1));
+    void** col_data = (void**)mem_alloc(sizeof(void*) * (v->col_count ? v->col_count : 1));
+    for (int c = 0; c < v->col_count; c++) {
+        columns[c] = base->columns[c];
+        columns[c].borrowed = 0;
+        columns[c].name = arena_strdup(&v->arena, base->columns[c].name);
+        columns[c].type = arena_strdup(&v->arena, base->columns[c].type);
+        dict_retain(columns[c].dict);
+        col_data[c] = mem_alloc(column_bytes(&columns[c], capacity));
+        column_gather(&columns[c], col_data[c], base->col_data[c], v->sel, v->row_count);
+    }
+    view_unregister(v);
+    mem_free(v->sel);
+    v->columns = columns;
+    v->col_data = col_data;
+    v->row_capacity = capacity;
+    v->sel = NULL;
+    v->base = NULL;
+}
+
+// Перед изменением схемы все представления над t получают свои копии данных
+static void table_detach_views(Table* t) {
+    while (t->view_count > 0) {
+        table_materialize(t->views[t->view_count - 1]);
+    }
+}
+
+// Номер строки в буферах колонок для позиции i таблицы или представления
+static int table_row_at(Table* t, int i) {
+    return t->sel ? t->sel[i] : i;
+}
+
+static int table_find_column(Table* t, const char* col_name) {
+    for (int c = 0; c < t->col_count; c++) {
+        if (strcmp(t->columns[c].name, col_name) == 0) return c;
+    }
+    return -1;
+}
+
+static uint32_t index_hash(int key) {
+    uint32_t h = (uint32_t)key;
+    h ^= h >> 16;
+    h *= 0x45d9f3bu;
+    h ^= h >> 16;
+    return h;
+}
+
+// Ячейка ключа: либо занятая им, либо первая пустая на его пути
+static uint32_t index_slot(const HashIndex* ix, const int* keys, int key) {
+    uint32_t mask = (uint32_t)ix->capacity - 1;
+    uint32_t h = index_hash(key) & mask;
+    while (ix->slots[h] >= 0 && keys[ix->slots[h]] != key) h = (h + 1) & mask;
+    return h;
+}
+
+// Переносит цепочки в таблицу ячеек вдвое большей ёмкости; сами цепочки не меняются
+static void index_grow(HashIndex* ix, const int* keys) {
+    int* old_slots = ix->slots;
+    int* old_tails = ix->tails;
+    int old_capacity = ix->capacity;
+    ix->capacity = old_capacity ? old_capacity * 2 : RT_INITIAL_CAPACITY;
+    ix->slots = (int*)mem_alloc(sizeof(int) * ix->capacity);
+    ix->tails = (int*)mem_alloc(sizeof(int) * ix->capacity);
+    memset(ix->slots, 0xff, sizeof(int) * ix->capacity);
+    for (int i = 0; i < old_capacity; i++) {
+        if (old_slots[i] < 0) continue;
+        uint32_t h = index_slot(ix, keys, keys[old_slots[i]]);
+        ix->slots[h] = old_slots[i];
+        ix->tails[h] = old_tails[i];
+    }
+    mem_free(old_slots);
+    mem_free(old_tails);
+}
+
+// Вносит в индекс строки [first, row_count): строка дописывается в хвост цепочки
+// своего ключа; заполнение ячеек держится не выше половины
+static void index_add_rows(Table* t, HashIndex* ix, int first) {
+    const int* keys = (const int*)t->col_data[ix->col];
+    if (t->row_count > ix->next_capacity) {
+        ix->next_capacity = t->row_capacity > t->row_count ? t->row_capacity : t->row_count;
+        ix->next = (int*)mem_realloc(ix->next, sizeof(int) * ix->next_capacity);
+    }
+    for (int row = first; row < t->row_count; row++) {
+        if ((ix->count + 1) * 2 > ix->capacity) index_grow(ix, keys);
+        uint32_t h = index_slot(ix, keys, keys[row]);
+        ix->next[row] = -1;
+        if (ix->slots[h] < 0) {
+            ix->slots[h] = row;
+            ix->count++;
+        } else {
+            ix->next[ix->tails[h]] = row;
+        }
+        ix->tails[h] = row;
+    }
+}
+
+// Учитывает в карте строки [from, to) одного блока
+static void zone_extend(ZoneMap* z, ColumnKind kind, const void* data, int from, int to) {
+    int block = from / RT_ZONE_ROWS;
+    double lo = from % RT_ZONE_ROWS ? z->min[block] : HUGE_VAL;
+    double hi = from % RT_ZONE_ROWS ? z->max[block] : -HUGE_VAL;
+    if (kind == COL_INT) {
+        const int* values = (const int*)data;
+        for (int i = from; i < to; i++) {
+            if (values[i] < lo) lo = values[i];
+            if (values[i] > hi) hi = values[i];
+        }
+    } else {
+        const double* values = (const double*)data;
+        for (int i = from; i < to; i++) {
+            if (values[i] < lo) lo = values[i];
+            if (values[i] > hi) hi = values[i];
+        }
+    }
+    z->min[block] = lo;
+    z->max[block] = hi;
+}
+
+// Доводит зональные карты int/decimal колонок до row_count
+static void table_update_zones(Table* t) {
+    if (t->base) return;
+    if (t->zone_count < t->col_count) {
+        t->zones = (ZoneMap*)mem_realloc(t->zones, sizeof(ZoneMap) * t->col_count);
+        memset(&t->zones[t->zone_count], 0, sizeof(ZoneMap) * (t->col_count - t->zone_count));
+        t->zone_count = t->col_count;
+    }
+    int blocks = (t->row_count + RT_ZONE_ROWS - 1) / RT_ZONE_ROWS;
+    for (int c = 0; c < t->col_count; c++) {
+        ColumnKind kind = t->columns[c].kind;
+        ZoneMap* z = &t->zones[c];
+        if ((kind != COL_INT && kind != COL_DECIMAL) || z->rows >= t->row_count) continue;
+        if (blocks > z->capacity) {
+            int capacity = z->capacity ? z->capacity : 1;
+            while (capacity < blocks) capacity *= 2;
+            z->min = (double*)mem_realloc(z->min, sizeof(double) * capacity);
+            z->max = (double*)mem_realloc(z->max, sizeof(double) * capacity);
+            z->capacity = capacity;
+        }
+        for (int from = z->rows; from < t->row_count; ) {
+            int to = (from / RT_ZONE_ROWS + 1) * RT_ZONE_ROWS;
+            if (to > t->row_count) to = t->row_count;
+            zone_extend(z, kind, t->col_data[c], from, to);
+            from = to;
+        }
+        z->rows = t->row_count;
+    }
+}
+
+// Может ли в блоке найтись строка, удовлетворяющая всем диапазонам
+static int zone_may_match(Table* t, int block, int range_count, const ZoneRange* ranges) {
+    for (int r = 0; r < range_count; r++) {
+        int c = ranges[r].col;
+        if (c < 0 || c >= t->zone_count || t->zones[c].rows == 0) continue;
+        if (t->columns[c].kind != COL_INT && t->columns[c].kind != COL_DECIMAL) continue;
+        if (t->zones[c].max[block] < ranges[r].lo || t->zones[c].min[block] > ranges[r].hi) return 0;
+    }
+    return 1;
+}
+
+// Вызывается всеми путями добавления строк после записи значений
+static void table_rows_appended(Table* t, int first) {
+    for (int k = 0; k < t->index_count; k++) index_add_rows(t, &t->indexes[k], first);
+    table_update_zones(t);
+}
+
+static HashIndex* table_find_index(Table* t, int col) {
+    for (int k = 0; k < t->index_count; k++) {
+        if (t->indexes[k].col == col) return &t->indexes[k];
+    }
+    return NULL;
+}
+
 // --- API ---
 
 void* rt_create_table(const char* name) {
-    Table* t = (Table*)malloc(sizeof(Table));
-    t->name = my_strdup(name);
+    Table* t = (Table*)mem_alloc(sizeof(Table));
+    t->arena.head = NULL;
+    t->name = arena_strdup(&t->arena, name);
     t->columns = NULL;
+    t->col_data = NULL;
     t->col_count = 0;
-    t->rows = (Row*)malloc(sizeof(Row) * 10);
     t->row_count = 0;
-    t->row_capacity = 10;
+    t->row_capacity = RT_INITIAL_CAPACITY;
+    t->base = NULL;
+    t->sel = NULL;
+    t->views = NULL;
+    t->view_count = 0;
+    t->view_capacity = 0;
+    t->mapping = NULL;
+    t->mapping_size = 0;
+    t->indexes = NULL;
+    t->index_count = 0;
+    t->zones = NULL;
+    t->zone_count = 0;
     return (void*)t;
 }
 
 void rt_add_column(void* table, const char* col_name, const char* type) {
     Table* t = (Table*)table;
+    table_materialize(t);
+    table_detach_views(t);
     t->col_count++;
-    t->columns = (Column*)realloc(t->columns, sizeof(Column) * t->col_count);
-    t->columns[t->col_count - 1].name = my_strdup(col_name);
-    t->columns[t->col_count - 1].type = my_strdup(type);
+    t->columns = (Column*)mem_realloc(t->columns, sizeof(Column) * t->col_count);
+    Column* col = &t->columns[t->col_count - 1];
+    col->name = arena_strdup(&t->arena, col_name);
+    col->type = arena_strdup(&t->arena, type);
+    col->kind = column_kind(type);
+    col->elem_size = column_elem_size(col->kind);
+    col->borrowed = 0;
+    col->dict = col->kind == COL_STRING ? dict_create() : NULL;
+    // Уже существующие строки получают в новой колонке нулевое значение
+    t->col_data = (void**)mem_realloc(t->col_data, sizeof(void*) * t->col_count);
+    t->col_data[t->col_count - 1] = mem_calloc(column_bytes(col, t->row_capacity), 1);
+}
+
+// Дописывает строку из нулей, индексы не трогает
+static void table_append_zero_row(Table* t) {
+    table_materialize(t);
+    table_reserve(t, t->row_count + 1);
+    for (int c = 0; c < t->col_count; c++) column_clear(&t->columns[c], t->col_data[c], t->row_count);
+    t->row_count++;
 }
 
 void rt_add_row(void* table) {
     Table* t = (Table*)table;
-    if (t->row_count >= t->row_capacity) {
-        t->row_capacity *= 2;
-        t->rows = (Row*)realloc(t->rows, sizeof(Row) * t->row_capacity);
+    table_append_zero_row(t);
+    table_rows_appended(t, t->row_count - 1);
+}
+
+// Дописывает n строк одним блоком: columns[c] — n значений колонки c
+// (их раскладывает кодогенератор): int32, double, по байту 0/1 на bool,
+// const char* на строку. Bool упаковываются в биты, строки копируются в кучу колонки.
+// Колонки с номером >= col_count, добавленные позже компиляции, получают ноль.
+void rt_append_rows(void* table, int n, int col_count, void** columns) {
+    Table* t = (Table*)table;
+    table_materialize(t);
+    table_reserve(t, t->row_count + n);
+    int first = t->row_count;
+    for (int c = 0; c < t->col_count; c++) {
+        Column* col = &t->columns[c];
+        void* data = t->col_data[c];
+        if (c >= col_count) {
+            for (int i = 0; i < n; i++) column_clear(col, data, first + i);
+        } else if (col->kind == COL_BOOL) {
+            const unsigned char* src = (const unsigned char*)columns[c];
+            for (int i = 0; i < n; i++) bit_set((unsigned char*)data, first + i, src[i]);
+        } else if (col->kind == COL_STRING) {
+            const char* const* src = (const char* const*)columns[c];
+            for (int i = 0; i < n; i++) ((uint32_t*)data)[first + i] = dict_add(col->dict, src[i]);
+        } else {
+            memcpy((char*)data + (size_t)first * col->elem_size, columns[c], (size_t)n * col->elem_size);
+        }
+    }
+    t->row_count += n;
+    table_rows_appended(t, first);
+}
+
+static void column_store(Table* t, int c, int index, char kind, void* value) {
+    void* data = t->col_data[c];
+    double d = kind == 'd' ? *(double*)value : kind == 's' ? 0.0 : (double)(kind == 'b' ? *(unsigned char*)value : *(int*)value);
+    switch (t->columns[c].kind) {
+        case COL_INT: ((int*)data)[index] = (int)d; break;
+        case COL_DECIMAL: ((double*)data)[index] = d; break;
+        case COL_BOOL: bit_set((unsigned char*)data, index, d != 0.0); break;
+        case COL_STRING:
+            ((uint32_t*)data)[index] = dict_add(t->columns[c].dict, kind == 's' ? *(const char**)value : NULL);
+            break;
+    }
+}
+
+// Одна строка, когда типы значений известны только во время выполнения:
+// kinds[i] — 'i' (int), 'd' (decimal), 'b' (bool) или 's' (string) для values[i].
+// Значения приводятся к типам колонок, недостающие колонки получают ноль.
+void rt_add_row_values(void* table, int count, const char* kinds, void** values) {
+    Table* t = (Table*)table;
+    table_append_zero_row(t);
+    for (int c = 0; c < t->col_count && c < count; c++) {
+        column_store(t, c, t->row_count - 1, kinds[c], values[c]);
+    }
+    table_rows_appended(t, t->row_count - 1);
+}
+
+// Доступ к полю строки по имени колонки — когда слот неизвестен при компиляции.
+// Значение приводится к типу, который ожидает кодогенератор.
+static double row_number(RowRef* row, int c) {
+    void* data = row->cols[c];
+    switch (row->table->columns[c].kind) {
+        case COL_DECIMAL: return ((double*)data)[row->index];
+        case COL_BOOL: return bit_get((const unsigned char*)data, row->index);
+        case COL_STRING: return 0.0;
+        default: return ((int*)data)[row->index];
     }
-    Row* r = &t->rows[t->row_count];
-    r->data = (int*)malloc(sizeof(int) * (t->col_count + 1));
-    memset(r->data, 0, sizeof(int) * (t->col_count + 1));
-    t->row_count++;
 }
 
 int rt_get_int(void* row_ptr, const char* col_name) {
-    // В упрощенном рантайме возвращаем 42 или значение из данных,
-    // если бы мы хранили соответствие колонок строке
-    return 42; 
+    RowRef* row = (RowRef*)row_ptr;
+    int c = table_find_column(row->table, col_name);
+    return c < 0 ? 0 : (int)row_number(row, c);
 }
 
-void* rt_table_select(void* table, Closure closure) {
-    Table* src = (Table*)table;
-    Table* res = (Table*)rt_create_table("QueryResult");
-    
-    for (int i = 0; i < src->col_count; i++) {
-        rt_add_column(res, src->columns[i].name, src->columns[i].type);
+double rt_get_decimal(void* row_ptr, const char* col_name) {
+    RowRef* row = (RowRef*)row_ptr;
+    int c = table_find_column(row->table, col_name);
+    return c < 0 ? 0.0 : row_number(row, c);
+}
+
+bool rt_get_bool(void* row_ptr, const char* col_name) {
+    RowRef* row = (RowRef*)row_ptr;
+    int c = table_find_column(row->table, col_name);
+    return c >= 0 && row_number(row, c) != 0.0;
+}
+
+const char* rt_get_string(void* row_ptr, const char* col_name) {
+    RowRef* row = (RowRef*)row_ptr;
+    int c = table_find_column(row->table, col_name);
+    if (c < 0 || row->table->columns[c].kind != COL_STRING) return "";
+    return column_string(&row->table->columns[c], row->cols[c], row->index);
+}
+
+// Строковое поле по слоту, известному при компиляции: смещение + куча колонки
+const char* rt_row_string(void* row_ptr, int c) {
+    RowRef* row = (RowRef*)row_ptr;
+    return column_string(&row->table->columns[c], row->cols[c], row->index);
+}
+
+// --- Строковые условия ---
+//
+// Строковая колонка хранит коды словаря, поэтому условия над ней в ядре скана
+// сводятся к целым числам: r.s == k — сравнение с кодом k (его ищут один раз
+// до скана, -1 — такой строки в колонке нет), r.s contains k — чтение флага
+// matches[код], посчитанного заранее для каждого значения словаря.
+
+// Поиск подстроки (Хорспул): таблица сдвигов строится один раз на образец
+typedef struct {
+    const char* needle;
+    size_t len;
+    size_t skip[256];
+} Substring;
+
+static void substring_init(Substring* p, const char* needle) {
+    p->needle = needle;
+    p->len = strlen(needle);
+    for (int i = 0; i < 256; i++) p->skip[i] = p->len;
+    for (size_t i = 0; i + 1 < p->len; i++) p->skip[(unsigned char)needle[i]] = p->len - 1 - i;
+}
+
+static int substring_find(const Substring* p, const char* hay, size_t hay_len) {
+    if (p->len == 0) return 1;
+    if (p->len == 1) return memchr(hay, p->needle[0], hay_len) != NULL;
+    unsigned char last = (unsigned char)p->needle[p->len - 1];
+    for (size_t i = 0; i + p->len <= hay_len; i += p->skip[(unsigned char)hay[i + p->len - 1]]) {
+        if ((unsigned char)hay[i + p->len - 1] == last && memcmp(hay + i, p->needle, p->len - 1) == 0) return 1;
     }
+    return 0;
+}
 
-    for (int i = 0; i < src->row_count; i++) {
-        Row* current_row = &src->rows[i];
-        // Вызов LLVM функции через указатель
-        if (closure.fn_ptr(closure.env_ptr, (void*)current_row)) {
-            rt_add_row(res);
-            memcpy(res->rows[res->row_count-1].data, current_row->data, sizeof(int) * src->col_count);
+int rt_column_code(void* table, int c, const char* str) {
+    return dict_find(((Table*)table)->columns[c].dict, str);
+}
+
+// Флаг «значение содержит needle» для каждого кода словаря колонки c;
+// освобождается rt_free_matches после скана
+unsigned char* rt_string_matches(void* table, int c, const char* needle) {
+    const StringDict* d = ((Table*)table)->columns[c].dict;
+    Substring pattern;
+    substring_init(&pattern, needle ? needle : "");
+    unsigned char* matches = (unsigned char*)mem_alloc(d->count);
+    for (int code = 0; code < d->count; code++) {
+        matches[code] = (unsigned char)substring_find(&pattern, d->bytes + d->offsets[code], dict_entry_len(d, code));
+    }
+    return matches;
+}
+
+void rt_free_matches(unsigned char* matches) {
+    mem_free(matches);
+}
+
+// Сравнение строк вне колонок: знак как у strcmp, NULL — пустая строка
+int rt_string_compare(const char* a, const char* b) {
+    return strcmp(a ? a : "", b ? b : "");
+}
+
+// Сравнение полей, типы которых известны только при выполнении (таблицы из load_table):
+// две строковые колонки — как строки, иначе — как числа. Результат <0, 0 или >0
+int rt_compare_fields(void* left_row, const char* left_name, void* right_row, const char* right_name) {
+    RowRef* left = (RowRef*)left_row;
+    RowRef* right = (RowRef*)right_row;
+    int lc = table_find_column(left->table, left_name);
+    int rc = table_find_column(right->table, right_name);
+    if (lc >= 0 && rc >= 0 && left->table->columns[lc].kind == COL_STRING && right->table->columns[rc].kind == COL_STRING) {
+        return strcmp(column_string(&left->table->columns[lc], left->cols[lc], left->index),
+                      column_string(&right->table->columns[rc], right->cols[rc], right->index));
+    }
+    double a = lc < 0 ? 0.0 : row_number(left, lc);
+    double b = rc < 0 ? 0.0 : row_number(right, rc);
+    return (a > b) - (a < b);
+}
+
+bool rt_string_contains(const char* str, const char* needle) {
+    return strstr(str ? str : "", needle ? needle : "") != NULL;
+}
+
+void** rt_table_columns(void* table) {
+    return ((Table*)table)->col_data;
+}
+
+// Для представления — индексы строк в буферах колонок, для обычной таблицы NULL
+int* rt_table_selection(void* table) {
+    return ((Table*)table)->sel;
+}
+
+// --- Параллельный select ---
+//
+// Пул рабочих потоков создаётся при первом параллельном скане и живёт до конца
+// программы. Задача делится на части; части разбирают рабочие и сам вызывающий поток.
+
+typedef void (*PoolTask)(void* arg, int part);
+
+#ifdef _WIN32
+typedef SRWLOCK rt_mutex;
+typedef CONDITION_VARIABLE rt_cond;
+#define RT_MUTEX_INIT SRWLOCK_INIT
+#define RT_COND_INIT CONDITION_VARIABLE_INIT
+static void mutex_lock(rt_mutex* m) { AcquireSRWLockExclusive(m); }
+static void mutex_unlock(rt_mutex* m) { ReleaseSRWLockExclusive(m); }
+static void cond_wait(rt_cond* c, rt_mutex* m) { SleepConditionVariableSRW(c, m, INFINITE, 0); }
+static void cond_broadcast(rt_cond* c) { WakeAllConditionVariable(c); }
+#else
+typedef pthread_mutex_t rt_mutex;
+typedef pthread_cond_t rt_cond;
+#define RT_MUTEX_INIT PTHREAD_MUTEX_INITIALIZER
+#define RT_COND_INIT PTHREAD_COND_INITIALIZER
+static void mutex_lock(rt_mutex* m) { pthread_mutex_lock(m); }
+static void mutex_unlock(rt_mutex* m) { pthread_mutex_unlock(m); }
+static void cond_wait(rt_cond* c, rt_mutex* m) { pthread_cond_wait(c, m); }
+static void cond_broadcast(rt_cond* c) { pthread_cond_broadcast(c); }
+#endif
+
+static struct {
+    rt_mutex lock;
+    rt_cond work;
+    rt_cond finished;
+    int workers;
+    unsigned generation;
+    PoolTask task;
+    void* arg;
+    int parts;
+    int next_part;
+    int done_parts;
+} rt_pool = { RT_MUTEX_INIT, RT_COND_INIT, RT_COND_INIT, 0, 0, NULL, NULL, 0, 0, 0 };
+
+// Число потоков select: 0 — ещё не прочитано из RELTABLE_THREADS
+static int rt_threads = 0;
+
+void rt_set_threads(int count) {
+    rt_threads = count > 0 ? count : 1;
+}
+
+static int select_threads(void) {
+    if (rt_threads == 0) {
+        const char* env = getenv("RELTABLE_THREADS");
+        rt_set_threads(env ? atoi(env) : 1);
+    }
+    return rt_threads;
+}
+
+// Разбирает части текущей задачи; вызывается с захваченным lock
+static void pool_work(void) {
+    while (rt_pool.next_part < rt_pool.parts) {
+        int part = rt_pool.next_part++;
+        PoolTask task = rt_pool.task;
+        void* arg = rt_pool.arg;
+        mutex_unlock(&rt_pool.lock);
+        task(arg, part);
+        mutex_lock(&rt_pool.lock);
+        if (++rt_pool.done_parts == rt_pool.parts) cond_broadcast(&rt_pool.finished);
+    }
+}
+
+#ifdef _WIN32
+static DWORD WINAPI pool_worker(LPVOID unused) {
+#else
+static void* pool_worker(void* unused) {
+#endif
+    (void)unused;
+    mutex_lock(&rt_pool.lock);
+    unsigned seen = rt_pool.generation;
+    for (;;) {
+        while (rt_pool.generation == seen) cond_wait(&rt_pool.work, &rt_pool.lock);
+        seen = rt_pool.generation;
+        pool_work();
+    }
+    return 0;
+}
+
+static void pool_grow(int workers) {
+    while (rt_pool.workers < workers) {
+#ifdef _WIN32
+        HANDLE thread = CreateThread(NULL, 0, pool_worker, NULL, 0, NULL);
+        if (!thread) break;
+        CloseHandle(thread);
+#else
+        pthread_t thread;
+        if (pthread_create(&thread, NULL, pool_worker, NULL) != 0) break;
+        pthread_detach(thread);
+#endif
+        rt_pool.workers++;
+    }
+}
+
+// Выполняет task(arg, 0..parts-1) на пуле и возвращается, когда готовы все части
+static void pool_run(PoolTask task, void* arg, int parts) {
+    mutex_lock(&rt_pool.lock);
+    pool_grow(select_threads() - 1);
+    rt_pool.task = task;
+    rt_pool.arg = arg;
+    rt_pool.parts = parts;
+    rt_pool.next_part = 0;
+    rt_pool.done_parts = 0;
+    rt_pool.generation++;
+    cond_broadcast(&rt_pool.work);
+    pool_work();
+    while (rt_pool.done_parts < rt_pool.parts) cond_wait(&rt_pool.finished, &rt_pool.lock);
+    mutex_unlock(&rt_pool.lock);
+}
+
+// --- Статистика запросов ---
+//
+// При заданной RELTABLE_STATS каждая операция над таблицей копит счётчики своего
+// места вызова (строки select в исходнике); при выходе они пишутся JSON-ом в stderr
+// (RELTABLE_STATS=1) или в файл по указанному пути. Без переменной — одна проверка флага.
+
+typedef struct {
+    int site;
+    const char* op;
+    long long calls;
+    long long rows_scanned;
+    long long rows_matched;
+    long long bytes_allocated;
+    long long ns;
+} QueryStats;
+
+// Замер одной операции; op == NULL — статистика выключена
+typedef struct {
+    int site;
+    const char* op;
+    double started;
+    size_t allocated;
+} StatsScope;
+
+// Операции над таблицами вызываются только из основного потока, замок не нужен
+static QueryStats* rt_stats = NULL;
+static int rt_stats_count = 0;
+static int rt_stats_capacity = 0;
+
+static int compare_stats(const void* a, const void* b) {
+    const QueryStats* x = (const QueryStats*)a;
+    const QueryStats* y = (const QueryStats*)b;
+    if (x->site != y->site) return x->site < y->site ? -1 : 1;
+    return strcmp(x->op, y->op);
+}
+
+static void stats_dump(void) {
+    const char* dest = getenv("RELTABLE_STATS");
+    FILE* out = strcmp(dest, "1") == 0 ? stderr : fopen(dest, "w");
+    if (!out) {
+        diag("RELTABLE_STATS: cannot open '%s'\n", dest);
+        return;
+    }
+    if (out == stderr) rt_flush();
+    qsort(rt_stats, rt_stats_count, sizeof(QueryStats), compare_stats);
+    fprintf(out, "{\n  \"sites\": [");
+    for (int i = 0; i < rt_stats_count; i++) {
+        QueryStats* q = &rt_stats[i];
+        fprintf(out, "%s\n    {\"line\": %d, \"op\": \"%s\", \"calls\": %lld, \"rows_scanned\": %lld, "
+                "\"rows_matched\": %lld, \"bytes_allocated\": %lld, \"ns\": %lld}",
+                i ? "," : "", q->site, q->op, q->calls, q->rows_scanned, q->rows_matched, q->bytes_allocated, q->ns);
+    }
+    fprintf(out, "%s]\n}\n", rt_stats_count ? "\n  " : "");
+    if (out != stderr) fclose(out);
+    mem_free(rt_stats);
+    rt_stats = NULL;
+    rt_stats_count = rt_stats_capacity = 0;
+}
+
+static void stats_begin(StatsScope* s, int site, const char* op) {
+    if (rt_stats_enabled < 0) {
+        const char* env = getenv("RELTABLE_STATS");
+        rt_stats_enabled = env && *env && strcmp(env, "0") != 0;
+        if (rt_stats_enabled) atexit(stats_dump);
+    }
+    s->op = NULL;
+    if (!rt_stats_enabled) return;
+    s->site = site;
+    s->op = op;
+    s->allocated = __atomic_load_n(&rt_mem_allocated, __ATOMIC_RELAXED);
+    s->started = rt_now_seconds();
+}
+
+static void stats_end(const StatsScope* s, long long scanned, long long matched) {
+    if (!s->op) return;
+    long long ns = (long long)((rt_now_seconds() - s->started) * 1e9);
+    long long allocated = (long long)(__atomic_load_n(&rt_mem_allocated, __ATOMIC_RELAXED) - s->allocated);
+    QueryStats* q = NULL;
+    for (int i = 0; i < rt_stats_count && !q; i++) {
+        if (rt_stats[i].site == s->site && strcmp(rt_stats[i].op, s->op) == 0) q = &rt_stats[i];
+    }
+    if (!q) {
+        if (rt_stats_count == rt_stats_capacity) {
+            rt_stats_capacity = rt_stats_capacity ? rt_stats_capacity * 2 : 16;
+            rt_stats = (QueryStats*)mem_realloc(rt_stats, sizeof(QueryStats) * rt_stats_capacity);
         }
+        q = &rt_stats[rt_stats_count++];
+        memset(q, 0, sizeof(QueryStats));
+        q->site = s->site;
+        q->op = s->op;
     }
-    return (void*)res;
+    q->calls++;
+    q->rows_scanned += scanned;
+    q->rows_matched += matched;
+    q->bytes_allocated += allocated;
+    q->ns += ns;
 }
 
-void rt_write_int(int i) { printf("%d\n", i); }
-void rt_write_string(const char* s) { printf("%s\n", s); }
-void rt_write_bool(bool b) { printf("%s\n", b ? "true" : "false"); }
-void rt_write_float(double d) { printf("%f\n", d); }
\ No newline at end of file
+// Параллельный фильтр: каждая часть — непрерывный диапазон позиций источника
+typedef struct {
+    Table* src;
+    int part_rows;
+    Closure closure;           // предикат-замыкание (если kernel == NULL)
+    ScanKernel kernel;
+    void* env;
+    int range_count;
+    const ZoneRange* ranges;
+    int** part_sel;
+    int* part_count;
+    long long scanned;         // просмотрено строк, для статистики запросов
+} SelectJob;
+
+static void select_part(void* arg, int part) {
+    SelectJob* job = (SelectJob*)arg;
+    Table* src = job->src;
+    int begin = part * job->part_rows;
+    int end = begin + job->part_rows < src->row_count ? begin + job->part_rows : src->row_count;
+    int* out = (int*)mem_alloc(sizeof(int) * (end - begin));
+    int count = 0;
+    int scanned = end - begin;
+
+    if (job->kernel) {
+        for (int chunk = begin; chunk < end; chunk += RT_SCAN_CHUNK) {
+            int chunk_end = chunk + RT_SCAN_CHUNK < end ? chunk + RT_SCAN_CHUNK : end;
+            if (job->range_count > 0 && !zone_may_match(src, chunk / RT_ZONE_ROWS, job->range_count, job->ranges)) {
+                scanned -= chunk_end - chunk;
+                continue;
+            }
+            count += job->kernel(job->env, src, chunk, chunk_end, out + count);
+        }
+    } else {
+        RowRef row = { src->col_data, 0, src };
+        for (int i = begin; i < end; i++) {
+            row.index = table_row_at(src, i);
+            if (!job->closure.fn_ptr || job->closure.fn_ptr(job->closure.env_ptr, (void*)&row)) out[count++] = row.index;
+        }
+    }
+    job->part_sel[part] = out;
+    job->part_count[part] = count;
+    __atomic_add_fetch(&job->scanned, scanned, __ATOMIC_RELAXED);
+}
+
+// Делит источник на части по RT_SCAN_CHUNK строк, фильтрует их на пуле
+// и склеивает результаты частей в исходном порядке строк
+static void select_parallel(SelectJob* job, Table* res, int threads) {
+    Table* src = job->src;
+    int chunks = (src->row_count + RT_SCAN_CHUNK - 1) / RT_SCAN_CHUNK;
+    // Частей больше, чем потоков: неравномерные части разбираются свободными потоками
+    int chunks_per_part = (chunks + threads * 4 - 1) / (threads * 4);
+    job->part_rows = chunks_per_part * RT_SCAN_CHUNK;
+    int parts = (src->row_count + job->part_rows - 1) / job->part_rows;
+    job->part_sel = (int**)mem_alloc(sizeof(int*) * parts);
+    job->part_count = (int*)mem_alloc(sizeof(int) * parts);
+
+    pool_run(select_part, job, parts);
+
+    int total = 0;
+    for (int p = 0; p < parts; p++) total += job->part_count[p];
+    view_reserve(res, total);
+    for (int p = 0; p < parts; p++) {
+        memcpy(res->sel + res->row_count, job->part_sel[p], sizeof(int) * job->part_count[p]);
+        res->row_count += job->part_count[p];
+        mem_free(job->part_sel[p]);
+    }
+    mem_free(job->part_sel);
+    mem_free(job->part_count);
+}
+
+static int select_use_parallel(Table* src) {
+    return src->row_count >= RT_PARALLEL_MIN_ROWS && select_threads() > 1;
+}
+
+// Общий путь: предикат — произвольное замыкание, вызываемое на каждую строку
+// (без предиката берутся все строки).
+// Результат — представление; select над представлением сразу даёт индексы base.
+void* rt_table_select(void* table, Closure closure, int site) {
+    StatsScope stats;
+    stats_begin(&stats, site, "select");
+    Table* src = (Table*)table;
+    Table* res = view_create(src);
+
+    RowRef current_row = { src->col_data, 0, src };
+    for (int i = 0; i < src->row_count; i++) {
+        current_row.index = src->sel ? src->sel[i] : i;
+        // Вызов LLVM функции через указатель
+        if (!closure.fn_ptr || closure.fn_ptr(closure.env_ptr, (void*)&current_row)) {
+            view_reserve(res, res->row_count + 1);
+            res->sel[res->row_count++] = current_row.index;
+        }
+    }
+    stats_end(&stats, src->row_count, res->row_count);
+    return (void*)res;
+}
+
+// То же для предиката, который анализатор признал чистым (без write, присваиваний
+// захваченным переменным и изменения таблиц): при включённых потоках части
+// таблицы фильтруются параллельно.
+void* rt_table_select_parallel(void* table, Closure closure, int site) {
+    Table* src = (Table*)table;
+    if (!select_use_parallel(src)) return rt_table_select(table, closure, site);
+    StatsScope stats;
+    stats_begin(&stats, site, "select");
+    Table* res = view_create(src);
+    SelectJob job = { src, 0, closure, NULL, NULL, 0, NULL, NULL, NULL, 0 };
+    select_parallel(&job, res, select_threads());
+    stats_end(&stats, job.scanned, res->row_count);
+    return (void*)res;
+}
+
+// Быстрый путь: предикат вкомпилирован в цикл ядра, вызов через указатель — раз на блок строк.
+// Ядро пишет индексы совпавших строк прямо в вектор выборки результата.
+// Блоки, где зональные карты исключают хотя бы один из диапазонов условия,
+// пропускаются без вызова ядра. Для представлений диапазоны не используются.
+void* rt_table_scan_ranges(void* table, ScanKernel kernel, void* env, int range_count, ZoneRange* ranges, int site) {
+    StatsScope stats;
+    stats_begin(&stats, site, "scan");
+    Table* src = (Table*)table;
+    Table* res = view_create(src);
+    if (src->base) range_count = 0;
+    if (range_count > 0) table_update_zones(src);
+
+    // Ядро не имеет побочных эффектов, поэтому части можно проверять параллельно
+    if (select_use_parallel(src)) {
+        SelectJob job = { src, 0, { NULL, NULL }, kernel, env, range_count, ranges, NULL, NULL, 0 };
+        select_parallel(&job, res, select_threads());
+        stats_end(&stats, job.scanned, res->row_count);
+        return (void*)res;
+    }
+
+    long long scanned = 0;
+    for (int begin = 0; begin < src->row_count; begin += RT_SCAN_CHUNK) {
+        int end = begin + RT_SCAN_CHUNK < src->row_count ? begin + RT_SCAN_CHUNK : src->row_count;
+        if (range_count > 0 && !zone_may_match(src, begin / RT_ZONE_ROWS, range_count, ranges)) continue;
+        view_reserve(res, res->row_count + (end - begin));
+        res->row_count += kernel(env, src, begin, end, res->sel + res->row_count);
+        scanned += end - begin;
+    }
+    stats_end(&stats, scanned, res->row_count);
+    return (void*)res;
+}
+
+void* rt_table_scan(void* table, ScanKernel kernel, void* env, int site) {
+    return rt_table_scan_ranges(table, kernel, env, 0, NULL, site);
+}
+
+// Набор кортежей соединения: по номеру строки из каждой таблицы, stride = число таблиц
+typedef struct {
+    int* rows;
+    int count;
+    int capacity;
+    int stride;
+} JoinTuples;
+
+static int* join_tuples_push(JoinTuples* out) {
+    if (out->count >= out->capacity) {
+        out->capacity = out->capacity ? out->capacity * 2 : RT_INITIAL_CAPACITY;
+        out->rows = (int*)mem_realloc(out->rows, sizeof(int) * out->stride * out->capacity);
+    }
+    return out->rows + (size_t)out->stride * out->count++;
+}
+
+// Предикат соединения с подготовленными ссылками на строки всех таблиц
+typedef struct {
+    JoinPredicate pred;
+    void* env;
+    RowRef* refs;
+    void** ptrs;
+} JoinFilter;
+
+// Дописанный последним кортеж out остаётся, только если проходит filter (без фильтра — всегда)
+static void join_filter_last(const JoinFilter* filter, JoinTuples* out) {
+    if (!filter) return;
+    const int* tuple = out->rows + (size_t)out->stride * (out->count - 1);
+    for (int j = 0; j < out->stride; j++) filter->refs[j].index = tuple[j];
+    if (!filter->pred(filter->env, filter->ptrs)) out->count--;
+}
+
+// Дописывает к кортежам in строки таблицы k: хеш-соединением по key или, без ключа, декартовым произведением.
+// filter (на последнем шаге) отбрасывает кортежи сразу, не накапливая их
+static void join_step(Table** tables, int k, const JoinKey* key, const JoinTuples* in, JoinTuples* out, const JoinFilter* filter) {
+    Table* right = tables[k];
+    int n = right->row_count;
+
+    if (!key) {
+        for (int t = 0; t < in->count; t++) {
+            for (int i = 0; i < n; i++) {
+                int* tuple = join_tuples_push(out);
+                memcpy(tuple, in->rows + (size_t)in->stride * t, sizeof(int) * k);
+                tuple[k] = table_row_at(right, i);
+                join_filter_last(filter, out);
+            }
+        }
+        return;
+    }
+
+    // Фаза build: цепочки позиций правой таблицы по хешу ключа
+    const int* right_keys = (const int*)right->col_data[key->right_col];
+    int capacity = RT_INITIAL_CAPACITY;
+    while (capacity < n * 2) capacity *= 2;
+    uint32_t mask = (uint32_t)capacity - 1;
+    int* heads = (int*)mem_alloc(sizeof(int) * capacity);
+    int* next = (int*)mem_alloc(sizeof(int) * (n ? n : 1));
+    memset(heads, 0xff, sizeof(int) * capacity);
+    for (int i = n - 1; i >= 0; i--) {
+        uint32_t h = index_hash(right_keys[table_row_at(right, i)]) & mask;
+        next[i] = heads[h];
+        heads[h] = i;
+    }
+
+    // Фаза probe: каждый кортеж ищет строки с тем же ключом
+    const int* left_keys = (const int*)tables[key->left_table]->col_data[key->left_col];
+    for (int t = 0; t < in->count; t++) {
+        const int* src = in->rows + (size_t)in->stride * t;
+        int value = left_keys[src[key->left_table]];
+        for (int i = heads[index_hash(value) & mask]; i >= 0; i = next[i]) {
+            int row = table_row_at(right, i);
+            if (right_keys[row] != value) continue;
+            int* tuple = join_tuples_push(out);
+            memcpy(tuple, src, sizeof(int) * k);
+            tuple[k] = row;
+            join_filter_last(filter, out);
+        }
+    }
+    mem_free(heads);
+    mem_free(next);
+}
+
+// Имя колонки результата соединения: занятое колонкой предыдущей таблицы получает
+// суффикс _<номер таблицы> (повторно, пока не станет уникальным) — так же, как в анализаторе
+static char* join_column_name(Table* res, const char* name, int table_number) {
+    char* unique = arena_strdup(&res->arena, name);
+    while (table_find_column(res, unique) >= 0) {
+        size_t len = strlen(unique) + 16;
+        char* longer = (char*)arena_alloc(&res->arena, len);
+        snprintf(longer, len, "%s_%d", unique, table_number);
+        unique = longer;
+    }
+    return unique;
+}
+
+// select над несколькими таблицами. Таблицы присоединяются слева направо; для таблицы k
+// берётся первый ключ с right_table == k, без ключа — декартово произведение.
+// Предикат (если он есть) проверяется при присоединении последней таблицы, так что
+// в памяти остаются только прошедшие кортежи; результат материализуется
+// в новую таблицу: колонки всех таблиц подряд (совпавшие имена — см. join_column_name).
+void* rt_table_join(int table_count, void** table_list, int key_count, JoinKey* keys, JoinPredicate pred, void* env, int site) {
+    StatsScope stats;
+    stats_begin(&stats, site, "join");
+    Table** tables = (Table**)table_list;
+    long long scanned = 0;
+    for (int j = 0; j < table_count; j++) scanned += tables[j]->row_count;
+
+    JoinFilter filter = { pred, env, NULL, NULL };
+    if (pred) {
+        filter.refs = (RowRef*)mem_alloc(sizeof(RowRef) * table_count);
+        filter.ptrs = (void**)mem_alloc(sizeof(void*) * table_count);
+        for (int j = 0; j < table_count; j++) {
+            filter.refs[j].cols = tables[j]->col_data;
+            filter.refs[j].table = tables[j];
+            filter.ptrs[j] = &filter.refs[j];
+        }
+    }
+
+    JoinTuples tuples = { NULL, 0, 0, table_count };
+    for (int i = 0; i < tables[0]->row_count; i++) {
+        *join_tuples_push(&tuples) = table_row_at(tables[0], i);
+        if (table_count == 1) join_filter_last(pred ? &filter : NULL, &tuples);
+    }
+
+    for (int k = 1; k < table_count; k++) {
+        const JoinKey* key = NULL;
+        for (int j = 0; j < key_count && !key; j++) {
+            if (keys[j].right_table == k && keys[j].left_table < k) key = &keys[j];
+        }
+        JoinTuples next = { NULL, 0, 0, table_count };
+        join_step(tables, k, key, &tuples, &next, pred && k == table_count - 1 ? &filter : NULL);
+        mem_free(tuples.rows);
+        tuples = next;
+    }
+    mem_free(filter.refs);
+    mem_free(filter.ptrs);
+
+    Table* res = (Table*)rt_create_table("JoinResult");
+    int col_count = 0;
+    for (int j = 0; j < table_count; j++) col_count += tables[j]->col_count;
+    while (res->row_capacity < tuples.count) res->row_capacity *= 2;
+    res->columns = (Column*)mem_alloc(sizeof(Column) * (col_count ? col_count : 1));
+    res->col_data = (void**)mem_alloc(sizeof(void*) * (col_count ? col_count : 1));
+    int* indices = (int*)mem_alloc(sizeof(int) * (tuples.count ? tuples.count : 1));
+    for (int j = 0; j < table_count; j++) {
+        for (int t = 0; t < tuples.count; t++) indices[t] = tuples.rows[(size_t)table_count * t + j];
+        for (int c = 0; c < tables[j]->col_count; c++) {
+            Column* col = &res->columns[res->col_count];
+            *col = tables[j]->columns[c];
+            col->name = join_column_name(res, col->name, j + 1);
+            col->type = arena_strdup(&res->arena, col->type);
+            col->borrowed = 0;
+            dict_retain(col->dict);
+            res->col_data[res->col_count] = mem_alloc(column_bytes(col, res->row_capacity));
+            column_gather(col, res->col_data[res->col_count], tables[j]->col_data[c], indices, tuples.count);
+            res->col_count++;
+        }
+    }
+    res->row_count = tuples.count;
+    mem_free(indices);
+    mem_free(tuples.rows);
+    table_rows_appended(res, 0);
+    stats_end(&stats, scanned, res->row_count);
+    return (void*)res;
+}
+
+// --- Агрегаты ---
+
+static int column_is_numeric(Table* t, int c) {
+    return t->columns[c].kind == COL_INT || t->columns[c].kind == COL_DECIMAL;
+}
+
+static int aggregate_column(Table* t, const char* op, const char* col_name) {
+    int c = table_find_column(t, col_name);
+    if (c < 0 || !column_is_numeric(t, c)) {
+        diag("%s: '%s' is not a numeric column\n", op, col_name);
+        exit(1);
+    }
+    return c;
+}
+
+// Сумма, минимум и максимум колонки за один проход по буферу
+static void column_totals(Table* t, int c, double* sum, double* min, double* max) {
+    double s = 0.0, lo = HUGE_VAL, hi = -HUGE_VAL;
+    if (t->columns[c].kind == COL_INT) {
+        const int* values = (const int*)t->col_data[c];
+        for (int i = 0; i < t->row_count; i++) {
+            double v = values[table_row_at(t, i)];
+            s += v;
+            if (v < lo) lo = v;
+            if (v > hi) hi = v;
+        }
+    } else {
+        const double* values = (const double*)t->col_data[c];
+        for (int i = 0; i < t->row_count; i++) {
+            double v = values[table_row_at(t, i)];
+            s += v;
+            if (v < lo) lo = v;
+            if (v > hi) hi = v;
+        }
+    }
+    *sum = s;
+    // У пустой таблицы минимум и максимум — ноль
+    *min = t->row_count ? lo : 0.0;
+    *max = t->row_count ? hi : 0.0;
+}
+
+int rt_count(void* table) {
+    return ((Table*)table)->row_count;
+}
+
+double rt_sum(void* table, const char* col_name) {
+    Table* t = (Table*)table;
+    double sum, min, max;
+    column_totals(t, aggregate_column(t, "sum", col_name), &sum, &min, &max);
+    return sum;
+}
+
+double rt_min(void* table, const char* col_name) {
+    Table* t = (Table*)table;
+    double sum, min, max;
+    column_totals(t, aggregate_column(t, "min", col_name), &sum, &min, &max);
+    return min;
+}
+
+double rt_max(void* table, const char* col_name) {
+    Table* t = (Table*)table;
+    double sum, min, max;
+    column_totals(t, aggregate_column(t, "max", col_name), &sum, &min, &max);
+    return max;
+}
+
+double rt_avg(void* table, const char* col_name) {
+    Table* t = (Table*)table;
+    double sum, min, max;
+    column_totals(t, aggregate_column(t, "avg", col_name), &sum, &min, &max);
+    return t->row_count ? sum / t->row_count : 0.0;
+}
+
+// Группировка: хеш-таблица групп с открытой адресацией, ячейка хранит номер группы.
+// Группа представлена первой своей строкой — по ней сравниваются ключи.
+typedef struct {
+    Table* src;
+    const int* key_cols;
+    int key_count;
+    int* slots;
+    int slot_capacity;
+    int* group_rows;
+    int* counts;
+    int group_count;
+    int group_capacity;
+    // Накопители по агрегируемым колонкам: [агрегат][группа]
+    int agg_count;
+    const int* agg_cols;
+    double** sums;
+    double** mins;
+    double** maxs;
+} GroupTable;
+
+static uint32_t group_key_hash(GroupTable* g, int row) {
+    uint32_t h = 2166136261u;
+    for (int k = 0; k < g->key_count; k++) {
+        int c = g->key_cols[k];
+        const void* data = g->src->col_data[c];
+        uint32_t part = 0;
+        switch (g->src->columns[c].kind) {
+            case COL_INT: part = index_hash(((const int*)data)[row]); break;
+            case COL_BOOL: part = bit_get((const unsigned char*)data, row); break;
+            case COL_DECIMAL: {
+                uint64_t bits;
+                memcpy(&bits, &((const double*)data)[row], sizeof(bits));
+                part = index_hash((int)(bits ^ (bits >> 32)));
+                break;
+            }
+            case COL_STRING: part = index_hash(((const int*)data)[row]); break;
+        }
+        h = (h ^ part) * 16777619u;
+    }
+    return h;
+}
+
+static int group_keys_equal(GroupTable* g, int a, int b) {
+    for (int k = 0; k < g->key_count; k++) {
+        int c = g->key_cols[k];
+        const void* data = g->src->col_data[c];
+        switch (g->src->columns[c].kind) {
+            case COL_INT: if (((const int*)data)[a] != ((const int*)data)[b]) return 0; break;
+            case COL_BOOL: if (bit_get((const unsigned char*)data, a) != bit_get((const unsigned char*)data, b)) return 0; break;
+            case COL_DECIMAL: if (((const double*)data)[a] != ((const double*)data)[b]) return 0; break;
+            // Коды одного словаря равны ровно у равных строк
+            case COL_STRING: if (((const uint32_t*)data)[a] != ((const uint32_t*)data)[b]) return 0; break;
+        }
+    }
+    return 1;
+}
+
+static void group_insert_slot(GroupTable* g, int group) {
+    uint32_t mask = (uint32_t)g->slot_capacity - 1;
+    uint32_t h = group_key_hash(g, g->group_rows[group]) & mask;
+    while (g->slots[h] >= 0) h = (h + 1) & mask;
+    g->slots[h] = group;
+}
+
+static int group_create(GroupTable* g, int row) {
+    if (g->group_count >= g->group_capacity) {
+        g->group_capacity = g->group_capacity ? g->group_capacity * 2 : RT_INITIAL_CAPACITY;
+        g->group_rows = (int*)mem_realloc(g->group_rows, sizeof(int) * g->group_capacity);
+        g->counts = (int*)mem_realloc(g->counts, sizeof(int) * g->group_capacity);
+        for (int a = 0; a < g->agg_count; a++) {
+            g->sums[a] = (double*)mem_realloc(g->sums[a], sizeof(double) * g->group_capacity);
+            g->mins[a] = (double*)mem_realloc(g->mins[a], sizeof(double) * g->group_capacity);
+            g->maxs[a] = (double*)mem_realloc(g->maxs[a], sizeof(double) * g->group_capacity);
+        }
+    }
+    int group = g->group_count++;
+    g->group_rows[group] = row;
+    g->counts[group] = 0;
+    for (int a = 0; a < g->agg_count; a++) {
+        g->sums[a][group] = 0.0;
+        g->mins[a][group] = HUGE_VAL;
+        g->maxs[a][group] = -HUGE_VAL;
+    }
+    // Заполнение хеш-таблицы держится не выше половины
+    if (g->group_count * 2 > g->slot_capacity) {
+        g->slot_capacity *= 2;
+        g->slots = (int*)mem_realloc(g->slots, sizeof(int) * g->slot_capacity);
+        memset(g->slots, 0xff, sizeof(int) * g->slot_capacity);
+        for (int i = 0; i < g->group_count; i++) group_insert_slot(g, i);
+    } else {
+        group_insert_slot(g, group);
+    }
+    return group;
+}
+
+static int group_find(GroupTable* g, int row) {
+    uint32_t mask = (uint32_t)g->slot_capacity - 1;
+    for (uint32_t h = group_key_hash(g, row) & mask; g->slots[h] >= 0; h = (h + 1) & mask) {
+        if (group_keys_equal(g, g->group_rows[g->slots[h]], row)) return g->slots[h];
+    }
+    return group_create(g, row);
+}
+
+// Накопление агрегатов одной колонки по порции строк: ids[i] — группа строки rows[i]
+static void group_accumulate(GroupTable* g, int a, const int* rows, const int* ids, int n) {
+    double* sums = g->sums[a];
+    double* mins = g->mins[a];
+    double* maxs = g->maxs[a];
+    int c = g->agg_cols[a];
+    if (g->src->columns[c].kind == COL_INT) {
+        const int* values = (const int*)g->src->col_data[c];
+        for (int i = 0; i < n; i++) {
+            double v = values[rows[i]];
+            sums[ids[i]] += v;
+            if (v < mins[ids[i]]) mins[ids[i]] = v;
+            if (v > maxs[ids[i]]) maxs[ids[i]] = v;
+        }
+    } else {
+        const double* values = (const double*)g->src->col_data[c];
+        for (int i = 0; i < n; i++) {
+            double v = values[rows[i]];
+            sums[ids[i]] += v;
+            if (v < mins[ids[i]]) mins[ids[i]] = v;
+            if (v > maxs[ids[i]]) maxs[ids[i]] = v;
+        }
+    }
+}
+
+// Значение агрегата в колонку результата: int-колонка получает int
+static void group_store(Table* res, int c, int group, double v) {
+    if (res->columns[c].kind == COL_INT) ((int*)res->col_data[c])[group] = (int)v;
+    else ((double*)res->col_data[c])[group] = v;
+}
+
+// select ... group by: строка результата на каждую группу в порядке первого появления.
+// Колонки: ключи, count, затем sum_/min_/max_/avg_ для каждой числовой колонки не из ключей;
+// min_/max_ — типа колонки, sum_ и avg_ — decimal (сумма int-колонки может не поместиться в int).
+// Сначала для порции строк считаются номера групп, затем агрегаты — отдельным циклом на колонку.
+void* rt_table_group(void* table, int key_count, const char** key_names, int site) {
+    StatsScope stats;
+    stats_begin(&stats, site, "group");
+    Table* src = (Table*)table;
+    int* key_cols = (int*)mem_alloc(sizeof(int) * (key_count ? key_count : 1));
+    for (int k = 0; k < key_count; k++) {
+        key_cols[k] = table_find_column(src, key_names[k]);
+        if (key_cols[k] < 0) {
+            diag("group by: unknown column '%s'\n", key_names[k]);
+            exit(1);
+        }
+    }
+    int* agg_cols = (int*)mem_alloc(sizeof(int) * (src->col_count ? src->col_count : 1));
+    int agg_count = 0;
+    for (int c = 0; c < src->col_count; c++) {
+        int is_key = 0;
+        for (int k = 0; k < key_count; k++) is_key |= key_cols[k] == c;
+        if (!is_key && column_is_numeric(src, c)) agg_cols[agg_count++] = c;
+    }
+
+    GroupTable g = { src, key_cols, key_count, NULL, RT_INITIAL_CAPACITY, NULL, NULL, 0, 0, agg_count, agg_cols, NULL, NULL, NULL };
+    g.slots = (int*)mem_alloc(sizeof(int) * g.slot_capacity);
+    memset(g.slots, 0xff, sizeof(int) * g.slot_capacity);
+    g.sums = (double**)mem_calloc(agg_count ? agg_count : 1, sizeof(double*));
+    g.mins = (double**)mem_calloc(agg_count ? agg_count : 1, sizeof(double*));
+    g.maxs = (double**)mem_calloc(agg_count ? agg_count : 1, sizeof(double*));
+
+    int rows[RT_SCAN_CHUNK];
+    int ids[RT_SCAN_CHUNK];
+    for (int begin = 0; begin < src->row_count; begin += RT_SCAN_CHUNK) {
+        int n = src->row_count - begin < RT_SCAN_CHUNK ? src->row_count - begin : RT_SCAN_CHUNK;
+        for (int i = 0; i < n; i++) {
+            rows[i] = table_row_at(src, begin + i);
+            ids[i] = group_find(&g, rows[i]);
+            g.counts[ids[i]]++;
+        }
+        for (int a = 0; a < agg_count; a++) group_accumulate(&g, a, rows, ids, n);
+    }
+
+    Table* res = (Table*)rt_create_table("GroupResult");
+    char name[256];
+    for (int k = 0; k < key_count; k++) rt_add_column(res, src->columns[key_cols[k]].name, src->columns[key_cols[k]].type);
+    rt_add_column(res, "count", "int");
+    static const char* prefixes[] = { "sum_", "min_", "max_", "avg_" };
+    for (int a = 0; a < agg_count; a++) {
+        Column* col = &src->columns[agg_cols[a]];
+        for (int p = 0; p < 4; p++) {
+            snprintf(name, sizeof(name), "%s%s", prefixes[p], col->name);
+            rt_add_column(res, name, p == 1 || p == 2 ? col->type : "decimal");
+        }
+    }
+
+    table_reserve(res, g.group_count);
+    for (int k = 0; k < key_count; k++) {
+        // Строковые ключи — коды словаря исходной колонки
+        Column* key = &res->columns[k];
+        if (key->dict) {
+            dict_release(key->dict);
+            key->dict = dict_retain(src->columns[key_cols[k]].dict);
+        }
+        column_gather(key, res->col_data[k], src->col_data[key_cols[k]], g.group_rows, g.group_count);
+    }
+    if (g.group_count) memcpy(res->col_data[key_count], g.counts, sizeof(int) * g.group_count);
+    for (int a = 0; a < agg_count; a++) {
+        int c = key_count + 1 + a * 4;
+        for (int group = 0; group < g.group_count; group++) {
+            group_store(res, c, group, g.sums[a][group]);
+            group_store(res, c + 1, group, g.mins[a][group]);
+            group_store(res, c + 2, group, g.maxs[a][group]);
+            group_store(res, c + 3, group, g.sums[a][group] / g.counts[group]);
+        }
+        mem_free(g.sums[a]);
+        mem_free(g.mins[a]);
+        mem_free(g.maxs[a]);
+    }
+    res->row_count = g.group_count;
+    table_rows_appended(res, 0);
+
+    mem_free(g.sums);
+    mem_free(g.mins);
+    mem_free(g.maxs);
+    mem_free(g.slots);
+    mem_free(g.group_rows);
+    mem_free(g.counts);
+    mem_free(agg_cols);
+    mem_free(key_cols);
+    stats_end(&stats, src->row_count, res->row_count);
+    return (void*)res;
+}
+
+// Стадия конвейера select a, b: новая таблица только с перечисленными колонками строк table.
+// Строковые колонки делят словарь с исходными.
+void* rt_table_project(void* table, int col_count, const char** col_names, int site) {
+    StatsScope stats;
+    stats_begin(&stats, site, "project");
+    Table* src = (Table*)table;
+    int* cols = (int*)mem_alloc(sizeof(int) * (col_count ? col_count : 1));
+    Table* res = (Table*)rt_create_table("ProjectResult");
+    for (int k = 0; k < col_count; k++) {
+        cols[k] = table_find_column(src, col_names[k]);
+        if (cols[k] < 0) {
+            diag("select: unknown column '%s'\n", col_names[k]);
+            exit(1);
+        }
+        rt_add_column(res, src->columns[cols[k]].name, src->columns[cols[k]].type);
+    }
+
+    table_reserve(res, src->row_count);
+    for (int k = 0; k < col_count; k++) {
+        Column* col = &res->columns[k];
+        if (col->dict) {
+            dict_release(col->dict);
+            col->dict = dict_retain(src->columns[cols[k]].dict);
+        }
+        if (src->sel) {
+            column_gather(col, res->col_data[k], src->col_data[cols[k]], src->sel, src->row_count);
+        } else {
+            memcpy(res->col_data[k], src->col_data[cols[k]], column_bytes(col, src->row_count));
+        }
+    }
+    res->row_count = src->row_count;
+    table_rows_appended(res, 0);
+
+    mem_free(cols);
+    stats_end(&stats, src->row_count, res->row_count);
+    return (void*)res;
+}
+
+// Строит хеш-индекс по int-колонке; дальше он поддерживается при добавлении строк
+void rt_create_index(void* table, const char* col_name) {
+    Table* t = (Table*)table;
+    table_materialize(t);
+    int c = table_find_column(t, col_name);
+    if (c < 0 || t->columns[c].kind != COL_INT) {
+        diag("create_index: '%s' is not an int column, index skipped\n", col_name);
+        return;
+    }
+    if (table_find_index(t, c)) return;
+    t->indexes = (HashIndex*)mem_realloc(t->indexes, sizeof(HashIndex) * (t->index_count + 1));
+    HashIndex* ix = &t->indexes[t->index_count++];
+    ix->col = c;
+    ix->slots = NULL;
+    ix->tails = NULL;
+    ix->capacity = 0;
+    ix->count = 0;
+    ix->next = NULL;
+    ix->next_capacity = 0;
+    index_add_rows(t, ix, 0);
+}
+
+// select с условием col == key (и, если kernel не NULL, остальной частью предиката).
+// Кандидаты берутся из индекса; без индекса или для представления — проходом по колонке.
+// Ядро затем фильтрует кандидатов на месте: совпадение пишется не правее прочитанного.
+void* rt_index_scan(void* table, int col, int key, ScanKernel kernel, void* env, int site) {
+    StatsScope stats;
+    stats_begin(&stats, site, "index_scan");
+    Table* src = (Table*)table;
+    Table* res = view_create(src);
+    const int* keys = (const int*)src->col_data[col];
+    HashIndex* ix = src->base ? NULL : table_find_index(src, col);
+    long long scanned = 0;
+
+    if (ix) {
+        // Цепочка идёт по возрастанию строк — порядок как у обычного скана
+        for (int row = ix->capacity ? ix->slots[index_slot(ix, keys, key)] : -1; row >= 0; row = ix->next[row]) {
+            scanned++;
+            view_reserve(res, res->row_count + 1);
+            res->sel[res->row_count++] = row;
+        }
+    } else {
+        scanned = src->row_count;
+        for (int i = 0; i < src->row_count; i++) {
+            int row = src->sel ? src->sel[i] : i;
+            if (keys[row] == key) {
+                view_reserve(res, res->row_count + 1);
+                res->sel[res->row_count++] = row;
+            }
+        }
+    }
+
+    if (kernel && res->row_count > 0) {
+        res->row_count = kernel(env, res, 0, res->row_count, res->sel);
+    }
+    stats_end(&stats, scanned, res->row_count);
+    return (void*)res;
+}
+
+// --- Файлы таблиц ---
+//
+// Бинарный колоночный формат (little-endian, версия RT_FILE_VERSION):
+//   FileHeader, FileColumn[col_count], имена (байты без \0),
+//   затем данные колонок, каждая с границы RT_FILE_ALIGN:
+//     int/decimal — row_count элементов ровно как в памяти;
+//     bool — битовая карта на row_count бит, как в памяти;
+//     string — uint32 codes[row_count], затем словарь: uint32 count,
+//              uint32 offsets[count] и байты значений с \0 на конце
+//              (код 0 — пустая строка по смещению 0).
+// load_table отображает файл в память, и буферы колонок смотрят прямо в него;
+// словарь копирует к себе, потому что в него дописывают новые строки.
+
+#define RT_FILE_MAGIC "RTBL"
+#define RT_FILE_VERSION 3
+#define RT_FILE_ALIGN 64
+
+typedef struct {
+    char magic[4];
+    uint32_t version;
+    uint32_t col_count;
+    uint32_t name_len;
+    uint64_t row_count;
+    uint64_t name_offset;
+} FileHeader;
+
+typedef struct {
+    uint32_t kind;
+    uint32_t name_len;
+    uint64_t name_offset;
+    uint64_t data_offset;
+    uint64_t data_size;
+} FileColumn;
+
+static const char* column_type_name(ColumnKind kind) {
+    switch (kind) {
+        case COL_DECIMAL: return "decimal";
+        case COL_BOOL: return "bool";
+        case COL_STRING: return "string";
+        default: return "int";
+    }
+}
+
+static uint64_t file_align(uint64_t offset) {
+    return (offset + RT_FILE_ALIGN - 1) / RT_FILE_ALIGN * RT_FILE_ALIGN;
+}
+
+static void file_pad(FILE* f, uint64_t* pos, uint64_t target) {
+    static const char zeros[RT_FILE_ALIGN] = {0};
+    fwrite(zeros, 1, (size_t)(target - *pos), f);
+    *pos = target;
+}
+
+static uint64_t column_file_size(Table* t, int c) {
+    Column* col = &t->columns[c];
+    if (col->kind != COL_STRING) return column_bytes(col, t->row_count);
+    return (uint64_t)t->row_count * sizeof(uint32_t) + sizeof(uint32_t)
+        + (uint64_t)col->dict->count * sizeof(uint32_t) + col->dict->used;
+}
+
+static void column_file_write(FILE* f, Table* t, int c) {
+    Column* col = &t->columns[c];
+    if (!t->sel) {
+        fwrite(t->col_data[c], 1, column_bytes(col, t->row_count), f);
+    } else {
+        // Представление: собираем выбранные строки блоками (RT_SCAN_CHUNK кратен 8,
+        // так что биты bool-колонки не делят байт между блоками)
+        char chunk[RT_SCAN_CHUNK * sizeof(double)];
+        for (int begin = 0; begin < t->row_count; begin += RT_SCAN_CHUNK) {
+            int n = t->row_count - begin < RT_SCAN_CHUNK ? t->row_count - begin : RT_SCAN_CHUNK;
+            column_gather(col, chunk, t->col_data[c], t->sel + begin, n);
+            fwrite(chunk, 1, column_bytes(col, n), f);
+        }
+    }
+    if (col->kind == COL_STRING) {
+        // Словарь целиком: у представления коды остаются кодами исходной колонки
+        uint32_t count = (uint32_t)col->dict->count;
+        fwrite(&count, sizeof(count), 1, f);
+        fwrite(col->dict->offsets, sizeof(uint32_t), count, f);
+        fwrite(col->dict->bytes, 1, col->dict->used, f);
+    }
+}
+
+// Пишет таблицу в формате файла таблицы (save_table, write(t, "binary")) в поток f
+static void table_write_file(FILE* f, Table* t) {
+    FileHeader header;
+    memcpy(header.magic, RT_FILE_MAGIC, 4);
+    header.version = RT_FILE_VERSION;
+    header.col_count = (uint32_t)t->col_count;
+    header.name_len = (uint32_t)strlen(t->name);
+    header.row_count = (uint64_t)t->row_count;
+    header.name_offset = sizeof(FileHeader) + sizeof(FileColumn) * (uint64_t)t->col_count;
+
+    FileColumn* cols = (FileColumn*)mem_calloc(t->col_count ? t->col_count : 1, sizeof(FileColumn));
+    uint64_t pos = header.name_offset + header.name_len;
+    for (int c = 0; c < t->col_count; c++) {
+        cols[c].kind = (uint32_t)t->columns[c].kind;
+        cols[c].name_len = (uint32_t)strlen(t->columns[c].name);
+        cols[c].name_offset = pos;
+        pos += cols[c].name_len;
+    }
+    for (int c = 0; c < t->col_count; c++) {
+        cols[c].data_offset = file_align(pos);
+        cols[c].data_size = column_file_size(t, c);
+        pos = cols[c].data_offset + cols[c].data_size;
+    }
+
+    fwrite(&header, sizeof(header), 1, f);
+    fwrite(cols, sizeof(FileColumn), t->col_count, f);
+    fwrite(t->name, 1, header.name_len, f);
+    pos = header.name_offset + header.name_len;
+    for (int c = 0; c < t->col_count; c++) {
+        fwrite(t->columns[c].name, 1, cols[c].name_len, f);
+        pos += cols[c].name_len;
+    }
+    for (int c = 0; c < t->col_count; c++) {
+        file_pad(f, &pos, cols[c].data_offset);
+        column_file_write(f, t, c);
+        pos += cols[c].data_size;
+    }
+    mem_free(cols);
+}
+
+void rt_save_table(void* table, const char* path) {
+    FILE* f = fopen(path, "wb");
+    if (!f) {
+        diag("save_table: cannot open '%s' for writing\n", path);
+        exit(1);
+    }
+    table_write_file(f, (Table*)table);
+    fclose(f);
+}
+
+// Отображает файл целиком (копирование при записи), NULL при ошибке
+static void* file_map(const char* path, size_t* size) {
+#ifdef _WIN32
+    HANDLE file = CreateFileA(path, GENERIC_READ, FILE_SHARE_READ, NULL, OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, NULL);
+    if (file == INVALID_HANDLE_VALUE) return NULL;
+    LARGE_INTEGER file_size;
+    GetFileSizeEx(file, &file_size);
+    HANDLE mapping = CreateFileMappingA(file, NULL, PAGE_WRITECOPY, 0, 0, NULL);
+    CloseHandle(file);
+    if (!mapping) return NULL;
+    void* data = MapViewOfFile(mapping, FILE_MAP_COPY, 0, 0, 0);
+    CloseHandle(mapping);
+    *size = (size_t)file_size.QuadPart;
+    return data;
+#else
+    int fd = open(path, O_RDONLY);
+    if (fd < 0) return NULL;
+    struct stat st;
+    if (fstat(fd, &st) != 0 || st.st_size == 0) {
+        close(fd);
+        return NULL;
+    }
+    void* data = mmap(NULL, (size_t)st.st_size, PROT_READ | PROT_WRITE, MAP_PRIVATE, fd, 0);
+    close(fd);
+    *size = (size_t)st.st_size;
+    return data == MAP_FAILED ? NULL : data;
+#endif
+}
+
+static void file_unmap(void* data, size_t size) {
+#ifdef _WIN32
+    (void)size;
+    UnmapViewOfFile(data);
+#else
+    munmap(data, size);
+#endif
+}
+
+static char* file_string(const char* map, uint64_t offset, uint32_t len) {
+    char* s = (char*)mem_alloc(len + 1);
+    memcpy(s, map + offset, len);
+    s[len] = '\0';
+    return s;
+}
+
+// Отрезок [offset, offset + len) лежит внутри файла; проверка без переполнения
+static int file_range_ok(size_t size, uint64_t offset, uint64_t len) {
+    return offset <= size && len <= size - offset;
+}
+
+// Словарь строковой колонки: offsets возрастают внутри него, значения кончаются \0,
+// коды строк меньше count
+static int file_dict_ok(const char* data, uint64_t data_size, uint64_t row_count) {
+    uint64_t codes_size = row_count * sizeof(uint32_t);
+    if (data_size - codes_size < sizeof(uint32_t)) return 0;
+    const char* entries = data + codes_size;
+    uint32_t count;
+    memcpy(&count, entries, sizeof(count));
+    uint64_t rest = data_size - codes_size - sizeof(count);
+    if (count == 0 || count > INT_MAX || (uint64_t)count * sizeof(uint32_t) >= rest) return 0;
+    const uint32_t* offsets = (const uint32_t*)(entries + sizeof(count));
+    uint64_t used = rest - (uint64_t)count * sizeof(uint32_t);
+    const char* bytes = (const char*)(offsets + count);
+    // Значения идут подряд с нуля, каждое кончается \0; код 0 — пустая строка
+    if (offsets[0] != 0) return 0;
+    for (uint32_t i = 0; i < count; i++) {
+        uint64_t end = i + 1 < count ? offsets[i + 1] : used;
+        if (end <= offsets[i] || end > used || bytes[end - 1] != '\0') return 0;
+        if (i == 0 && end != 1) return 0;
+    }
+    const uint32_t* codes = (const uint32_t*)data;
+    for (uint64_t i = 0; i < row_count; i++) {
+        if (codes[i] >= count) return 0;
+    }
+    return 1;
+}
+
+// Заголовок и колонки согласованы с размером файла: все смещения внутри него,
+// данные каждой колонки ровно на row_count строк (у строковой — плюс словарь)
+static int file_valid(const char* map, size_t size) {
+    const FileHeader* header = (const FileHeader*)map;
+    if (header->row_count > INT_MAX) return 0;
+    if (!file_range_ok(size, sizeof(FileHeader), (uint64_t)header->col_count * sizeof(FileColumn))) return 0;
+    if (!file_range_ok(size, header->name_offset, header->name_len)) return 0;
+    const FileColumn* cols = (const FileColumn*)(map + sizeof(FileHeader));
+    for (uint32_t c = 0; c < header->col_count; c++) {
+        if (cols[c].kind > COL_STRING) return 0;
+        if (!file_range_ok(size, cols[c].name_offset, cols[c].name_len)) return 0;
+        if (cols[c].data_offset % RT_FILE_ALIGN != 0) return 0;
+        if (!file_range_ok(size, cols[c].data_offset, cols[c].data_size)) return 0;
+        uint64_t rows = header->row_count;
+        switch ((ColumnKind)cols[c].kind) {
+            case COL_INT: if (cols[c].data_size != rows * sizeof(int32_t)) return 0; break;
+            case COL_DECIMAL: if (cols[c].data_size != rows * sizeof(double)) return 0; break;
+            case COL_BOOL: if (cols[c].data_size != (rows + 7) / 8) return 0; break;
+            case COL_STRING:
+                if (cols[c].data_size < rows * sizeof(uint32_t)) return 0;
+                if (!file_dict_ok(map + cols[c].data_offset, cols[c].data_size, rows)) return 0;
+                break;
+        }
+    }
+    return 1;
+}
+
+void* rt_load_table(const char* path) {
+    size_t size = 0;
+    char* map = (char*)file_map(path, &size);
+    FileHeader* header = (FileHeader*)map;
+    if (!map || size < sizeof(FileHeader) || memcmp(header->magic, RT_FILE_MAGIC, 4) != 0) {
+        diag("load_table: '%s' is not a table file\n", path);
+        exit(1);
+    }
+    if (header->version != RT_FILE_VERSION) {
+        diag("load_table: '%s' has format version %u, expected %d\n", path, header->version, RT_FILE_VERSION);
+        exit(1);
+    }
+    if (!file_valid(map, size)) {
+        diag("load_table: '%s' is corrupt\n", path);
+        exit(1);
+    }
+
+    char* name = file_string(map, header->name_offset, header->name_len);
+    Table* t = (Table*)rt_create_table(name);
+    mem_free(name);
+    t->mapping = map;
+    t->mapping_size = size;
+    rt_mem_mapped += size;
+
+    FileColumn* cols = (FileColumn*)(map + sizeof(FileHeader));
+    int row_count = (int)header->row_count;
+    for (uint32_t c = 0; c < header->col_count; c++) {
+        char* col_name = file_string(map, cols[c].name_offset, cols[c].name_len);
+        rt_add_column(t, col_name, column_type_name((ColumnKind)cols[c].kind));
+        mem_free(col_name);
+    }
+    if (row_count == 0) return (void*)t;
+
+    for (uint32_t c = 0; c < header->col_count; c++) {
+        Column* col = &t->columns[c];
+        char* data = map + cols[c].data_offset;
+        mem_free(t->col_data[c]);
+        t->col_data[c] = data;
+        col->borrowed = 1;
+        if (col->kind == COL_STRING) {
+            // Коды остаются в отображении, словарь копируется в свою память
+            const char* entries = data + (size_t)row_count * sizeof(uint32_t);
+            uint32_t count;
+            memcpy(&count, entries, sizeof(count));
+            entries += sizeof(count);
+            size_t offsets_size = (size_t)count * sizeof(uint32_t);
+            size_t used = (size_t)(cols[c].data_size - (uint64_t)row_count * sizeof(uint32_t) - sizeof(count)) - offsets_size;
+            dict_load(col->dict, (int)count, (const uint32_t*)entries, entries + offsets_size, used);
+        }
+    }
+    t->row_count = row_count;
+    t->row_capacity = row_count;
+    return (void*)t;
+}
+
+// --- Импорт CSV ---
+//
+// Файл читается блоками по RT_CSV_CHUNK байт, строки разбираются на месте
+// и сразу пишутся в буферы колонок по типам из add_column. В памяти
+// держится только текущий блок (плюс хвост незаконченной строки).
+
+#define RT_CSV_CHUNK (1 << 20)
+
+// Конец строки CSV с учётом кавычек; NULL, если строка не закончилась в буфере
+static char* csv_line_end(char* p, char* end) {
+    int in_quotes = 0;
+    for (; p < end; p++) {
+        if (*p == '"') in_quotes = !in_quotes;
+        else if (*p == '\n' && !in_quotes) return p;
+    }
+    return NULL;
+}
+
+// Делит строку [p, end) на поля на месте: снимает кавычки, "" -> ", ставит \0
+static int csv_split(char* p, char* end, char** fields, int max_fields) {
+    int n = 0;
+    if (end > p && end[-1] == '\r') end--;
+    while (p <= end && n < max_fields) {
+        char* out = p;
+        fields[n++] = out;
+        if (p < end && *p == '"') {
+            p++;
+            while (p < end) {
+                if (*p == '"' && p + 1 < end && p[1] == '"') { *out++ = '"'; p += 2; }
+                else if (*p == '"') { p++; break; }
+                else *out++ = *p++;
+            }
+        }
+        while (p < end && *p != ',') *out++ = *p++;
+        *out = '\0';
+        p++;
+    }
+    return n;
+}
+
+static void csv_store_field(Table* t, int c, int row, const char* field) {
+    void* data = t->col_data[c];
+    switch (t->columns[c].kind) {
+        case COL_INT: ((int*)data)[row] = (int)strtol(field, NULL, 10); break;
+        case COL_DECIMAL: ((double*)data)[row] = strtod(field, NULL); break;
+        case COL_BOOL: bit_set((unsigned char*)data, row, field[0] == 't' || field[0] == 'T' || field[0] == '1'); break;
+        case COL_STRING: ((uint32_t*)data)[row] = dict_add(t->columns[c].dict, field); break;
+    }
+}
+
+// Первая строка файла — заголовок, если поля совпадают с именами колонок
+static int csv_is_header(Table* t, char** fields, int n) {
+    if (n < t->col_count || t->col_count == 0) return 0;
+    for (int c = 0; c < t->col_count; c++) {
+        if (strcmp(fields[c], t->columns[c].name) != 0) return 0;
+    }
+    return 1;
+}
+
+void rt_import_csv(void* table, const char* path) {
+    Table* t = (Table*)table;
+    FILE* f = fopen(path, "rb");
+    if (!f) {
+        diag("import_csv: cannot open '%s'\n", path);
+        exit(1);
+    }
+    table_materialize(t);
+
+    double started = rt_now_seconds();
+    size_t capacity = RT_CSV_CHUNK;
+    char* buf = (char*)mem_alloc(capacity + 1);
+    char** fields = (char**)mem_alloc(sizeof(char*) * (t->col_count + 1));
+    size_t len = 0;
+    int first_line = 1;
+    int first_row = t->row_count;
+    long long imported = 0;
+    long long line_number = 1;  // строка файла, с которой начинается буфер
+
+    for (;;) {
+        if (len == capacity) {
+            // Строка длиннее блока: расширяем буфер
+            capacity *= 2;
+            buf = (char*)mem_realloc(buf, capacity + 1);
+        }
+        size_t got = fread(buf + len, 1, capacity - len, f);
+        len += got;
+        int at_eof = got == 0;
+        if (at_eof && len > 0 && buf[len - 1] != '\n') buf[len++] = '\n';
+
+        // Сначала считаем строки блока, чтобы зарезервировать место один раз
+        int lines = 0;
+        for (size_t i = 0; i < len; i++) lines += buf[i] == '\n';
+        table_reserve(t, t->row_count + lines);
+
+        char* p = buf;
+        char* end = buf + len;
+        char* line_end;
+        while ((line_end = csv_line_end(p, end)) != NULL) {
+            if (line_end > p && !(line_end == p + 1 && *p == '\r')) {
+                int n = csv_split(p, line_end, fields, t->col_count + 1);
+                if (!(first_line && csv_is_header(t, fields, n))) {
+                    int row = t->row_count;
+                    for (int c = 0; c < t->col_count; c++) {
+                        csv_store_field(t, c, row, c < n ? fields[c] : "");
+                    }
+                    t->row_count++;
+                    imported++;
+                }
+                first_line = 0;
+            }
+            p = line_end + 1;
+        }
+        // Незаконченная строка переносится в начало буфера
+        len = (size_t)(end - p);
+        for (size_t i = 0; i < len; i++) lines -= p[i] == '\n';
+        line_number += lines;
+        if (at_eof && len > 0) {
+            // В конце файла строка не закончилась только из-за открытой кавычки
+            diag("import_csv: unterminated quoted field at line %lld of '%s'\n", line_number, path);
+            exit(1);
+        }
+        memmove(buf, p, len);
+        if (at_eof) break;
+    }
+
+    mem_free(fields);
+    mem_free(buf);
+    fclose(f);
+    table_rows_appended(t, first_row);
+
+    double elapsed = rt_now_seconds() - started;
+    diag("import_csv: %lld rows from '%s' in %.3f s (%.0f rows/s)\n",
+            imported, path, elapsed, elapsed > 0 ? imported / elapsed : 0.0);
+}
+
+// --- Освобождение памяти ---
+
+// drop_table: освобождает таблицу целиком. Представления над ней сначала
+// получают свои копии данных; у представления освобождается только оно само.
+// Переменную после освобождения кодогенератор обнуляет, NULL пропускается.
+void rt_drop_table(void* table) {
+    Table* t = (Table*)table;
+    if (!t) return;
+    if (t->base) {
+        view_unregister(t);
+        mem_free(t->sel);
+    } else {
+        table_detach_views(t);
+        for (int c = 0; c < t->col_count; c++) {
+            if (!t->columns[c].borrowed) mem_free(t->col_data[c]);
+            dict_release(t->columns[c].dict);
+        }
+        mem_free(t->columns);
+        mem_free(t->col_data);
+        for (int i = 0; i < t->index_count; i++) {
+            mem_free(t->indexes[i].slots);
+            mem_free(t->indexes[i].tails);
+            mem_free(t->indexes[i].next);
+        }
+        mem_free(t->indexes);
+        for (int c = 0; c < t->zone_count; c++) {
+            mem_free(t->zones[c].min);
+            mem_free(t->zones[c].max);
+        }
+        mem_free(t->zones);
+        if (t->mapping) {
+            file_unmap(t->mapping, t->mapping_size);
+            rt_mem_mapped -= t->mapping_size;
+        }
+    }
+    mem_free(t->views);
+    arena_release(&t->arena);
+    mem_free(t);
+}
+
+void rt_memory_report(void) {
+    diag("memory: current %llu bytes, peak %llu bytes, mapped files %llu bytes\n",
+            (unsigned long long)__atomic_load_n(&rt_mem_current, __ATOMIC_RELAXED),
+            (unsigned long long)__atomic_load_n(&rt_mem_peak, __ATOMIC_RELAXED),
+            (unsigned long long)rt_mem_mapped);
+}
+
+// --- Вывод ---
+//
+// write() копит текст в своём буфере и отдаёт его в stdout целиком: когда буфер
+// заполнен, по flush() и при выходе из программы. Вызов stdio на каждое значение
+// и построчная буферизация stdout на миллионах строк обходятся дороже самого форматирования.
+
+#define RT_OUT_BUFFER (1 << 20)
+// Длиннее не бывает ни int, ни double в формате %f
+#define RT_NUMBER_MAX 512
+
+static char rt_out[RT_OUT_BUFFER];
+static size_t rt_out_used;
+static int rt_out_registered;
+
+// Сброс буфера вывода и stdout: при запуске через JIT процесс не завершается после main
+void rt_flush(void) {
+    if (rt_out_used) fwrite(rt_out, 1, rt_out_used, stdout);
+    rt_out_used = 0;
+    fflush(stdout);
+}
+
+// Место под n байт в конце буфера (n <= RT_OUT_BUFFER)
+static char* out_reserve(size_t n) {
+    if (!rt_out_registered) {
+        rt_out_registered = 1;
+        atexit(rt_flush);
+    }
+    if (rt_out_used + n > RT_OUT_BUFFER) rt_flush();
+    return rt_out + rt_out_used;
+}
+
+static void out_bytes(const char* s, size_t n) {
+    if (n > RT_OUT_BUFFER / 2) {
+        rt_flush();
+        fwrite(s, 1, n, stdout);
+        return;
+    }
+    memcpy(out_reserve(n), s, n);
+    rt_out_used += n;
+}
+
+static void out_char(char c) {
+    *out_reserve(1) = c;
+    rt_out_used++;
+}
+
+static void out_padding(int n) {
+    for (int i = 0; i < n; i++) out_char(' ');
+}
+
+static int format_int(char* dst, int value) {
+    char digits[12];
+    unsigned int v = value < 0 ? 0u - (unsigned int)value : (unsigned int)value;
+    int n = 0;
+    do {
+        digits[n++] = (char)('0' + v % 10);
+        v /= 10;
+    } while (v);
+    int len = 0;
+    if (value < 0) dst[len++] = '-';
+    while (n) dst[len++] = digits[--n];
+    return len;
+}
+
+// Наименьшее k <= 6, при котором value == r / 10^k для целого |r| < 2^53, или -1.
+// Тогда value — ближайший double к десятичному числу r / 10^k: деление и strtod
+// округляют одно и то же, так что запись r с точкой читается обратно в value.
+static int decimal_scale(double value, long long* r) {
+    static const double powers[] = { 1, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6 };
+    for (int k = 0; k < 7; k++) {
+        double scaled = value * powers[k];
+        if (!(fabs(scaled) < 9007199254740992.0)) return -1;
+        *r = (long long)scaled;
+        if ((double)*r == scaled && (double)*r / powers[k] == value) return k;
+    }
+    return -1;
+}
+
+// r / 10^k с decimals (>= k) знаками после точки
+static int format_scaled(char* dst, long long r, int k, int decimals) {
+    char digits[32];
+    unsigned long long u = r < 0 ? 0ull - (unsigned long long)r : (unsigned long long)r;
+    int n = 0;
+    for (int i = k; i < decimals; i++) digits[n++] = '0';
+    do {
+        digits[n++] = (char)('0' + u % 10);
+        u /= 10;
+    } while (u || n <= decimals);
+    int len = 0;
+    if (r < 0) dst[len++] = '-';
+    while (n) {
+        if (n == decimals) dst[len++] = '.';
+        dst[len++] = digits[--n];
+    }
+    return len;
+}
+
+// Как printf("%f"). До 2^31 полшага ulp меньше полушага шестого знака, поэтому
+// для r / 10^k %f печатает ровно r с дописанными нулями — без snprintf.
+static int format_double(char* dst, double value) {
+    long long r;
+    int k = fabs(value) < 2147483648.0 ? decimal_scale(value, &r) : -1;
+    if (k >= 0 && !(r == 0 && signbit(value))) return format_scaled(dst, r, k, 6);
+    int n = snprintf(dst, RT_NUMBER_MAX, "%f", value);
+    return n < RT_NUMBER_MAX ? n : RT_NUMBER_MAX - 1;
+}
+
+static void out_int(int value) {
+    rt_out_used += format_int(out_reserve(RT_NUMBER_MAX), value);
+}
+
+static void out_double(double value) {
+    rt_out_used += format_double(out_reserve(RT_NUMBER_MAX), value);
+}
+
+static void out_string(const char* s) {
+    out_bytes(s, strlen(s));
+}
+
+void rt_write_int(int i) { out_int(i); out_char('\n'); }
+void rt_write_string(const char* s) { out_string(s ? s : ""); out_char('\n'); }
+void rt_write_bool(bool b) { out_string(b ? "true\n" : "false\n"); }
+void rt_write_float(double d) { out_double(d); out_char('\n'); }
+
+// Длина UTF-8 строки в символах — для выравнивания колонок
+static int utf8_width(const char* s, size_t len) {
+    int width = 0;
+    for (size_t i = 0; i < len; i++) width += ((unsigned char)s[i] & 0xC0) != 0x80;
+    return width;
+}
+
+// Текст значения как для write(): числа форматируются в number, строки и bool не копируются.
+// В *len — длина в байтах
+static const char* cell_text(Table* t, int c, int row, char* number, int* len) {
+    const void* data = t->col_data[c];
+    const char* text = number;
+    switch (t->columns[c].kind) {
+        case COL_DECIMAL: *len = format_double(number, ((const double*)data)[row]); break;
+        case COL_BOOL:
+            text = bit_get((const unsigned char*)data, row) ? "true" : "false";
+            *len = (int)strlen(text);
+            break;
+        case COL_STRING:
+            text = column_string(&t->columns[c], data, row);
+            *len = (int)dict_entry_len(t->columns[c].dict, (int)((const uint32_t*)data)[row]);
+            break;
+        default: *len = format_int(number, ((const int*)data)[row]);
+    }
+    return text;
+}
+
+// Ширина значения на экране: у строк — в символах, по таблице на код словаря
+static int cell_width(Table* t, int c, int row, const int* string_widths, char* number) {
+    int len;
+    if (t->columns[c].kind == COL_STRING) return string_widths[((const uint32_t*)t->col_data[c])[row]];
+    cell_text(t, c, row, number, &len);
+    return len;
+}
+
+// Текст с выравниванием: заголовок, затем строки; числа прижаты вправо, остальное влево.
+// Ширина колонки считается отдельным проходом, у строковых — раз на значение словаря.
+static void write_table_text(Table* t) {
+    char number[RT_NUMBER_MAX];
+    int* widths = (int*)mem_alloc(sizeof(int) * (t->col_count ? t->col_count : 1));
+    int** string_widths = (int**)mem_calloc(t->col_count ? t->col_count : 1, sizeof(int*));
+    for (int c = 0; c < t->col_count; c++) {
+        Column* col = &t->columns[c];
+        widths[c] = utf8_width(col->name, strlen(col->name));
+        if (col->kind == COL_STRING) {
+            string_widths[c] = (int*)mem_alloc(sizeof(int) * (col->dict->count ? col->dict->count : 1));
+            for (int code = 0; code < col->dict->count; code++) {
+                string_widths[c][code] = utf8_width(col->dict->bytes + col->dict->offsets[code], dict_entry_len(col->dict, code));
+            }
+        }
+        for (int i = 0; i < t->row_count; i++) {
+            int w = cell_width(t, c, table_row_at(t, i), string_widths[c], number);
+            if (w > widths[c]) widths[c] = w;
+        }
+    }
+
+    for (int c = 0; c < t->col_count; c++) {
+        Column* col = &t->columns[c];
+        int right = col->kind == COL_INT || col->kind == COL_DECIMAL;
+        int pad = widths[c] - utf8_width(col->name, strlen(col->name));
+        if (c > 0) out_padding(2);
+        if (right) out_padding(pad);
+        out_string(col->name);
+        if (!right && c + 1 < t->col_count) out_padding(pad);
+    }
+    out_char('\n');
+    for (int i = 0; i < t->row_count; i++) {
+        int row = table_row_at(t, i);
+        for (int c = 0; c < t->col_count; c++) {
+            Column* col = &t->columns[c];
+            int right = col->kind == COL_INT || col->kind == COL_DECIMAL;
+            int len;
+            const char* text = cell_text(t, c, row, number, &len);
+            int pad = widths[c] - (col->kind == COL_STRING ? string_widths[c][((const uint32_t*)t->col_data[c])[row]] : len);
+            if (c > 0) out_padding(2);
+            if (right) out_padding(pad);
+            out_bytes(text, (size_t)len);
+            if (!right && c + 1 < t->col_count) out_padding(pad);
+        }
+        out_char('\n');
+    }
+
+    for (int c = 0; c < t->col_count; c++) mem_free(string_widths[c]);
+    mem_free(string_widths);
+    mem_free(widths);
+}
+
+// Поле CSV в кавычках, если в нём есть запятая, кавычка или перевод строки
+static void out_csv_string(const char* s) {
+    if (!strpbrk(s, ",\"\r\n")) {
+        out_string(s);
+        return;
+    }
+    out_char('"');
+    for (; *s; s++) {
+        if (*s == '"') out_char('"');
+        out_char(*s);
+    }
+    out_char('"');
+}
+
+// Запись decimal для CSV, которая читается обратно в то же число:
+// r / 10^k — как r с точкой, остальное — %.15g или, если его не хватает, %.17g
+static int format_decimal_exact(char* dst, double value) {
+    long long r;
+    int k = decimal_scale(value, &r);
+    if (k >= 0) return format_scaled(dst, r, k, k);
+    int n = snprintf(dst, RT_NUMBER_MAX, "%.15g", value);
+    if (strtod(dst, NULL) != value) n = snprintf(dst, RT_NUMBER_MAX, "%.17g", value);
+    return n;
+}
+
+// CSV с заголовком — в том виде, который читает import_csv
+static void write_table_csv(Table* t) {
+    for (int c = 0; c < t->col_count; c++) {
+        if (c > 0) out_char(',');
+        out_csv_string(t->columns[c].name);
+    }
+    out_char('\n');
+    for (int i = 0; i < t->row_count; i++) {
+        int row = table_row_at(t, i);
+        for (int c = 0; c < t->col_count; c++) {
+            if (c > 0) out_char(',');
+            const void* data = t->col_data[c];
+            switch (t->columns[c].kind) {
+                case COL_STRING: out_csv_string(column_string(&t->columns[c], data, row)); break;
+                case COL_DECIMAL: rt_out_used += format_decimal_exact(out_reserve(RT_NUMBER_MAX), ((const double*)data)[row]); break;
+                case COL_BOOL: out_string(bit_get((const unsigned char*)data, row) ? "true" : "false"); break;
+                default: out_int(((const int*)data)[row]);
+            }
+        }
+        out_char('\n');
+    }
+}
+
+// write(table[, format]): "text" (по умолчанию), "csv" или "binary" — формат файла
+// save_table, который можно перенаправить в файл и открыть load_table
+void rt_write_table(void* table, const char* format) {
+    Table* t = (Table*)table;
+    if (!format || strcmp(format, "text") == 0) {
+        write_table_text(t);
+    } else if (strcmp(format, "csv") == 0) {
+        write_table_csv(t);
+    } else if (strcmp(format, "binary") == 0) {
+        rt_flush();
+#ifdef _WIN32
+        _setmode(_fileno(stdout), _O_BINARY);
+#endif
+        table_write_file(stdout, t);
+        fflush(stdout);
+    } else {
+        diag("write: unknown format '%s', expected text, csv or binary\n", format);
+        exit(1);
+    }
+}
\ No newline at end of file